@@ -1,7 +1,7 @@
 """Add new field to posts
 
 Revision ID: 0d605457d7bb
-Revises: 
+Revises: a1d3f0c7b9e2
 Create Date: 2024-12-24 10:02:06.330726
 """
 
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '0d605457d7bb'
-down_revision: Union[str, None] = None
+down_revision: Union[str, None] = 'a1d3f0c7b9e2'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
@@ -0,0 +1,26 @@
+"""Add image variants to posts
+
+Revision ID: 2f9a6c83d4e1
+Revises: 8e4b7d21c6fa
+Create Date: 2026-10-18 11:41:53.870215
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2f9a6c83d4e1'
+down_revision: Union[str, None] = '8e4b7d21c6fa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Resized copies of the post image; fill existing rows with
+    # `python -m app.utils.image_variant_handler`
+    op.add_column('posts', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'image_variants')
@@ -0,0 +1,44 @@
+"""Store post images as storage keys
+
+Revision ID: 3e7a9b1c5d60
+Revises: 9a3e5c7d2f18
+Create Date: 2026-10-18 16:42:07.318254
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7a9b1c5d60'
+down_revision: Union[str, None] = '9a3e5c7d2f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Uploads used to be stored as paths under the local static directory
+LOCAL_PREFIX = 'static/'
+
+posts = sa.table(
+    'posts',
+    sa.column('id', sa.UUID()),
+    sa.column('image', sa.String()),
+    sa.column('image_variants', sa.JSON()),
+)
+
+
+def _rewrite(convert) -> None:
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(posts.c.id, posts.c.image, posts.c.image_variants)
+                              .where(posts.c.image.is_not(None))).all()
+    for row in rows:
+        variants = row.image_variants and {name: convert(path) for name, path in row.image_variants.items()}
+        connection.execute(posts.update().where(posts.c.id == row.id)
+                           .values(image=convert(row.image), image_variants=variants))
+
+
+def upgrade() -> None:
+    _rewrite(lambda path: path[len(LOCAL_PREFIX):] if path.startswith(LOCAL_PREFIX) else path)
+
+
+def downgrade() -> None:
+    _rewrite(lambda key: key if key.startswith(LOCAL_PREFIX) else LOCAL_PREFIX + key)
@@ -0,0 +1,74 @@
+"""Add time-decayed hot score to posts
+
+Revision ID: 4d8c1f6e2b95
+Revises: 6b2e9d4f1a73
+Create Date: 2026-10-18 13:05:41.118204
+"""
+
+import math
+from datetime import datetime
+from os import getenv
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8c1f6e2b95'
+down_revision: Union[str, None] = '6b2e9d4f1a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Scoring as app/utils/trending_handler.py defined it at the time of writing, so this revision stays as it was
+DECAY_RATE = math.log(2) / (float(getenv("TRENDING_HALF_LIFE_HOURS", "24")) * 3600)
+SCORE_EPOCH = datetime(2024, 1, 1)
+POST_WEIGHT = 1.0
+COMMENT_WEIGHT = 3.0
+
+posts = sa.table(
+    'posts',
+    sa.column('id', sa.UUID()),
+    sa.column('created_at', sa.DateTime()),
+    sa.column('hot_score', sa.Float()),
+)
+comments = sa.table(
+    'comments',
+    sa.column('post_id', sa.UUID()),
+    sa.column('created_at', sa.DateTime()),
+)
+
+
+def event_score(weight: float, at: datetime) -> float:
+    return math.log(weight) + DECAY_RATE * (at - SCORE_EPOCH).total_seconds()
+
+
+def add_event(hot_score: float, weight: float, at: datetime) -> float:
+    score = event_score(weight, at)
+    high, low = max(hot_score, score), min(hot_score, score)
+    return high + math.log1p(math.exp(low - high))
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('hot_score', sa.Float(), nullable=False, server_default='0'))
+
+    # Backfill from post and comment timestamps: log of the decayed, weighted sum of their events
+    connection = op.get_bind()
+    now = datetime.now()
+    scores = {row.id: event_score(POST_WEIGHT, row.created_at or now)
+              for row in connection.execute(sa.select(posts.c.id, posts.c.created_at))}
+    for row in connection.execute(sa.select(comments.c.post_id, comments.c.created_at)
+                                  .where(comments.c.post_id.is_not(None))):
+        if row.post_id in scores:
+            scores[row.post_id] = add_event(scores[row.post_id], COMMENT_WEIGHT, row.created_at or now)
+    if scores:
+        connection.execute(posts.update().where(posts.c.id == sa.bindparam('post_id'))
+                           .values(hot_score=sa.bindparam('score')),
+                           [{"post_id": post_id, "score": score} for post_id, score in scores.items()])
+
+    op.create_index('ix_posts_hot_score', 'posts', ['hot_score'])
+    op.create_index('ix_posts_category_id_hot_score', 'posts', ['category_id', 'hot_score'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_category_id_hot_score', table_name='posts')
+    op.drop_index('ix_posts_hot_score', table_name='posts')
+    op.drop_column('posts', 'hot_score')
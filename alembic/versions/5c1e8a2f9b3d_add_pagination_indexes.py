@@ -0,0 +1,32 @@
+"""Add composite indexes for keyset pagination
+
+Revision ID: 5c1e8a2f9b3d
+Revises: 0d605457d7bb
+Create Date: 2026-10-18 09:12:41.518204
+"""
+
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8a2f9b3d'
+down_revision: Union[str, None] = '0d605457d7bb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (created_at, id) ordered scans for every paginated list endpoint
+    op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'])
+    op.create_index('ix_posts_category_id_created_at_id', 'posts', ['category_id', 'created_at', 'id'])
+    op.create_index('ix_posts_user_id_created_at_id', 'posts', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_categories_created_at_id', 'categories', ['created_at', 'id'])
+    op.create_index('ix_comments_post_id_created_at_id', 'comments', ['post_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_post_id_created_at_id', table_name='comments')
+    op.drop_index('ix_categories_created_at_id', table_name='categories')
+    op.drop_index('ix_posts_user_id_created_at_id', table_name='posts')
+    op.drop_index('ix_posts_category_id_created_at_id', table_name='posts')
+    op.drop_index('ix_posts_created_at_id', table_name='posts')
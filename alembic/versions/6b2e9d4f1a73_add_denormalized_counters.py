@@ -0,0 +1,42 @@
+"""Add denormalized comment and post counters
+
+Revision ID: 6b2e9d4f1a73
+Revises: 2f9a6c83d4e1
+Create Date: 2026-10-18 12:20:14.402871
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '6b2e9d4f1a73'
+down_revision: Union[str, None] = '2f9a6c83d4e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('categories', sa.Column('post_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('post_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill; later drift is repaired with `python -m app.utils.counter_handler`
+    op.execute("UPDATE posts SET comment_count = "
+               "(SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)")
+    op.execute("UPDATE categories SET post_count = "
+               "(SELECT COUNT(*) FROM posts WHERE posts.category_id = categories.id)")
+    op.execute("UPDATE users SET post_count = "
+               "(SELECT COUNT(*) FROM posts WHERE posts.user_id = users.id)")
+
+    # Keyset pagination for the "popular" sort orders
+    op.create_index('ix_posts_comment_count_id', 'posts', ['comment_count', 'id'])
+    op.create_index('ix_categories_post_count_id', 'categories', ['post_count', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_categories_post_count_id', table_name='categories')
+    op.drop_index('ix_posts_comment_count_id', table_name='posts')
+    op.drop_column('users', 'post_count')
+    op.drop_column('categories', 'post_count')
+    op.drop_column('posts', 'comment_count')
@@ -0,0 +1,40 @@
+"""Add outbox events
+
+Revision ID: 7c4f2a9e1b38
+Revises: 3e7a9b1c5d60
+Create Date: 2026-10-18 18:05:41.927316
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4f2a9e1b38'
+down_revision: Union[str, None] = '3e7a9b1c5d60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.UUID(as_uuid=True), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('idempotency_key', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key'),
+    )
+    op.create_index('ix_outbox_events_status_available_at', 'outbox_events', ['status', 'available_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_status_available_at', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,68 @@
+"""Add full text search index over posts and comments
+
+Revision ID: 8e4b7d21c6fa
+Revises: 5c1e8a2f9b3d
+Create Date: 2026-10-18 11:02:17.204631
+"""
+
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b7d21c6fa'
+down_revision: Union[str, None] = '5c1e8a2f9b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Copied from app/utils/search_handler.py at the time of writing, so this revision stays as it was
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        kind UNINDEXED, entity_id UNINDEXED, post_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)",
+    """
+    ALTER TABLE comments ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(content, ''))
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_comments_search_vector ON comments USING GIN (search_vector)",
+]
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    for statement in SQLITE_SEARCH_DDL if connection.dialect.name == "sqlite" else POSTGRES_SEARCH_DDL:
+        op.execute(statement)
+
+    # Postgres fills its generated tsvector columns itself; SQLite needs a backfill
+    if connection.dialect.name == "sqlite":
+        op.execute(
+            "INSERT INTO search_index (kind, entity_id, post_id, title, body) "
+            "SELECT 'post', id, id, title, content FROM posts"
+        )
+        op.execute(
+            "INSERT INTO search_index (kind, entity_id, post_id, title, body) "
+            "SELECT 'comment', id, post_id, '', content FROM comments WHERE post_id IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS search_index")
+    else:
+        op.execute("DROP INDEX IF EXISTS ix_comments_search_vector")
+        op.execute("ALTER TABLE comments DROP COLUMN IF EXISTS search_vector")
+        op.execute("DROP INDEX IF EXISTS ix_posts_search_vector")
+        op.execute("ALTER TABLE posts DROP COLUMN IF EXISTS search_vector")
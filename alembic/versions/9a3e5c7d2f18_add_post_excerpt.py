@@ -0,0 +1,28 @@
+"""Add stored excerpt to posts
+
+Revision ID: 9a3e5c7d2f18
+Revises: 4d8c1f6e2b95
+Create Date: 2026-10-18 14:10:52.630917
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3e5c7d2f18'
+down_revision: Union[str, None] = '4d8c1f6e2b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('excerpt', sa.String(), nullable=True))
+
+    # Same rule as projection_handler.make_excerpt with the default EXCERPT_LENGTH of 200
+    op.execute("UPDATE posts SET excerpt = CASE WHEN length(content) > 200 "
+               "THEN rtrim(substr(content, 1, 200)) || '…' ELSE content END")
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'excerpt')
@@ -0,0 +1,94 @@
+"""Create initial tables
+
+Revision ID: a1d3f0c7b9e2
+Revises: 
+Create Date: 2026-10-18 11:14:47.000000
+
+Added after the fact, as the root of the history: the tables used to be made
+by metadata.create_all at start-up, and 0d605457d7bb already alters them, so
+they have to exist before it runs. Databases stamped at 0d605457d7bb or any
+later revision never run this one.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d3f0c7b9e2'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Schema as first created by metadata.create_all, before posts.image existed
+    op.create_table(
+        'users',
+        sa.Column('id', sa.UUID(as_uuid=True), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_admin', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'categories',
+        sa.Column('id', sa.UUID(as_uuid=True), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_categories_id', 'categories', ['id'])
+    op.create_index('ix_categories_name', 'categories', ['name'], unique=True)
+
+    op.create_table(
+        'posts',
+        sa.Column('id', sa.UUID(as_uuid=True), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('user_id', sa.UUID(as_uuid=True), nullable=True),
+        sa.Column('category_id', sa.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_posts_id', 'posts', ['id'])
+
+    op.create_table(
+        'comments',
+        sa.Column('id', sa.UUID(as_uuid=True), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('user_id', sa.UUID(as_uuid=True), nullable=True),
+        sa.Column('post_id', sa.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_comments_id', 'comments', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_id', table_name='comments')
+    op.drop_table('comments')
+    op.drop_index('ix_posts_id', table_name='posts')
+    op.drop_table('posts')
+    op.drop_index('ix_categories_name', table_name='categories')
+    op.drop_index('ix_categories_id', table_name='categories')
+    op.drop_table('categories')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
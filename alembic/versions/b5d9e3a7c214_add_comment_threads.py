@@ -0,0 +1,65 @@
+"""Add comment threads
+
+Revision ID: b5d9e3a7c214
+Revises: 7c4f2a9e1b38
+Create Date: 2026-10-18 19:12:36.504183
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d9e3a7c214'
+down_revision: Union[str, None] = '7c4f2a9e1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+comments = sa.table(
+    'comments',
+    sa.column('id', sa.UUID()),
+    sa.column('path', sa.String()),
+)
+
+
+def upgrade() -> None:
+    op.drop_index('ix_comments_post_id_created_at_id', table_name='comments')
+
+    # Batch mode, as SQLite can't add a foreign key to an existing table
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.UUID(as_uuid=True), nullable=True))
+        batch_op.add_column(sa.Column('path', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('depth', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('reply_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_foreign_key('fk_comments_parent_id_comments', 'comments', ['parent_id'], ['id'])
+
+    # Existing comments become top-level threads: their path is their own id
+    connection = op.get_bind()
+    ids = connection.execute(sa.select(comments.c.id)).scalars().all()
+    if ids:
+        connection.execute(comments.update().where(comments.c.id == sa.bindparam('comment_id'))
+                           .values(path=sa.bindparam('comment_path')),
+                           [{"comment_id": comment_id, "comment_path": comment_id.hex} for comment_id in ids])
+
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.alter_column('path', existing_type=sa.String(), nullable=False)
+
+    op.create_index('ix_comments_post_id_depth_created_at_id', 'comments', ['post_id', 'depth', 'created_at', 'id'])
+    op.create_index('ix_comments_parent_id_created_at_id', 'comments', ['parent_id', 'created_at', 'id'])
+    op.create_index('ix_comments_path', 'comments', ['path'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_path', table_name='comments')
+    op.drop_index('ix_comments_parent_id_created_at_id', table_name='comments')
+    op.drop_index('ix_comments_post_id_depth_created_at_id', table_name='comments')
+
+    # Replies are kept, as flat comments of their post
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.drop_constraint('fk_comments_parent_id_comments', type_='foreignkey')
+        batch_op.drop_column('reply_count')
+        batch_op.drop_column('depth')
+        batch_op.drop_column('path')
+        batch_op.drop_column('parent_id')
+
+    op.create_index('ix_comments_post_id_created_at_id', 'comments', ['post_id', 'created_at', 'id'])
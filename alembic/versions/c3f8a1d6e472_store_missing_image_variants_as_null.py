@@ -0,0 +1,34 @@
+"""Store missing image variants as NULL
+
+Revision ID: c3f8a1d6e472
+Revises: b5d9e3a7c214
+Create Date: 2026-10-18 21:04:17.318642
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1d6e472'
+down_revision: Union[str, None] = 'b5d9e3a7c214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+posts = sa.table(
+    'posts',
+    sa.column('image_variants', sa.JSON()),
+)
+
+
+def upgrade() -> None:
+    # Changing a post's image used to store a JSON null, which the variant backfill
+    # (image_variants IS NULL) never picks up again
+    op.execute(posts.update()
+               .where(sa.cast(posts.c.image_variants, sa.Text) == 'null')
+               .values(image_variants=sa.null()))
+
+
+def downgrade() -> None:
+    # Both mean "no variants"; nothing to undo
+    pass
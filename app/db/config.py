@@ -1,20 +1,97 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+import math
+from os import getenv
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.orm import declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./blog.db"
+# sqlite+aiosqlite locally, postgresql+asyncpg in production
+SQLALCHEMY_DATABASE_URL = getenv("DATABASE_URL", "sqlite+aiosqlite:///./blog.db")
+# Optional replica for read-only GET handlers; falls back to the primary
+SQLALCHEMY_READ_DATABASE_URL = getenv("DATABASE_READ_URL", "")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+DB_ECHO = getenv("DB_ECHO", "false").lower() == "true"
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool (Postgres / any server database)
+DB_POOL_SIZE = int(getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Connections opened per engine at start-up so the first requests skip connect/setup
+DB_POOL_WARMUP = int(getenv("DB_POOL_WARMUP", "2"))
 
-base = declarative_base()
+# SQLite pragmas, applied to every new connection. WAL lets readers proceed while
+# a writer holds the lock; NORMAL sync is durable across app crashes in WAL mode.
+SQLITE_JOURNAL_MODE = getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, so the default is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(getenv("SQLITE_CACHE_SIZE", "-64000"))
 
 
-def get_db():
-    db = SessionLocal()
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+    # hot_score updates use exp() and ln(); SQLite builds without the math functions get Python's
     try:
+        cursor.execute("SELECT exp(0), ln(1)")
+    except Exception:
+        dbapi_connection.create_function("exp", 1, math.exp, deterministic=True)
+        dbapi_connection.create_function("ln", 1, math.log, deterministic=True)
+    cursor.close()
+
+
+def create_engine_from_url(url: str) -> AsyncEngine:
+    if url.startswith("sqlite"):
+        new_engine = create_async_engine(url, echo=DB_ECHO, connect_args={"check_same_thread": False})
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        return new_engine
+
+    return create_async_engine(
+        url,
+        echo=DB_ECHO,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+engine = create_engine_from_url(SQLALCHEMY_DATABASE_URL)
+read_engine = create_engine_from_url(SQLALCHEMY_READ_DATABASE_URL) if SQLALCHEMY_READ_DATABASE_URL else engine
+
+# Every distinct engine, for instrumentation and shutdown
+engines = tuple(dict.fromkeys((engine, read_engine)))
+
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(bind=read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+base = declarative_base()
+
+
+async def warm_up_engines() -> None:
+    async def open_connection(db_engine: AsyncEngine):
+        async with db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Concurrent, so each engine really opens DB_POOL_WARMUP distinct pooled connections
+    for db_engine in engines:
+        await asyncio.gather(*(open_connection(db_engine) for _ in range(DB_POOL_WARMUP)))
+
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    """Session for read-only handlers; served by the replica when DATABASE_READ_URL is set."""
+    async with ReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
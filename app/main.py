@@ -1,19 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from dotenv import load_dotenv
+
+# Before any app module is imported: they read their settings from env at import time
+load_dotenv()
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routes import auth_router, user_router, category_router, post_router, comment_router, admin_router
-from .db.config import base, engine
-from dotenv import load_dotenv
+from .routes import (auth_router, user_router, category_router, post_router, comment_router, admin_router,
+                     media_router, metrics_router)
+from .db.config import engines, warm_up_engines
+from .utils.query_counter_handler import QUERY_COUNT_ENABLED, QueryCountMiddleware
+from .utils.image_variant_handler import shutdown_image_workers
+from .utils.media_handler import MediaFiles
+from .utils.comment_stream_handler import start_comment_streams, stop_comment_streams
+from .utils.counter_handler import COUNTER_RECONCILE_INTERVAL, reconcile_periodically
+from .utils.http_cache_handler import prime_response_cache
+from .utils.logger_handler import RequestLoggingMiddleware, configure_logging, logger
+from .utils.metrics_handler import MetricsMiddleware
+from .utils.outbox_handler import OUTBOX_IN_PROCESS, drain_periodically
+from .utils.rate_limit_handler import RateLimitHeadersMiddleware
+from .utils.response_handler import CompressionMiddleware
+from .utils.storage_handler import STORAGE_LOCAL_MOUNT, STORAGE_LOCAL_ROOT
+from .utils.trending_handler import load_snapshot, refresh_periodically
+from .utils.upload_image_handler import MultipartLimitMiddleware
 
-base.metadata.create_all(bind=engine)
 
-load_dotenv()
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # The schema is owned by Alembic: run `alembic upgrade head` before starting workers
+    configure_logging()
+    await warm_up_engines()
+    # Last saved ranking until the first refresh completes
+    load_snapshot()
+    await start_comment_streams()
+    # Rendered in the background so the worker starts accepting requests right away
+    background = [asyncio.create_task(prime_response_cache(_app)), asyncio.create_task(refresh_periodically())]
+    if COUNTER_RECONCILE_INTERVAL > 0:
+        background.append(asyncio.create_task(reconcile_periodically()))
+    # Side effects queued by the write handlers, unless a separate `python -m app.worker` runs them
+    if OUTBOX_IN_PROCESS:
+        background.append(asyncio.create_task(drain_periodically()))
+    logger.info("Application started")
+    yield
+    # Let unfinished background work release its connections before the pools are disposed
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await stop_comment_streams()
+    shutdown_image_workers()
+    for db_engine in engines:
+        await db_engine.dispose()
+
 
 app = FastAPI(
     title="BlogMaster APP",
     description="A comprehensive API for creating, managing, and interacting with blog posts and comments.",
     version="1.0.0",
+    lifespan=lifespan,
+    # orjson instead of json.dumps for every route that returns plain data
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware to allow cross-origin requests from your frontend
@@ -25,8 +75,27 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Mounting static file in fastapi app ->
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# RateLimit-* headers of the route's policy, also on responses the route builds itself
+app.add_middleware(RateLimitHeadersMiddleware)
+
+# Oversized image uploads are refused before the form parser spools them
+app.add_middleware(MultipartLimitMiddleware)
+
+# Count DB statements per request to catch N+1 queries while developing
+if QUERY_COUNT_ENABLED:
+    app.add_middleware(QueryCountMiddleware)
+
+# Per-route request metrics, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Negotiated zstd/br/gzip for JSON bodies over COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so the request id and sampling decision cover everything below
+app.add_middleware(RequestLoggingMiddleware)
+
+# Mounting static file in fastapi app; uploads live here with the local storage backend ->
+app.mount(STORAGE_LOCAL_MOUNT, MediaFiles(directory=STORAGE_LOCAL_ROOT), name="static")
 
 app.include_router(auth_router.auth_route)
 app.include_router(user_router.user_route)
@@ -34,3 +103,5 @@ app.include_router(admin_router.admin_route)
 app.include_router(category_router.category_route)
 app.include_router(post_router.post_route)
 app.include_router(comment_router.comment_route)
+app.include_router(media_router.media_route)
+app.include_router(metrics_router.metrics_route)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import uuid4
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, UUID
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, ForeignKey, UUID, Index, JSON
 from sqlalchemy.orm import relationship
 
 from ..db.config import base
@@ -15,6 +15,8 @@ class User(base):
     password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    # maintained by the post handlers, repaired by counter_handler.reconcile_counters ->
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -30,10 +32,21 @@ class Post(base):
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid4)
     title = Column(String, nullable=False)
     content = Column(String, nullable=False)
+    # leading part of content for feed views, kept in sync by the post handlers ->
+    excerpt = Column(String, nullable=True)
+    # storage key, e.g. "images/<sha256>.png"; responses turn it into a URL ->
     image = Column(String, nullable=True)
+    # resized copies of image, e.g. {"thumbnail": key, "medium": key, "webp": key};
+    # None is SQL NULL, the "not generated yet" backfill_image_variants looks for, not a JSON null
+    image_variants = Column(JSON(none_as_null=True), nullable=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'))
     category_id = Column(UUID(as_uuid=True), ForeignKey('categories.id'))
 
+    # maintained by the comment handlers, repaired by counter_handler.reconcile_counters ->
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # log of the time-decayed activity sum, see trending_handler ->
+    hot_score = Column(Float, nullable=False, default=0.0, server_default="0")
+
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -42,6 +55,17 @@ class Post(base):
     comments = relationship("Comment", back_populates="post")
     category = relationship("Category", back_populates="posts")
 
+    # composite indexes backing keyset pagination ->
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_category_id_created_at_id", "category_id", "created_at", "id"),
+        Index("ix_posts_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_posts_comment_count_id", "comment_count", "id"),
+        # top K per category for trending ->
+        Index("ix_posts_hot_score", "hot_score"),
+        Index("ix_posts_category_id_hot_score", "category_id", "hot_score"),
+    )
+
 
 class Category(base):
     __tablename__ = "categories"
@@ -49,6 +73,8 @@ class Category(base):
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid4)
     name = Column(String, unique=True, index=True, nullable=False)
     description = Column(String, nullable=False)
+    # maintained by the post handlers, repaired by counter_handler.reconcile_counters ->
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -56,6 +82,12 @@ class Category(base):
     # relationship ->
     posts = relationship("Post", back_populates="category")
 
+    # composite indexes backing keyset pagination ->
+    __table_args__ = (
+        Index("ix_categories_created_at_id", "created_at", "id"),
+        Index("ix_categories_post_count_id", "post_count", "id"),
+    )
+
 
 class Comment(base):
     __tablename__ = "comments"
@@ -64,6 +96,13 @@ class Comment(base):
     content = Column(String, nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'))
     post_id = Column(UUID(as_uuid=True), ForeignKey('posts.id'))
+    # None for a top-level comment ->
+    parent_id = Column(UUID(as_uuid=True), ForeignKey('comments.id'), nullable=True)
+    # materialized path: the hex ids from the thread's root down to this comment, "/" separated ->
+    path = Column(String, nullable=False)
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
+    # direct replies, maintained by the comment handlers, repaired by counter_handler.reconcile_counters ->
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -71,3 +110,37 @@ class Comment(base):
     # relationship ->
     author = relationship("User", back_populates="comments")
     post = relationship("Post", back_populates="comments")
+
+    __table_args__ = (
+        # keyset pagination over a post's top-level threads ->
+        Index("ix_comments_post_id_depth_created_at_id", "post_id", "depth", "created_at", "id"),
+        # ... and over a comment's replies ->
+        Index("ix_comments_parent_id_created_at_id", "parent_id", "created_at", "id"),
+        # a subtree is one range scan over its path prefix ->
+        Index("ix_comments_path", "path", unique=True),
+    )
+
+
+class OutboxEvent(base):
+    __tablename__ = "outbox_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    # registered job name, see outbox_handler ->
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # same key, same effect: a second enqueue of it is ignored ->
+    idempotency_key = Column(String, unique=True, nullable=False)
+    # pending -> done, or dead once the attempts are used up ->
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # not before this; moved forward while a worker holds it and after each failure ->
+    available_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.now)
+    processed_at = Column(DateTime, nullable=True)
+
+    # what the workers poll for ->
+    __table_args__ = (
+        Index("ix_outbox_events_status_available_at", "status", "available_at"),
+    )
@@ -1,58 +1,114 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..utils.logger_handler import logger
-from ..db.config import get_db
+from ..db.config import get_db, get_read_db
 from ..models.app_models import Post, User
-from ..routes.auth_router import check_admin
+from ..routes.auth_router import check_admin, invalidate_principal
+from ..schemas.bulk_schema import (BulkPostDeleteSchema, BulkUserDeleteSchema, PostImportBatchSchema,
+                                   CommentImportBatchSchema, BulkResultSchema)
+from ..schemas.user_schema import UserOutSchema
+from ..utils import bulk_handler
 
 admin_route = APIRouter(prefix="/api/v1/admin", tags=["Admin Route"], dependencies=[Depends(check_admin)])
 
 
 @admin_route.delete(path="/remove/post/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_inappropriate_posts(post_id: UUID, db: Session = Depends(get_db)):
-    is_post = db.query(Post).filter(Post.id == post_id).first()  # type:ignore
-    if is_post is None:
-        logger.warning(f"Post {post_id} does not Exist!")
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
-
-    try:
-        db.delete(is_post)
-        db.commit()
-        logger.info(f"Post {is_post.title} removed successfully!")
-
-    except Exception as e:
-        logger.error(f"Failed to remove post: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to remove post: {e}")
+async def remove_inappropriate_posts(post_id: UUID, db: AsyncSession = Depends(get_db)):
+    # Same cascade as the bulk endpoint: comments, search entries and counters go with the post
+    [result] = await bulk_handler.delete_posts(db, [post_id])
+    if result["status"] == "not_found":
+        logger.warning("Post {} does not Exist!", post_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=result["detail"])
+    if result["status"] != "deleted":
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=f"Failed to remove post: {result['detail']}")
+    logger.info("Post {} removed successfully!", post_id)
 
 
 @admin_route.get("/all/users", status_code=status.HTTP_200_OK)
-async def get_all_users(db: Session = Depends(get_db)):
-    all_users = db.query(User).all()
+async def get_all_users(db: AsyncSession = Depends(get_read_db)):
+    all_users = (await db.scalars(select(User))).all()
     logger.info("All users fetched successfully!")
     return all_users
 
 
 @admin_route.delete("/remove/user/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_inactive_user(user_id: UUID, db: Session = Depends(get_db)):
-    is_user = db.query(User).filter(User.id == user_id).first()  # type:ignore
+async def remove_inactive_user(user_id: UUID, db: AsyncSession = Depends(get_db)):
+    is_user = await db.get(User, user_id)
     if is_user is None:
-        logger.warning(f"User {user_id} does not Exist!")
+        logger.warning("User {} does not Exist!", user_id)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {user_id} does not found")
     if is_user.is_admin:
-        logger.warning(f"User {user_id} is Admin!")
+        logger.warning("User {} is Admin!", user_id)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"User {user_id} is Admin!")
 
     if is_user.is_active:
-        logger.warning(f"User {user_id} is active!")
+        logger.warning("User {} is active!", user_id)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"User {user_id} is active!")
 
-    try:
-        db.delete(is_user)
-        db.commit()
-        logger.info(f"User {is_user.username} removed successfully!")
+    username = is_user.username
+    # Their posts and comments go with them, as in the bulk endpoint
+    [result] = await bulk_handler.delete_users(db, [user_id])
+    if result["status"] != "deleted":
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=f"Failed to remove user: {result['detail']}")
+    await invalidate_principal(user_id)
+    logger.info("User {} removed successfully!", username)
+
+
+@admin_route.post("/bulk/remove/posts", response_model=BulkResultSchema, status_code=status.HTTP_200_OK)
+async def bulk_remove_posts(selection: BulkPostDeleteSchema, db: AsyncSession = Depends(get_db)):
+    post_ids = selection.ids
+    if post_ids is None:
+        stmt = select(Post.id)
+        if selection.author_id is not None:
+            stmt = stmt.where(Post.user_id == selection.author_id)  # type:ignore
+        if selection.category_id is not None:
+            stmt = stmt.where(Post.category_id == selection.category_id)  # type:ignore
+        if selection.created_before is not None:
+            stmt = stmt.where(Post.created_at < selection.created_before)  # type:ignore
+        post_ids = list(await db.scalars(stmt))
+
+    results = await bulk_handler.delete_posts(db, post_ids)
+    summary = bulk_handler.summarize(results, success="deleted")
+    logger.info("Bulk removed {} posts, {} failed", summary["succeeded"], summary["failed"])
+    return summary
+
+
+@admin_route.post("/bulk/remove/users", response_model=BulkResultSchema, status_code=status.HTTP_200_OK)
+async def bulk_remove_users(selection: BulkUserDeleteSchema, db: AsyncSession = Depends(get_db)):
+    user_ids = selection.ids
+    if user_ids is None:
+        user_ids = list(await db.scalars(
+            select(User.id).where(User.is_active.is_(False), User.is_admin.is_(False),
+                                  User.created_at < selection.inactive_before)))  # type:ignore
+
+    results = await bulk_handler.delete_users(db, user_ids)
+    for result in results:
+        if result["status"] == "deleted":
+            await invalidate_principal(result["id"])
+
+    summary = bulk_handler.summarize(results, success="deleted")
+    logger.info("Bulk removed {} users, {} failed", summary["succeeded"], summary["failed"])
+    return summary
+
+
+@admin_route.post("/bulk/import/posts", response_model=BulkResultSchema, status_code=status.HTTP_200_OK)
+async def bulk_import_posts(batch: PostImportBatchSchema, db: AsyncSession = Depends(get_db),
+                            current_user: UserOutSchema = Depends(check_admin)):
+    results = await bulk_handler.import_posts(db, batch.items, default_user_id=current_user.id)
+    summary = bulk_handler.summarize(results, success="created")
+    logger.info("Bulk imported {} posts, {} failed", summary["succeeded"], summary["failed"])
+    return summary
+
 
-    except Exception as e:
-        logger.error(f"Failed to remove user: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to remove user: {e}")
+@admin_route.post("/bulk/import/comments", response_model=BulkResultSchema, status_code=status.HTTP_200_OK)
+async def bulk_import_comments(batch: CommentImportBatchSchema, db: AsyncSession = Depends(get_db),
+                               current_user: UserOutSchema = Depends(check_admin)):
+    results = await bulk_handler.import_comments(db, batch.items, default_user_id=current_user.id)
+    summary = bulk_handler.summarize(results, success="created")
+    logger.info("Bulk imported {} comments, {} failed", summary["succeeded"], summary["failed"])
+    return summary
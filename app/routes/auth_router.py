@@ -1,28 +1,36 @@
+import hashlib
+from time import time
+from uuid import UUID
+
 from fastapi import APIRouter, status, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..utils.logger_handler import logger
 from ..db.config import get_db
 from ..models.app_models import User
 from ..schemas.user_schema import UserOutSchema, UserCreateSchema
+from ..utils.cache_handler import principal_cache
 from ..utils.jwt_handler import create_access_token, verify_token
-from ..utils.password_handler import hash_password, verify_password
+from ..utils.password_handler import hash_password, verify_and_update_password
+from ..utils.rate_limit_handler import LOGIN_LIMIT, SIGNUP_LIMIT, rate_limit
 
 auth_route = APIRouter(prefix="/api/v1/auth", tags=["My auth Router"])
 
 oAuth2 = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-@auth_route.post("/signup", response_model=UserOutSchema, status_code=status.HTTP_201_CREATED)
-async def create_user(new_user: UserCreateSchema, db: Session = Depends(get_db)):
-    is_user_exist = db.query(User).filter(User.email == new_user.email).first()  # type:ignore
+@auth_route.post("/signup", response_model=UserOutSchema, status_code=status.HTTP_201_CREATED,
+                 dependencies=[Depends(rate_limit(SIGNUP_LIMIT))])
+async def create_user(new_user: UserCreateSchema, db: AsyncSession = Depends(get_db)):
+    is_user_exist = await db.scalar(select(User).where(User.email == new_user.email))  # type:ignore
     if is_user_exist:
         logger.warning("User already exist!")
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already exist! please login")
 
     try:
-        hashed_password = hash_password(new_user.password)
+        hashed_password = await hash_password(new_user.password)
 
         new_user = User(
             username=new_user.username,
@@ -30,28 +38,37 @@ async def create_user(new_user: UserCreateSchema, db: Session = Depends(get_db))
             password=hashed_password
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         logger.info("New user created successfully!")
         return new_user
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create new user: {e}")
 
 
-@auth_route.post("/login", status_code=status.HTTP_200_OK)
-async def login_user(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)) -> dict:
-    is_user_exist = db.query(User).filter(User.email == user.username).first()  # type:ignore
+# Checked before the bcrypt verify, so a flood of guesses costs no hashing
+@auth_route.post("/login", status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit(LOGIN_LIMIT))])
+async def login_user(user: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)) -> dict:
+    is_user_exist = await db.scalar(select(User).where(User.email == user.username))  # type:ignore
     if not is_user_exist:
         logger.warning("User not found!")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found!")
 
     try:
-        is_password_correct = verify_password(user.password, is_user_exist.password)
+        is_password_correct, new_hash = await verify_and_update_password(user.password, is_user_exist.password)
         if not is_password_correct:
             logger.warning("Invalid password!")
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password!")
 
+        # Transparently upgrade hashes made with an outdated cost factor
+        if new_hash:
+            is_user_exist.password = new_hash
+            await db.commit()
+            logger.info("Password hash upgraded on login")
+
         token = create_access_token(data={"email": is_user_exist.email})
 
         logger.info("User logged in successfully!")
@@ -59,11 +76,27 @@ async def login_user(user: OAuth2PasswordRequestForm = Depends(), db: Session =
             "access_token": token,
             "token_type": "bearer"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to login user: {e}")
 
 
-def get_current_user(token: str = Depends(oAuth2), db: Session = Depends(get_db)) -> UserOutSchema:
+def _principal_key(token: str) -> str:
+    # Never keep raw bearer tokens as cache keys
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def invalidate_principal(user_id: UUID) -> None:
+    await principal_cache.invalidate_tag(f"user:{user_id}")
+
+
+async def get_current_user(token: str = Depends(oAuth2), db: AsyncSession = Depends(get_db)) -> UserOutSchema:
+    cache_key = _principal_key(token)
+    cached_user = await principal_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+
     payload = verify_token(token)
 
     if not payload:
@@ -71,13 +104,13 @@ def get_current_user(token: str = Depends(oAuth2), db: Session = Depends(get_db)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
 
     email = payload.get("email")
-    is_user = db.query(User).filter(User.email == email).first()  # type:ignore
+    is_user = await db.scalar(select(User).where(User.email == email))  # type:ignore
 
     if is_user is None:
         logger.warning("User does not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User does not found")
 
-    return UserOutSchema(
+    current_user = UserOutSchema(
         id=is_user.id,
         username=is_user.username,
         email=is_user.email,
@@ -87,9 +120,18 @@ def get_current_user(token: str = Depends(oAuth2), db: Session = Depends(get_db)
         updated_at=is_user.updated_at
     )
 
+    # Never cache a principal past its token's expiry
+    ttl = principal_cache.ttl
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time())
+    if ttl > 0:
+        await principal_cache.set(cache_key, current_user, ttl=ttl, tags=[f"user:{is_user.id}"])
+
+    return current_user
+
 
 def check_admin(current_user: UserOutSchema = Depends(get_current_user)) -> UserOutSchema:
     if not current_user.is_admin:
-        logger.warning(f"User {current_user.username} is not admin")
+        logger.warning("User {} is not admin", current_user.username)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"User {current_user.username} is not admin")
     return current_user
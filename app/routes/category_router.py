@@ -1,37 +1,55 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from pydantic import UUID4
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .auth_router import check_admin
 from ..schemas.user_schema import UserOutSchema
 from ..utils.logger_handler import logger
 
-from ..db.config import get_db
+from ..db.config import get_db, get_read_db
 from ..models.app_models import Category
-from ..schemas.category_schema import CategoryOutSchema, CategoryCreateSchema
+from ..schemas.category_schema import CategoryOutSchema, CategoryPageSchema, CategoryCreateSchema
+from ..utils.http_cache_handler import cached_response, invalidate_responses
+from ..utils.pagination_handler import PageParams, page_params, paginate
 
 category_route = APIRouter(prefix="/api/v1/category", tags=["Category Router"])
 
+# Categories change rarely, so clients may keep them longer
+CATEGORIES_MAX_AGE = 300
 
-@category_route.get(path="/all", status_code=status.HTTP_200_OK, response_model=list[CategoryOutSchema],
+# ?sort= value -> column the list is ordered by
+CATEGORY_SORT_COLUMNS = {"latest": "created_at", "popular": "post_count"}
+
+
+@category_route.get(path="/all", status_code=status.HTTP_200_OK, response_model=CategoryPageSchema,
                     name="all_categories")
-async def get_all_categories(db: Session = Depends(get_db)):
-    return db.query(Category).all()
+async def get_all_categories(request: Request, page: PageParams = Depends(page_params),
+                             sort: str = Query(default="latest", pattern="^(latest|popular)$"),
+                             db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        all_categories = await paginate(db, select(Category), Category, page, sort_by=CATEGORY_SORT_COLUMNS[sort])
+        return CategoryPageSchema.model_validate(all_categories, from_attributes=True)
+
+    return await cached_response(request, build, tags=["categories"], max_age=CATEGORIES_MAX_AGE)
 
 
 @category_route.get(path="by_id/{category_id}", status_code=status.HTTP_200_OK, response_model=CategoryOutSchema,
                     name="category_by_id")
-async def get_category_by_id(category_id: UUID4, db: Session = Depends(get_db)):
-    is_category = db.query(Category).filter(Category.id == category_id).first()  # type:ignore
-    if is_category is None:
-        logger.warning("Category does not found")
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Category {category_id} does not found")
-    return is_category
+async def get_category_by_id(request: Request, category_id: UUID4, db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        is_category = await db.get(Category, category_id)
+        if is_category is None:
+            logger.warning("Category does not found")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Category {category_id} does not found")
+        return CategoryOutSchema.model_validate(is_category, from_attributes=True)
+
+    return await cached_response(request, build, tags=[f"category:{category_id}"], max_age=CATEGORIES_MAX_AGE)
 
 
 @category_route.post(path="/create", status_code=status.HTTP_201_CREATED,
                      name="create_category")
-async def create_category(new_category: CategoryCreateSchema, db: Session = Depends(get_db),
+async def create_category(new_category: CategoryCreateSchema, db: AsyncSession = Depends(get_db),
                           is_admin: UserOutSchema = Depends(check_admin)):
     if is_admin:
         create_new_category = Category(
@@ -39,21 +57,24 @@ async def create_category(new_category: CategoryCreateSchema, db: Session = Depe
             description=new_category.description
         )
         db.add(create_new_category)
-        db.commit()
-        db.refresh(create_new_category)
-        logger.info(f"Category {create_new_category.name} created successfully!")
+        await db.commit()
+        await db.refresh(create_new_category)
+        await invalidate_responses("categories")
+        logger.info("Category {} created successfully!", create_new_category.name)
 
 
 @category_route.delete(path="/remove/{category_id}", status_code=status.HTTP_204_NO_CONTENT,
                        name="remove_category_by_id")
-async def remove_category_by_id(category_id: UUID4, db: Session = Depends(get_db),
+async def remove_category_by_id(category_id: UUID4, db: AsyncSession = Depends(get_db),
                                 is_admin: UserOutSchema = Depends(check_admin)):
     try:
         if is_admin:
-            is_category = db.query(Category).filter(Category.id == category_id).first()  # type:ignore
-            db.delete(is_category)
-            db.commit()
-            logger.info(f"Category {category_id} removed successfully!")
+            is_category = await db.get(Category, category_id)
+            await db.delete(is_category)
+            await db.commit()
+            # Posts embed their category
+            await invalidate_responses("categories", f"category:{category_id}", "posts", "post_details")
+            logger.info("Category {} removed successfully!", category_id)
     except Exception as e:
-        logger.error(f"Failed to remove category: {e}")
+        logger.error("Failed to remove category: {}", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to remove category: {e}")
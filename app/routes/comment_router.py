@@ -1,71 +1,261 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from uuid import UUID
-from sqlalchemy.orm import Session
+import asyncio
+
+from fastapi import (APIRouter, Depends, HTTPException, Query, status, Request, WebSocket, WebSocketDisconnect,
+                     WebSocketException)
+from fastapi.responses import StreamingResponse
+from uuid import UUID, uuid4
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .auth_router import get_current_user
 from ..schemas.user_schema import UserOutSchema
 from ..utils.logger_handler import logger
-from ..db.config import get_db
+from ..db.config import ReadSessionLocal, get_db, get_read_db
 from ..models.app_models import Post, Comment
-from ..schemas.comment_schema import CommentOutSchema, CommentCreateSchema
+from ..schemas.comment_schema import (CommentPageSchema, CommentCreateSchema, CommentDeletedSchema, CommentOutSchema,
+                                      CommentThreadSchema)
+from ..utils.counter_handler import change_comment_count, change_reply_count
+from ..utils.comment_stream_handler import (COMMENT_STREAM_HEARTBEAT_SECONDS, Subscription, comment_broker,
+                                            publish_comment_event, sse_message)
+from ..utils.comment_tree_handler import (COMMENT_DEFAULT_DEPTH, COMMENT_MAX_DEPTH, COMMENT_MAX_REPLIES, comment_path,
+                                          fetch_replies, load_threads, nest, subtree_filter)
+from ..utils.http_cache_handler import cached_response, invalidate_responses
+from ..utils.outbox_handler import enqueue, notify_outbox
+from ..utils.pagination_handler import PageParams, page_params, paginate
+from ..utils.rate_limit_handler import COMMENT_CREATE_LIMIT, PUBLIC_READ_LIMIT, rate_limit
+from ..utils.trending_handler import COMMENT_WEIGHT, add_post_event, trending_index
 
 comment_route = APIRouter(prefix="/api/v1/comment", tags=["My Comment Route"])
 
+COMMENTS_MAX_AGE = 10
+
+
+def reply_depth(depth: int = Query(default=COMMENT_DEFAULT_DEPTH, ge=0, le=COMMENT_MAX_DEPTH,
+                                   description="Levels of replies nested under each comment")) -> int:
+    return depth
+
+
+async def get_post_comment(db: AsyncSession, post_id: UUID, comment_id: UUID) -> Comment:
+    is_comment = await db.get(Comment, comment_id)
+    if is_comment is None or is_comment.post_id != post_id:
+        logger.warning("Comment {} not found under post {}", comment_id, post_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Comment {comment_id} does not exist")
+    return is_comment
+
+
+@comment_route.get("/all/{post_id}", status_code=status.HTTP_200_OK, response_model=CommentPageSchema)
+async def get_all_comments(request: Request, post_id: UUID, page: PageParams = Depends(page_params),
+                           depth: int = Depends(reply_depth), db: AsyncSession = Depends(get_read_db)):
+    """The post's threads, newest first, each with its newest replies nested `depth` levels down."""
+    async def build():
+        is_post = await db.get(Post, post_id)
+        if is_post is None:
+            logger.warning("Post does not found")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
+
+        stmt = select(Comment).where(Comment.post_id == post_id, Comment.depth == 0)  # type:ignore
+        threads = await load_threads(db, await paginate(db, stmt, Comment, page), depth)
+        return CommentPageSchema.model_validate(threads)
+
+    return await cached_response(request, build, tags=[f"comments:{post_id}", "comments"], max_age=COMMENTS_MAX_AGE)
+
+
+@comment_route.get("/replies/{post_id}/{comment_id}", status_code=status.HTTP_200_OK,
+                   response_model=CommentPageSchema)
+async def get_replies(request: Request, post_id: UUID, comment_id: UUID, page: PageParams = Depends(page_params),
+                      depth: int = Depends(reply_depth), db: AsyncSession = Depends(get_read_db)):
+    """Page through a comment's direct replies, newest first, nested like /all."""
+    async def build():
+        await get_post_comment(db, post_id, comment_id)
+        stmt = select(Comment).where(Comment.parent_id == comment_id)  # type:ignore
+        replies = await load_threads(db, await paginate(db, stmt, Comment, page), depth)
+        return CommentPageSchema.model_validate(replies)
+
+    return await cached_response(request, build, tags=[f"comments:{post_id}", "comments"], max_age=COMMENTS_MAX_AGE)
+
 
-@comment_route.get("/all/{post_id}", status_code=status.HTTP_200_OK, response_model=list[CommentOutSchema])
-async def get_all_comments(post_id: UUID, db: Session = Depends(get_db)):
-    is_post = db.query(Post).filter(Post.id == post_id).first()  # type:ignore
+@comment_route.get("/thread/{post_id}/{comment_id}", status_code=status.HTTP_200_OK,
+                   response_model=CommentThreadSchema)
+async def get_thread(request: Request, post_id: UUID, comment_id: UUID,
+                     depth: int = Query(default=COMMENT_MAX_DEPTH, ge=0, le=COMMENT_MAX_DEPTH),
+                     db: AsyncSession = Depends(get_read_db)):
+    """
+    A comment with its whole subtree down to `depth` levels, from one range
+    scan over the path index. Large threads are cut at COMMENT_MAX_REPLIES,
+    shallowest replies kept first.
+    """
+    async def build():
+        is_comment = await get_post_comment(db, post_id, comment_id)
+        replies = await fetch_replies(db, [is_comment], depth, per_parent=COMMENT_MAX_REPLIES)
+        return nest([is_comment], replies)[0]
+
+    return await cached_response(request, build, tags=[f"comments:{post_id}", "comments"], max_age=COMMENTS_MAX_AGE)
+
+
+async def subscribe_to_post(post_id: UUID) -> Subscription:
+    # A short session of its own: the stream outlives the request and must not hold a connection
+    async with ReadSessionLocal() as db:
+        is_post = await db.get(Post, post_id)
     if is_post is None:
         logger.warning("Post does not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
 
-    all_comments = db.query(Comment).filter(Comment.post_id == post_id).all()  # type:ignore
-    return all_comments
+    subscription = comment_broker.subscribe(post_id)
+    if subscription is None:
+        logger.warning("Comment stream limit reached, rejecting subscriber of post {}", post_id)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many open comment streams")
+    return subscription
+
+
+@comment_route.get("/stream/{post_id}", status_code=status.HTTP_200_OK, response_class=StreamingResponse,
+                   dependencies=[Depends(rate_limit(PUBLIC_READ_LIMIT))])
+async def stream_comments(post_id: UUID):
+    """
+    Server-Sent Events of the post's comments: comment_created and
+    comment_deleted as they are committed. A resync event ends the stream
+    when the client fell too far behind; refetch /all and reconnect.
+    """
+    subscription = await subscribe_to_post(post_id)
+
+    async def events():
+        try:
+            # Reconnect delay for EventSource
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await subscription.next(COMMENT_STREAM_HEARTBEAT_SECONDS)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    yield sse_message(("resync", "{}"))
+                    return
+                yield sse_message(event)
+        finally:
+            comment_broker.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
-@comment_route.post("/create/{post_id}", status_code=status.HTTP_201_CREATED)
-async def create_comment(post_id: UUID, new_comment: CommentCreateSchema, db: Session = Depends(get_db),
+@comment_route.websocket("/ws/{post_id}")
+async def comments_websocket(websocket: WebSocket, post_id: UUID):
+    """Same events as /stream, as {"event": ..., "data": ...} text frames."""
+    try:
+        subscription = await subscribe_to_post(post_id)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+    await websocket.accept()
+
+    async def close_on_disconnect():
+        # Clients don't send anything; this only notices them leaving between events
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        comment_broker.unsubscribe(subscription)
+        subscription.close()
+
+    watcher = asyncio.create_task(close_on_disconnect())
+    try:
+        while True:
+            try:
+                event = await subscription.next(COMMENT_STREAM_HEARTBEAT_SECONDS)
+            except TimeoutError:
+                await websocket.send_text('{"event":"keep-alive"}')
+                continue
+            if event is None:
+                if subscription.dropped:
+                    await websocket.send_text('{"event":"resync"}')
+                    # 1013 Try Again Later: the client fell behind
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            name, data = event
+            await websocket.send_text(f'{{"event":"{name}","data":{data}}}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        comment_broker.unsubscribe(subscription)
+
+
+@comment_route.post("/create/{post_id}", status_code=status.HTTP_201_CREATED,
+                    dependencies=[Depends(rate_limit(COMMENT_CREATE_LIMIT, get_current_user))])
+async def create_comment(post_id: UUID, new_comment: CommentCreateSchema, db: AsyncSession = Depends(get_db),
                          current_user: UserOutSchema = Depends(get_current_user)):
-    is_post = db.query(Post).filter(Post.id == post_id).first()  # type:ignore
+    is_post = await db.get(Post, post_id)
     if is_post is None:
         logger.warning("Post does not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
 
+    parent = None
+    if new_comment.parent_id is not None:
+        parent = await get_post_comment(db, post_id, new_comment.parent_id)
+        if parent.depth >= COMMENT_MAX_DEPTH:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Replies can not be nested more than {COMMENT_MAX_DEPTH} levels deep")
+
     try:
+        comment_id = uuid4()
         create_new_comment = Comment(
+            id=comment_id,
             content=new_comment.content,
             user_id=current_user.id,
-            post_id=post_id
+            post_id=post_id,
+            parent_id=parent.id if parent else None,
+            path=comment_path(comment_id, parent.path if parent else None),
+            depth=parent.depth + 1 if parent else 0,
         )
         db.add(create_new_comment)
-        db.commit()
-        logger.info(f"Comment '{new_comment.content}' created successfully!")
+        await db.flush()
+        await change_comment_count(db, post_id, 1)
+        await change_reply_count(db, new_comment.parent_id, 1)
+        hot_score = await add_post_event(db, post_id, COMMENT_WEIGHT)
+        await enqueue(db, "index_comment", {"comment_id": str(create_new_comment.id)},
+                      f"index_comment:{create_new_comment.id}")
+        await db.commit()
+        notify_outbox()
+        # Post responses embed the comment count
+        await invalidate_responses(f"comments:{post_id}", f"post:{post_id}", "posts")
+        # Ranked right away; /trending responses pick it up on the next refresh
+        trending_index.offer(post_id, is_post.category_id, hot_score)
+        await publish_comment_event(post_id, "comment_created",
+                                    CommentOutSchema.model_validate(create_new_comment, from_attributes=True))
+        logger.info("Comment {} created successfully!", create_new_comment.id)
 
     except Exception as e:
-        logger.error(f"Failed to create comment: {e}")
+        logger.error("Failed to create comment: {}", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create comment: {e}")
 
 
 @comment_route.delete("/remove/{post_id}/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_comment(post_id: UUID, comment_id: UUID, db: Session = Depends(get_db),
+async def remove_comment(post_id: UUID, comment_id: UUID, db: AsyncSession = Depends(get_db),
                          current_user: UserOutSchema = Depends(get_current_user)):
-    is_post = db.query(Post).filter(Post.id == post_id).first()  # type:ignore
+    is_post = await db.get(Post, post_id)
     if is_post is None:
-        logger.warning(f"Post {post_id} not found")
+        logger.warning("Post {} not found", post_id)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not exist")
 
-    is_comment = db.query(Comment).filter(Comment.user_id == current_user.id).filter(  # type:ignore
-        Comment.id == comment_id).first()
+    is_comment = await db.scalar(select(Comment).where(Comment.user_id == current_user.id).where(  # type:ignore
+        Comment.id == comment_id, Comment.post_id == post_id))
 
     if is_comment is None:
-        logger.warning(f"Comment {comment_id} not found for user {current_user.id}")
+        logger.warning("Comment {} not found for user {}", comment_id, current_user.id)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Comment {comment_id} does not exist")
 
     try:
-        db.delete(is_comment)
-        db.commit()
-        logger.info(f"Comment '{comment_id}' removed successfully by user {current_user.id}")
+        # Replies go with the comment; the whole subtree is one range of the path index
+        in_subtree = or_(Comment.id == comment_id, subtree_filter(is_comment.path))  # type:ignore
+        removed_ids = list(await db.scalars(select(Comment.id).where(in_subtree)))
+        await db.execute(delete(Comment).where(in_subtree).execution_options(synchronize_session=False))
+        await change_comment_count(db, is_comment.post_id, -len(removed_ids))
+        await change_reply_count(db, is_comment.parent_id, -1)
+        await enqueue(db, "unindex_comments", {"comment_ids": [str(removed_id) for removed_id in removed_ids]},
+                      f"unindex_comments:{comment_id}")
+        await db.commit()
+        notify_outbox()
+        await invalidate_responses(f"comments:{post_id}", f"post:{post_id}", "posts")
+        await publish_comment_event(post_id, "comment_deleted", CommentDeletedSchema(id=comment_id, post_id=post_id))
+        logger.info("Comment '{}' removed successfully by user {}", comment_id, current_user.id)
 
     except Exception as e:
-        logger.error(f"Failed to remove comment: {e}")
+        logger.error("Failed to remove comment: {}", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to remove comment: {e}")
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+
+from .auth_router import get_current_user
+from ..schemas.media_schema import MediaPresignOutSchema, MediaPresignSchema
+from ..schemas.user_schema import UserOutSchema
+from ..utils.logger_handler import logger
+from ..utils.rate_limit_handler import POST_CREATE_LIMIT, rate_limit
+from ..utils.storage_handler import STORAGE_PRESIGN_EXPIRES, storage, verify_upload
+from ..utils.upload_image_handler import CheckedImageStream, image_key
+
+media_route = APIRouter(prefix="/api/v1/media", tags=["My Media Route"])
+
+# Announced content type -> stored extension
+UPLOAD_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png"}
+
+
+@media_route.post("/presign", response_model=MediaPresignOutSchema, status_code=status.HTTP_200_OK,
+                  dependencies=[Depends(rate_limit(POST_CREATE_LIMIT, get_current_user))])
+async def presign_upload(upload: MediaPresignSchema, current_user: UserOutSchema = Depends(get_current_user)):
+    """
+    Let the client upload an image straight to storage instead of through
+    create_post; the returned key is then passed as image_key.
+    """
+    key = image_key(upload.sha256, UPLOAD_EXTENSIONS[upload.content_type])
+    target = await storage.presign_upload(key, upload.content_type, upload.sha256, upload.size)
+    logger.info("Presigned upload of {} for user {}", key, current_user.id)
+    return MediaPresignOutSchema(key=key, expires_in=STORAGE_PRESIGN_EXPIRES, exists=await storage.exists(key),
+                                 **target)
+
+
+@media_route.put("/upload/{token}", status_code=status.HTTP_204_NO_CONTENT, include_in_schema=False)
+async def upload_presigned(token: str, request: Request):
+    """Target of the local backend's presigned URLs; S3 receives those uploads itself."""
+    claims = verify_upload(token)
+    if claims is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Upload URL is invalid or expired")
+
+    content_length = request.headers.get("content-length")
+    if content_length is not None and (not content_length.isdigit() or int(content_length) != claims["size"]):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Content-Length does not match the announced size")
+
+    key = claims["key"]
+    if not await storage.exists(key):
+        # Verified while streaming; a mismatch aborts the put before the key is written
+        checked = CheckedImageStream(request.stream(), expected_sha256=claims["sha256"],
+                                     expected_extension=UPLOAD_EXTENSIONS[claims["content_type"]])
+        await storage.put(key, checked, claims["content_type"])
+        logger.info("Image successfully uploaded: {}", key)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+
+from ..utils.metrics_handler import registry
+
+metrics_route = APIRouter(tags=["Metrics Route"])
+
+
+@metrics_route.get("/metrics", response_class=PlainTextResponse, status_code=status.HTTP_200_OK,
+                   include_in_schema=False)
+async def get_metrics():
+    # Per-worker values; scrape every worker or aggregate behind the load balancer
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,126 +1,291 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from uuid import UUID, uuid4
 
 from .auth_router import check_admin, get_current_user
-from ..db.config import get_db
-from ..models.app_models import Post, Category
-from ..schemas.post_schema import PostOutSchema
+from ..db.config import get_db, get_read_db
+from ..models.app_models import Post, Category, User
+from ..schemas.post_schema import (PostOutSchema, PostPageSchema, PostSearchPageSchema, PostSummaryPageSchema,
+                                   PostTrendingPageSchema, post_fields_page_schema)
 from ..schemas.user_schema import UserOutSchema
 from ..utils.logger_handler import logger
-from ..utils.upload_image_handler import upload_image_handler
+from ..utils import bulk_handler, search_handler
+from ..utils.counter_handler import change_post_count
+from ..utils.http_cache_handler import cached_response, invalidate_responses
+from ..utils.outbox_handler import enqueue, notify_outbox
+from ..utils.pagination_handler import PageParams, page_params, paginate
+from ..utils.projection_handler import SUMMARY_FIELDS, make_excerpt, post_fields, select_post_fields
+from ..utils.rate_limit_handler import POST_CREATE_LIMIT, PUBLIC_READ_LIMIT, rate_limit
+from ..utils.response_handler import model_response
+from ..utils.trending_handler import TRENDING_TOP_K, current_popularity, event_score, record_view, trending_index
+from ..utils.storage_handler import storage, storage_key
+from ..utils.upload_image_handler import IMAGE_KEY, upload_image_handler
 
 post_route = APIRouter(prefix="/api/v1/posts", tags=["My Post Route"])
 
+# Browser/CDN freshness for public post reads; the server-side copy lives until invalidated
+POSTS_MAX_AGE = 30
 
-@post_route.get("/all", response_model=list[PostOutSchema], status_code=status.HTTP_200_OK, )
-async def get_posts(db: Session = Depends(get_db)):
-    logger.info("All posts fetched successfully!")
-    return db.query(Post).all()
+# ?sort= value -> column the feed is ordered by
+POST_SORT_COLUMNS = {"latest": "created_at", "popular": "comment_count"}
+
+# The ranking itself only changes on each trending refresh, which drops these responses
+TRENDING_MAX_AGE = 60
+
+
+def with_post_details(stmt: Select) -> Select:
+    """Embed author and category in the same query; the comment count is a column."""
+    return stmt.options(
+        joinedload(Post.author).load_only(User.id, User.username),
+        joinedload(Post.category).load_only(Category.id, Category.name),
+    )
+
+
+def post_list_query(fields: tuple[str, ...] | None, sort_by: str = "created_at") -> Select:
+    """Full posts by default, otherwise only the columns ?fields= asked for."""
+    if fields is None:
+        return with_post_details(select(Post))
+    return select_post_fields(fields, sort_by)
+
+
+async def check_image_key(key: str) -> None:
+    """An image key from the client must name an original that is already stored."""
+    if not IMAGE_KEY.match(key) or not await storage.exists(key):
+        logger.warning("Image {} is not stored", key)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Image {key} is not uploaded")
+
+
+def post_list_schema(fields: tuple[str, ...] | None):
+    if fields is None:
+        return PostPageSchema
+    if fields == SUMMARY_FIELDS:
+        return PostSummaryPageSchema
+    return post_fields_page_schema(fields)
+
+
+@post_route.get("/all", response_model=PostPageSchema, status_code=status.HTTP_200_OK,
+                dependencies=[Depends(rate_limit(PUBLIC_READ_LIMIT))])
+async def get_posts(request: Request, page: PageParams = Depends(page_params),
+                    sort: str = Query(default="latest", pattern="^(latest|popular)$"),
+                    fields: tuple[str, ...] | None = Depends(post_fields),
+                    db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        logger.info("All posts fetched successfully!")
+        sort_by = POST_SORT_COLUMNS[sort]
+        all_posts = await paginate(db, post_list_query(fields, sort_by), Post, page, sort_by=sort_by)
+        return post_list_schema(fields).model_validate(all_posts, from_attributes=True)
+
+    return await cached_response(request, build, tags=["posts"], max_age=POSTS_MAX_AGE)
+
+
+@post_route.get("/search", response_model=PostSearchPageSchema, status_code=status.HTTP_200_OK,
+                dependencies=[Depends(rate_limit(PUBLIC_READ_LIMIT))])
+async def search_posts(q: str = Query(..., min_length=1, max_length=200),
+                       category_id: UUID | None = Query(default=None),
+                       author_id: UUID | None = Query(default=None),
+                       page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_read_db)):
+    result = await search_handler.search_posts(db, q, page, category_id=category_id, author_id=author_id)
+
+    post_ids = [post_id for post_id, _, _ in result["hits"]]
+    found_posts = await db.scalars(with_post_details(select(Post).where(Post.id.in_(post_ids))))  # type:ignore
+    posts_by_id = {post.id: post for post in found_posts}
+
+    items = []
+    for post_id, score, snippet in result["hits"]:
+        if post_id in posts_by_id:
+            post = PostOutSchema.model_validate(posts_by_id[post_id], from_attributes=True)
+            items.append({**post.model_dump(), "snippet": snippet, "score": score})
+    return model_response(PostSearchPageSchema.model_validate({"items": items, "next_cursor": result["next_cursor"]}))
+
+
+@post_route.get("/trending", response_model=PostTrendingPageSchema, status_code=status.HTTP_200_OK,
+                dependencies=[Depends(rate_limit(PUBLIC_READ_LIMIT))])
+async def get_trending_posts(request: Request, category_id: UUID | None = Query(default=None),
+                             limit: int = Query(default=20, ge=1, le=TRENDING_TOP_K),
+                             db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        ranked = trending_index.top(category_id, limit)
+        found_posts = await db.scalars(with_post_details(  # type:ignore
+            select(Post).where(Post.id.in_([post_id for post_id, _ in ranked]))))
+        posts_by_id = {post.id: post for post in found_posts}
+
+        items = []
+        for post_id, hot_score in ranked:
+            if post_id in posts_by_id:
+                post = PostOutSchema.model_validate(posts_by_id[post_id], from_attributes=True)
+                items.append({**post.model_dump(), "score": round(current_popularity(hot_score), 4)})
+        return PostTrendingPageSchema.model_validate({"items": items})
+
+    return await cached_response(request, build, tags=["trending"], max_age=TRENDING_MAX_AGE)
 
 
 @post_route.get("/{post_id}", response_model=PostOutSchema, status_code=status.HTTP_200_OK)
-async def get_post_by_id(post_id: UUID, db: Session = Depends(get_db)):
-    is_post = db.query(Post).filter(Post.id == post_id).first()  # type:ignore
-    if is_post is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
-    logger.info(f"Post {is_post.title} fetched successfully!")
-    return is_post
+async def get_post_by_id(request: Request, post_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        is_post = await db.scalar(with_post_details(select(Post).where(Post.id == post_id)))  # type:ignore
+        if is_post is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
+        logger.info("Post {} fetched successfully!", is_post.title)
+        return PostOutSchema.model_validate(is_post, from_attributes=True)
 
+    response = await cached_response(request, build, tags=[f"post:{post_id}", "post_details"], max_age=POSTS_MAX_AGE)
+    # Only once the post is known to exist, cached reads included; folded into hot_score on refresh
+    record_view(post_id)
+    return response
 
-@post_route.post("/create", status_code=status.HTTP_201_CREATED)
+
+@post_route.post("/create", status_code=status.HTTP_201_CREATED,
+                 dependencies=[Depends(rate_limit(POST_CREATE_LIMIT, get_current_user))])
 async def create_post(new_title: str = Form(..., min_length=3, max_length=100),
                       new_content: str = Form(..., min_length=3),
                       new_category_id: UUID = Form(...),
-                      image: UploadFile = File(...), db: Session = Depends(get_db),
+                      image: UploadFile | None = File(None),
+                      image_key: str | None = Form(None, description="Key of an image uploaded via /media/presign"),
+                      db: AsyncSession = Depends(get_db),
                       current_user: UserOutSchema = Depends(get_current_user)):
-    is_category_available = db.query(Category).filter(Category.id == new_category_id).first()  # type:ignore
+    if (image is None) == (image_key is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Send either image or image_key")
+
+    is_category_available = await db.get(Category, new_category_id)
     if is_category_available is None:
         logger.warning("Category does not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Category {new_category_id} does not found")
 
-    unique_filename = await upload_image_handler(image)
+    if image is not None:
+        image_key = await upload_image_handler(image)
+    else:
+        await check_image_key(image_key)
 
     create_new_post = Post(
         title=new_title,
         content=new_content,
-        image=unique_filename,
+        excerpt=make_excerpt(new_content),
+        image=image_key,
         category_id=new_category_id,
-        user_id=current_user.id
+        user_id=current_user.id,
+        hot_score=event_score()
     )
     try:
         db.add(create_new_post)
-        db.commit()
-        logger.info(f"Post '{new_title}' created successfully!")
+        await db.flush()
+        await change_post_count(db, new_category_id, current_user.id, 1)
+        # Search indexing, thumbnails and WebP are done by the outbox worker after the response is sent
+        await enqueue(db, "index_post", {"post_id": str(create_new_post.id)}, f"index_post:{create_new_post.id}")
+        await enqueue(db, "process_post_image", {"post_id": str(create_new_post.id), "image_key": image_key},
+                      f"process_post_image:{create_new_post.id}")
+        await db.commit()
+        notify_outbox()
+        # Categories embed their post count
+        await invalidate_responses("posts", "categories", f"category:{new_category_id}")
+        trending_index.offer(create_new_post.id, new_category_id, create_new_post.hot_score)
+        logger.info("Post '{}' created successfully!", new_title)
     except Exception as e:
-        logger.error(f"Failed to create post: {new_title}")
+        logger.error("Failed to create post: {}", new_title)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create post: {e}")
 
 
-@post_route.get("/all/by_user", status_code=status.HTTP_200_OK)
-async def get_post_by_id(db: Session = Depends(get_db), current_user: UserOutSchema = Depends(get_current_user)):
-    fetch_posts_of_user = db.query(Post).filter(Post.user_id == current_user.id).all()  # type:ignore
-    return fetch_posts_of_user
+@post_route.get("/all/by_user", response_model=PostPageSchema, status_code=status.HTTP_200_OK)
+async def get_post_by_id(page: PageParams = Depends(page_params), fields: tuple[str, ...] | None = Depends(post_fields),
+                         db: AsyncSession = Depends(get_db),
+                         current_user: UserOutSchema = Depends(get_current_user)):
+    stmt = post_list_query(fields).where(Post.user_id == current_user.id)  # type:ignore
+    fetch_posts_of_user = await paginate(db, stmt, Post, page)
+    return model_response(post_list_schema(fields).model_validate(fetch_posts_of_user, from_attributes=True))
 
 
-@post_route.get("/all/by_category/{category_id}", response_model=list[PostOutSchema], status_code=status.HTTP_200_OK)
-async def get_post_by_id(category_id: UUID, db: Session = Depends(get_db)):
-    is_category = db.query(Category).filter(Category.id == category_id).first()  # type:ignore
+@post_route.get("/all/by_category/{category_id}", response_model=PostPageSchema, status_code=status.HTTP_200_OK,
+                dependencies=[Depends(rate_limit(PUBLIC_READ_LIMIT))])
+async def get_post_by_id(request: Request, category_id: UUID, page: PageParams = Depends(page_params),
+                         fields: tuple[str, ...] | None = Depends(post_fields),
+                         db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        is_category = await db.get(Category, category_id)
 
-    if is_category is None:
-        logger.warning("Category does not found")
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Category {category_id} does not found")
+        if is_category is None:
+            logger.warning("Category does not found")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Category {category_id} does not found")
 
-    all_posts_by_category = db.query(Post).filter(Post.category_id == category_id).all()  # type:ignore
-    return all_posts_by_category
+        stmt = post_list_query(fields).where(Post.category_id == category_id)  # type:ignore
+        all_posts_by_category = await paginate(db, stmt, Post, page)
+        return post_list_schema(fields).model_validate(all_posts_by_category, from_attributes=True)
+
+    return await cached_response(request, build, tags=["posts", f"category:{category_id}"], max_age=POSTS_MAX_AGE)
 
 
 @post_route.get("/by_user/{post_id}", response_model=PostOutSchema, status_code=status.HTTP_200_OK)
-async def get_post_by_id(post_id: UUID, db: Session = Depends(get_db),
+async def get_post_by_id(post_id: UUID, db: AsyncSession = Depends(get_db),
                          current_user: UserOutSchema = Depends(get_current_user)):
-    is_post = db.query(Post).filter(Post.user_id == current_user.id).filter(Post.id == post_id).first()  # type:ignore
+    is_post = await db.scalar(with_post_details(  # type:ignore
+        select(Post).where(Post.user_id == current_user.id).where(Post.id == post_id)))
     if is_post is None:
         logger.warning("Post does not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
-    logger.info(f"Post {is_post.title} fetched successfully!")
+    logger.info("Post {} fetched successfully!", is_post.title)
     return is_post
 
 
 @post_route.put("/update/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def update_post_by_id(new_post_data: PostOutSchema, post_id: UUID, db: Session = Depends(get_db),
+async def update_post_by_id(new_post_data: PostOutSchema, post_id: UUID, db: AsyncSession = Depends(get_db),
                             current_user: UserOutSchema = Depends(get_current_user)):
-    is_post = db.query(Post).filter(Post.user_id == current_user.id).filter(  # type:ignore
-        Post.id == new_post_data.id).first()
+    is_post = await db.scalar(select(Post).where(Post.user_id == current_user.id).where(  # type:ignore
+        Post.id == new_post_data.id))
     if is_post is None:
         logger.warning("Post does not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
 
+    new_image_key = storage_key(new_post_data.image) if new_post_data.image else None
+    image_changed = new_image_key is not None and new_image_key != is_post.image
+    if image_changed:
+        await check_image_key(new_image_key)
+
     try:
+        old_category_id = is_post.category_id
         is_post.title = new_post_data.title if new_post_data.title else is_post.title
         is_post.content = new_post_data.content if new_post_data.content else is_post.content
+        is_post.excerpt = make_excerpt(is_post.content)
         is_post.category_id = new_post_data.category_id if new_post_data.category_id else is_post.category_id
-        is_post.image = new_post_data.image if new_post_data.image else is_post.image
+        if image_changed:
+            is_post.image = new_image_key
+            # Variants of the previous image no longer apply
+            is_post.image_variants = None
 
-        db.commit()
-        logger.info(f"Post {is_post.title} updated successfully!")
+        if is_post.category_id != old_category_id:
+            await change_post_count(db, old_category_id, None, -1)
+            await change_post_count(db, is_post.category_id, None, 1)
+        # Every update is its own event: an earlier one may already be done
+        update_id = uuid4().hex
+        await enqueue(db, "index_post", {"post_id": str(is_post.id)}, f"index_post:{is_post.id}:{update_id}")
+        if image_changed:
+            await enqueue(db, "process_post_image", {"post_id": str(is_post.id), "image_key": is_post.image},
+                          f"process_post_image:{is_post.id}:{update_id}")
+        await db.commit()
+        notify_outbox()
+        await invalidate_responses("posts", f"post:{is_post.id}", "categories",
+                                   f"category:{old_category_id}", f"category:{is_post.category_id}")
+        if is_post.category_id != old_category_id:
+            trending_index.discard(is_post.id)
+            trending_index.offer(is_post.id, is_post.category_id, is_post.hot_score)
+        logger.info("Post {} updated successfully!", is_post.title)
     except Exception as e:
-        logger.error(f"Failed to update post: {is_post.title}")
+        logger.error("Failed to update post: {}", is_post.title)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to update post: {e}")
 
 
 @post_route.delete("/remove/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_post_by_id(post_id: UUID,
-                            db: Session = Depends(get_db),
+                            db: AsyncSession = Depends(get_db),
                             current_user: UserOutSchema = Depends(get_current_user)):
-    is_post = db.query(Post).filter(Post.user_id == current_user.id).filter(Post.id == post_id).first()  # type:ignore
+    is_post = await db.scalar(select(Post).where(Post.user_id == current_user.id).where(Post.id == post_id))  # type:ignore
 
     if is_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post {post_id} does not found")
-    try:
-        db.delete(is_post)
-        db.commit()
-        logger.info(f"Post {post_id} removed successfully!")
-    except Exception as e:
-        logger.error(f"Failed to remove post: {post_id}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to remove post: {e}")
+    # Comments, search entries and counters go with the post, as in the admin bulk delete
+    [result] = await bulk_handler.delete_posts(db, [post_id])
+    if result["status"] != "deleted":
+        logger.error("Failed to remove post: {}", post_id)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=f"Failed to remove post: {result['detail']}")
+    logger.info("Post {} removed successfully!", post_id)
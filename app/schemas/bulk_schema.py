@@ -0,0 +1,69 @@
+from datetime import datetime
+from os import getenv
+
+from pydantic import BaseModel, Field, UUID4, model_validator
+
+BULK_MAX_ITEMS = int(getenv("BULK_MAX_ITEMS", "10000"))
+
+
+class BulkPostDeleteSchema(BaseModel):
+    ids: list[UUID4] | None = Field(default=None, min_length=1, max_length=BULK_MAX_ITEMS)
+    author_id: UUID4 | None = Field(default=None)
+    category_id: UUID4 | None = Field(default=None)
+    created_before: datetime | None = Field(default=None)
+
+    @model_validator(mode="after")
+    def check_selector(self):
+        has_filter = any(value is not None for value in (self.author_id, self.category_id, self.created_before))
+        if (self.ids is None) == (not has_filter):
+            raise ValueError("Provide either ids or at least one filter, not both")
+        return self
+
+
+class BulkUserDeleteSchema(BaseModel):
+    ids: list[UUID4] | None = Field(default=None, min_length=1, max_length=BULK_MAX_ITEMS)
+    # Inactive, non admin users created before this date
+    inactive_before: datetime | None = Field(default=None)
+
+    @model_validator(mode="after")
+    def check_selector(self):
+        if (self.ids is None) == (self.inactive_before is None):
+            raise ValueError("Provide either ids or inactive_before")
+        return self
+
+
+class PostImportSchema(BaseModel):
+    title: str = Field(..., min_length=3, max_length=100)
+    content: str = Field(..., min_length=3)
+    category_id: UUID4 = Field(...)
+    # Defaults to the importing admin
+    user_id: UUID4 | None = Field(default=None)
+
+
+class PostImportBatchSchema(BaseModel):
+    items: list[PostImportSchema] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+# Imported comments start threads of their own
+class CommentImportSchema(BaseModel):
+    post_id: UUID4 = Field(...)
+    content: str = Field(..., min_length=1)
+    user_id: UUID4 | None = Field(default=None)
+
+
+class CommentImportBatchSchema(BaseModel):
+    items: list[CommentImportSchema] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkItemResultSchema(BaseModel):
+    # Position in the request for imports, None for deletes
+    index: int | None = Field(default=None)
+    id: UUID4 | None = Field(default=None)
+    status: str = Field(...)
+    detail: str | None = Field(default=None)
+
+
+class BulkResultSchema(BaseModel):
+    succeeded: int = Field(...)
+    failed: int = Field(...)
+    results: list[BulkItemResultSchema] = Field(...)
@@ -12,9 +12,15 @@ class CategoryOutSchema(BaseModel):
     id: UUID4 = Field(...)
     name: str = Field(...)
     description: str = Field(...)
+    post_count: int = Field(default=0)
 
     created_at: datetime = Field(...)
     updated_at: datetime = Field(...)
 
     class Config:
         from_attributes = True
+
+
+class CategoryPageSchema(BaseModel):
+    items: list[CategoryOutSchema] = Field(...)
+    next_cursor: str | None = Field(default=None)
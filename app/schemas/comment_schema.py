@@ -5,6 +5,8 @@ from pydantic import BaseModel, Field, UUID4
 
 class CommentCreateSchema(BaseModel):
     content: str = Field(...)
+    # Reply to this comment of the same post; None starts a new thread
+    parent_id: UUID4 | None = Field(default=None)
 
 
 class CommentOutSchema(BaseModel):
@@ -12,5 +14,23 @@ class CommentOutSchema(BaseModel):
     content: str = Field(...)
     post_id: UUID4 = Field(...)
     user_id: UUID4 = Field(...)
+    parent_id: UUID4 | None = Field(default=None)
+    depth: int = Field(default=0)
+    reply_count: int = Field(default=0)
     created_at: datetime = Field(...)
     updated_at: datetime = Field(...)
+
+
+class CommentThreadSchema(CommentOutSchema):
+    # Newest first and possibly cut short; compare with reply_count and page through /replies for the rest
+    replies: list["CommentThreadSchema"] = Field(default_factory=list)
+
+
+class CommentPageSchema(BaseModel):
+    items: list[CommentThreadSchema] = Field(...)
+    next_cursor: str | None = Field(default=None)
+
+
+class CommentDeletedSchema(BaseModel):
+    id: UUID4 = Field(...)
+    post_id: UUID4 = Field(...)
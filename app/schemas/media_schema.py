@@ -0,0 +1,23 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from ..utils.upload_image_handler import MAX_IMAGE_BYTES
+
+
+class MediaPresignSchema(BaseModel):
+    content_type: Literal["image/jpeg", "image/png"] = Field(...)
+    size: int = Field(..., gt=0, le=MAX_IMAGE_BYTES)
+    # Hex digest of the file; it names the object and the store checks the body against it
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+
+
+class MediaPresignOutSchema(BaseModel):
+    # Pass as image_key to /posts/create once uploaded
+    key: str = Field(...)
+    url: str = Field(...)
+    method: str = Field(...)
+    headers: dict[str, str] = Field(...)
+    expires_in: int = Field(...)
+    # Already stored: skip the upload and use the key right away
+    exists: bool = Field(...)
@@ -1,5 +1,13 @@
 from datetime import datetime
-from pydantic import BaseModel, Field, UUID4
+from functools import lru_cache
+from typing import Annotated
+
+from pydantic import BaseModel, Field, PlainSerializer, UUID4, create_model
+
+from ..utils.storage_handler import media_url
+
+# A storage key in the DB, its public URL in JSON responses
+MediaKey = Annotated[str, PlainSerializer(media_url, return_type=str, when_used="json")]
 
 
 class PostCreateSchema(BaseModel):
@@ -8,15 +16,83 @@ class PostCreateSchema(BaseModel):
     category_id: UUID4 = Field(...)
 
 
+class PostAuthorSchema(BaseModel):
+    id: UUID4 = Field(...)
+    username: str = Field(...)
+
+
+class PostCategorySchema(BaseModel):
+    id: UUID4 = Field(...)
+    name: str = Field(...)
+
+
 class PostOutSchema(BaseModel):
     id: UUID4 = Field(...)
     title: str = Field(...)
     content: str = Field(...)
-    image: str | None = Field(default=None)
+    image: MediaKey | None = Field(default=None)
+    image_variants: dict[str, MediaKey] | None = Field(default=None)
+    author: PostAuthorSchema | None = Field(default=None)
+    category: PostCategorySchema | None = Field(default=None)
+    comment_count: int = Field(default=0)
+    created_at: datetime
+    updated_at: datetime
+
+
+class PostPageSchema(BaseModel):
+    items: list[PostOutSchema] = Field(...)
+    next_cursor: str | None = Field(default=None)
+
+
+class PostSearchHitSchema(PostOutSchema):
+    snippet: str = Field(...)
+    score: float = Field(...)
+
+
+class PostSearchPageSchema(BaseModel):
+    items: list[PostSearchHitSchema] = Field(...)
+    next_cursor: str | None = Field(default=None)
+
+
+class PostTrendingSchema(PostOutSchema):
+    # Decayed weighted activity (posts, comments, views) as of the last refresh
+    score: float = Field(...)
+
+
+class PostTrendingPageSchema(BaseModel):
+    items: list[PostTrendingSchema] = Field(...)
+
+
+class PostSummarySchema(BaseModel):
+    id: UUID4 = Field(...)
+    title: str = Field(...)
+    excerpt: str | None = Field(default=None)
+    image: MediaKey | None = Field(default=None)
     created_at: datetime
     updated_at: datetime
 
 
+class PostSummaryPageSchema(BaseModel):
+    items: list[PostSummarySchema] = Field(...)
+    next_cursor: str | None = Field(default=None)
+
+
+class PostFieldsSchema(PostOutSchema):
+    # Every field ?fields= can select
+    excerpt: str | None = Field(default=None)
+
+
+@lru_cache(maxsize=256)
+def post_fields_page_schema(fields: tuple[str, ...]) -> type[BaseModel]:
+    """Page schema holding only `fields` of PostFieldsSchema, built once per combination."""
+    item_schema = create_model(
+        "PostPartialSchema",
+        **{name: (field.annotation, field) for name, field in PostFieldsSchema.model_fields.items() if name in fields},
+    )
+    return create_model("PostPartialPageSchema", items=(list[item_schema], Field(...)),
+                        next_cursor=(str | None, Field(default=None)))
+
+
 class PostUpdateSchema(BaseModel):
     title: str | None = Field(default=None, min_length=3, max_length=100)
     content: str | None = Field(default=None, min_length=3)
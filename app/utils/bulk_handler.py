@@ -0,0 +1,256 @@
+from collections import Counter
+from datetime import datetime
+from os import getenv
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.app_models import Category, Comment, Post, User
+from ..schemas.bulk_schema import CommentImportSchema, PostImportSchema
+from ..utils import search_handler
+from ..utils.comment_tree_handler import comment_path, subtree_filter
+from ..utils.counter_handler import recount
+from ..utils.http_cache_handler import invalidate_responses
+from ..utils.logger_handler import logger
+from ..utils.outbox_handler import enqueue, notify_outbox
+from ..utils.projection_handler import make_excerpt
+from ..utils.trending_handler import COMMENT_WEIGHT, bump_scores, event_score, trending_index
+
+# Rows per statement/transaction; keeps IN lists and VALUES under driver parameter limits
+BULK_CHUNK_SIZE = int(getenv("BULK_CHUNK_SIZE", "500"))
+
+
+def chunked(items: list, size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def _result(status: str, item_id: UUID | None = None, index: int | None = None, detail: str | None = None) -> dict:
+    return {"index": index, "id": item_id, "status": status, "detail": detail}
+
+
+def summarize(results: list[dict], success: str) -> dict:
+    succeeded = sum(1 for result in results if result["status"] == success)
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+async def _remove_posts(db: AsyncSession, posts: list) -> None:
+    """
+    Delete (id, category_id, user_id) post rows with their comments and search
+    entries and fix the counters, inside the caller's transaction.
+    """
+    post_ids = [post.id for post in posts]
+    # Comments go with their post instead of being left behind with a NULL post_id
+    await db.execute(delete(Comment).where(Comment.post_id.in_(post_ids))  # type:ignore
+                     .execution_options(synchronize_session=False))
+    await enqueue(db, "unindex_posts", {"post_ids": [str(post_id) for post_id in post_ids]},
+                  f"unindex_posts:{uuid4().hex}")
+    await db.execute(delete(Post).where(Post.id.in_(post_ids))  # type:ignore
+                     .execution_options(synchronize_session=False))
+    await recount(db, Category, {post.category_id for post in posts})
+    await recount(db, User, {post.user_id for post in posts})
+
+
+async def _remove_comments(db: AsyncSession, comments: list) -> None:
+    """
+    Delete (id, path, post_id, parent_id) comment rows with their replies, as
+    removing a single comment does, and fix the counters inside the caller's
+    transaction.
+    """
+    removed_ids = set()
+    for _, batch in chunked(comments):
+        in_subtrees = or_(*(or_(Comment.id == comment.id, subtree_filter(comment.path))  # type:ignore
+                            for comment in batch))
+        removed_ids.update(await db.scalars(select(Comment.id).where(in_subtrees)))
+        await db.execute(delete(Comment).where(in_subtrees).execution_options(synchronize_session=False))
+    if not removed_ids:
+        return
+
+    await recount(db, Post, {comment.post_id for comment in comments})
+    await recount(db, Comment, {comment.parent_id for comment in comments} - removed_ids - {None})
+    await enqueue(db, "unindex_comments", {"comment_ids": [str(comment_id) for comment_id in removed_ids]},
+                  f"unindex_comments:{uuid4().hex}")
+
+
+async def delete_posts(db: AsyncSession, post_ids: list[UUID]) -> list[dict]:
+    """Delete posts together with their comments and search entries, one transaction per chunk."""
+    results = []
+    for _, chunk in chunked(list(dict.fromkeys(post_ids))):
+        found = {row.id: row for row in await db.execute(
+            select(Post.id, Post.category_id, Post.user_id).where(Post.id.in_(chunk)))}  # type:ignore
+        existing = [post_id for post_id in chunk if post_id in found]
+        category_ids = {found[post_id].category_id for post_id in existing}
+        results += [_result("not_found", post_id, detail=f"Post {post_id} does not found")
+                    for post_id in chunk if post_id not in found]
+        if not existing:
+            continue
+
+        try:
+            await _remove_posts(db, [found[post_id] for post_id in existing])
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error("Failed to remove a chunk of {} posts: {}", len(existing), e)
+            results += [_result("failed", post_id, detail=str(e)) for post_id in existing]
+            continue
+
+        results += [_result("deleted", post_id) for post_id in existing]
+        for post_id in existing:
+            trending_index.discard(post_id)
+        await invalidate_responses(*(f"post:{post_id}" for post_id in existing),
+                                   *(f"comments:{post_id}" for post_id in existing),
+                                   *(f"category:{category_id}" for category_id in category_ids))
+
+    notify_outbox()
+    await invalidate_responses("posts", "categories", "trending")
+    return results
+
+
+async def delete_users(db: AsyncSession, user_ids: list[UUID], own_account: bool = False) -> list[dict]:
+    """
+    Delete inactive, non admin users; same rules as the single user endpoint.
+    With `own_account` those rules are skipped: they guard against deleting
+    someone else, not users removing themselves.
+
+    Their posts go as delete_posts removes them and their comments as a
+    single comment is removed, replies included, so no row is left pointing
+    at a missing author. Cached principals are left to the caller.
+    """
+    results = []
+    for _, chunk in chunked(list(dict.fromkeys(user_ids))):
+        rows = {row.id: row for row in await db.execute(
+            select(User.id, User.is_admin, User.is_active).where(User.id.in_(chunk)))}  # type:ignore
+
+        eligible = []
+        for user_id in chunk:
+            row = rows.get(user_id)
+            if row is None:
+                results.append(_result("not_found", user_id, detail=f"User {user_id} does not found"))
+            elif own_account:
+                eligible.append(user_id)
+            elif row.is_admin:
+                results.append(_result("forbidden", user_id, detail=f"User {user_id} is Admin!"))
+            elif row.is_active:
+                results.append(_result("forbidden", user_id, detail=f"User {user_id} is active!"))
+            else:
+                eligible.append(user_id)
+        if not eligible:
+            continue
+
+        try:
+            posts = (await db.execute(select(Post.id, Post.category_id, Post.user_id)
+                                      .where(Post.user_id.in_(eligible)))).all()  # type:ignore
+            for _, batch in chunked(posts):
+                await _remove_posts(db, batch)
+            # What is left are comments on other users' posts
+            comments = (await db.execute(select(Comment.id, Comment.path, Comment.post_id, Comment.parent_id)
+                                         .where(Comment.user_id.in_(eligible)))).all()  # type:ignore
+            await _remove_comments(db, comments)
+            await db.execute(delete(User).where(User.id.in_(eligible))  # type:ignore
+                             .execution_options(synchronize_session=False))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error("Failed to remove a chunk of {} users: {}", len(eligible), e)
+            results += [_result("failed", user_id, detail=str(e)) for user_id in eligible]
+            continue
+
+        results += [_result("deleted", user_id) for user_id in eligible]
+        for post in posts:
+            trending_index.discard(post.id)
+
+    notify_outbox()
+    await invalidate_responses("posts", "post_details", "categories", "comments", "trending")
+    return results
+
+
+async def import_posts(db: AsyncSession, items: list[PostImportSchema], default_user_id: UUID) -> list[dict]:
+    results = []
+    for offset, chunk in chunked(items):
+        category_ids = {item.category_id for item in chunk}
+        user_ids = {item.user_id or default_user_id for item in chunk}
+        known_categories = set(await db.scalars(select(Category.id).where(Category.id.in_(category_ids))))
+        known_users = set(await db.scalars(select(User.id).where(User.id.in_(user_ids))))  # type:ignore
+
+        now = datetime.now()
+        rows, indexes = [], []
+        for index, item in enumerate(chunk, start=offset):
+            user_id = item.user_id or default_user_id
+            if item.category_id not in known_categories:
+                results.append(_result("invalid", index=index, detail=f"Category {item.category_id} does not found"))
+            elif user_id not in known_users:
+                results.append(_result("invalid", index=index, detail=f"User {user_id} does not found"))
+            else:
+                rows.append({"id": uuid4(), "title": item.title, "content": item.content,
+                             "excerpt": make_excerpt(item.content), "user_id": user_id,
+                             "category_id": item.category_id, "hot_score": event_score(at=now),
+                             "created_at": now, "updated_at": now})
+                indexes.append(index)
+        if not rows:
+            continue
+
+        try:
+            await db.execute(insert(Post).values(rows))
+            await search_handler.index_posts(db, rows)
+            await recount(db, Category, {row["category_id"] for row in rows})
+            await recount(db, User, {row["user_id"] for row in rows})
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error("Failed to import a chunk of {} posts: {}", len(rows), e)
+            results += [_result("failed", index=index, detail=str(e)) for index in indexes]
+            continue
+
+        results += [_result("created", row["id"], index) for index, row in zip(indexes, rows)]
+        await invalidate_responses(*{f"category:{row['category_id']}" for row in rows})
+
+    await invalidate_responses("posts", "categories")
+    return sorted(results, key=lambda result: result["index"])
+
+
+async def import_comments(db: AsyncSession, items: list[CommentImportSchema], default_user_id: UUID) -> list[dict]:
+    results = []
+    for offset, chunk in chunked(items):
+        post_ids = {item.post_id for item in chunk}
+        user_ids = {item.user_id or default_user_id for item in chunk}
+        known_posts = set(await db.scalars(select(Post.id).where(Post.id.in_(post_ids))))  # type:ignore
+        known_users = set(await db.scalars(select(User.id).where(User.id.in_(user_ids))))  # type:ignore
+
+        now = datetime.now()
+        rows, indexes = [], []
+        for index, item in enumerate(chunk, start=offset):
+            user_id = item.user_id or default_user_id
+            if item.post_id not in known_posts:
+                results.append(_result("invalid", index=index, detail=f"Post {item.post_id} does not found"))
+            elif user_id not in known_users:
+                results.append(_result("invalid", index=index, detail=f"User {user_id} does not found"))
+            else:
+                comment_id = uuid4()
+                rows.append({"id": comment_id, "content": item.content, "user_id": user_id, "post_id": item.post_id,
+                             "path": comment_path(comment_id), "depth": 0, "created_at": now, "updated_at": now})
+                indexes.append(index)
+        if not rows:
+            continue
+
+        try:
+            await db.execute(insert(Comment).values(rows))
+            await search_handler.index_comments(db, rows)
+            await recount(db, Post, {row["post_id"] for row in rows})
+            comments_per_post = Counter(row["post_id"] for row in rows)
+            await bump_scores(db, {post_id: COMMENT_WEIGHT * count for post_id, count in comments_per_post.items()})
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error("Failed to import a chunk of {} comments: {}", len(rows), e)
+            results += [_result("failed", index=index, detail=str(e)) for index in indexes]
+            continue
+
+        results += [_result("created", row["id"], index) for index, row in zip(indexes, rows)]
+        touched = {row["post_id"] for row in rows}
+        # Post responses embed the comment count
+        await invalidate_responses(*(f"comments:{post_id}" for post_id in touched),
+                                   *(f"post:{post_id}" for post_id in touched))
+
+    await invalidate_responses("posts")
+    return sorted(results, key=lambda result: result["index"])
@@ -0,0 +1,204 @@
+import pickle
+from collections import OrderedDict
+from math import ceil
+from os import getenv
+from time import monotonic
+from typing import Any, Iterable
+
+# "memory" keeps entries per worker, and an invalidation only reaches the worker that made it: the others serve
+# their copy until its TTL runs out. Run "redis", shared by all workers, whenever there is more than one
+CACHE_BACKEND = getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# How long redis remembers a tag's generation; far longer than any value takes to compute
+CACHE_GENERATION_TTL = int(getenv("CACHE_GENERATION_TTL", "3600"))
+
+PRINCIPAL_CACHE_TTL = float(getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+class CacheBackend:
+    """
+    Key/value store with per-entry TTL and tag based invalidation.
+
+    Every invalidation moves its tag's generation. Read the generations before
+    computing a value and pass them to set(): the value is then not stored if
+    one of its tags was invalidated meanwhile, as it may predate that write.
+    """
+
+    async def get(self, key: str) -> Any | None:
+        raise NotImplementedError
+
+    async def generations(self, tags: Iterable[str]) -> tuple:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = (),
+                  generations: tuple | None = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def invalidate_tag(self, tag: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process TTL + LRU cache. All operations are O(1) per touched key.
+
+    Per worker: invalidations made by other workers never reach it.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Any, tuple[str, ...]]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        # tag -> clock at its last invalidation, for the most recently invalidated tags only; a tag not in it
+        # reads as the latest clock evicted, so a tag invalidated during a computation never looks unchanged
+        self._generations: OrderedDict[str, int] = OrderedDict()
+        self._clock = 0
+        self._evicted_generation = 0
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at < monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def generations(self, tags: Iterable[str]) -> tuple:
+        return tuple(self._generations.get(tag, self._evicted_generation) for tag in tags)
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = (),
+                  generations: tuple | None = None) -> None:
+        tags = tuple(tags)
+        # generations() never suspends here, so no invalidation can slip in between the check and the store
+        if generations is not None and await self.generations(tags) != generations:
+            return
+        self._discard(key)
+        self._entries[key] = (monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        # Evict least recently used entries once over capacity
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+
+    async def delete(self, key: str) -> None:
+        self._discard(key)
+
+    async def invalidate_tag(self, tag: str) -> None:
+        self._clock += 1
+        self._generations[tag] = self._clock
+        self._generations.move_to_end(tag)
+        while len(self._generations) > self.maxsize:
+            _, evicted = self._generations.popitem(last=False)
+            self._evicted_generation = max(self._evicted_generation, evicted)
+        for key in self._tags.pop(tag, ()):
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared cache so every worker sees the same entries and invalidations."""
+
+    def __init__(self, url: str):
+        # Optional dependency, only needed when CACHE_BACKEND=redis
+        from redis import asyncio as redis
+
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self._redis.get(key)
+        return pickle.loads(raw) if raw is not None else None
+
+    async def generations(self, tags: Iterable[str]) -> tuple:
+        tags = tuple(tags)
+        if not tags:
+            return ()
+        return tuple(int(generation or 0) for generation in await self._redis.mget(*(f"gen:{tag}" for tag in tags)))
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = (),
+                  generations: tuple | None = None) -> None:
+        from redis.exceptions import WatchError
+
+        tags = tuple(tags)
+        async with self._redis.pipeline() as pipe:
+            try:
+                if generations is not None and tags:
+                    # An invalidation after the WATCH fails the transaction below
+                    await pipe.watch(*(f"gen:{tag}" for tag in tags))
+                    current = tuple(int(generation or 0) for generation in
+                                    await pipe.mget(*(f"gen:{tag}" for tag in tags)))
+                    if current != generations:
+                        return
+                pipe.multi()
+                pipe.set(key, pickle.dumps(value), px=int(ttl * 1000))
+                for tag in tags:
+                    pipe.sadd(f"tag:{tag}", key)
+                    pipe.expire(f"tag:{tag}", ceil(ttl))
+                await pipe.execute()
+            except WatchError:
+                return
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def invalidate_tag(self, tag: str) -> None:
+        # Generation first: a store racing with this either lands before it, and is deleted below, or is refused
+        pipe = self._redis.pipeline()
+        pipe.incr(f"gen:{tag}")
+        pipe.expire(f"gen:{tag}", CACHE_GENERATION_TTL)
+        await pipe.execute()
+        keys = await self._redis.smembers(f"tag:{tag}")
+        await self._redis.delete(f"tag:{tag}", *keys)
+
+
+def make_backend(maxsize: int) -> CacheBackend:
+    if CACHE_BACKEND == "redis":
+        return RedisCacheBackend(CACHE_REDIS_URL)
+    return MemoryCacheBackend(maxsize=maxsize)
+
+
+class Cache:
+    """Namespaced view over a backend, so several caches can share one store."""
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = make_backend(maxsize)
+
+    async def get(self, key: str) -> Any | None:
+        return await self.backend.get(f"{self.namespace}:{key}")
+
+    async def generations(self, tags: Iterable[str]) -> tuple:
+        return await self.backend.generations([f"{self.namespace}:{tag}" for tag in tags])
+
+    async def set(self, key: str, value: Any, ttl: float | None = None, tags: Iterable[str] = (),
+                  generations: tuple | None = None) -> None:
+        await self.backend.set(f"{self.namespace}:{key}", value, self.ttl if ttl is None else ttl,
+                               tags=[f"{self.namespace}:{tag}" for tag in tags], generations=generations)
+
+    async def delete(self, key: str) -> None:
+        await self.backend.delete(f"{self.namespace}:{key}")
+
+    async def invalidate_tag(self, tag: str) -> None:
+        await self.backend.invalidate_tag(f"{self.namespace}:{tag}")
+
+
+# Resolved principals of bearer tokens, tagged by "user:<id>"
+principal_cache = Cache("principal", ttl=PRINCIPAL_CACHE_TTL, maxsize=PRINCIPAL_CACHE_SIZE)
@@ -0,0 +1,190 @@
+import asyncio
+import json
+from collections import defaultdict
+from os import getenv
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from ..utils.cache_handler import CACHE_REDIS_URL
+from ..utils.logger_handler import logger
+
+# "memory" fans out within this worker; "redis" relays every event to all workers through pub/sub
+COMMENT_STREAM_BACKEND = getenv("COMMENT_STREAM_BACKEND", "memory")
+COMMENT_STREAM_REDIS_URL = getenv("COMMENT_STREAM_REDIS_URL", CACHE_REDIS_URL)
+# Events a subscriber may fall behind by before it is dropped
+COMMENT_STREAM_QUEUE_SIZE = int(getenv("COMMENT_STREAM_QUEUE_SIZE", "64"))
+# Open streams per worker; each holds a connection and a queue
+COMMENT_STREAM_MAX_SUBSCRIBERS = int(getenv("COMMENT_STREAM_MAX_SUBSCRIBERS", "10000"))
+# Idle streams send a keep-alive so proxies and load balancers don't cut them
+COMMENT_STREAM_HEARTBEAT_SECONDS = float(getenv("COMMENT_STREAM_HEARTBEAT_SECONDS", "15"))
+
+REDIS_CHANNEL_PREFIX = "comments:"
+
+# (event name, JSON data), serialized once at publish time and shared by every subscriber
+CommentEvent = tuple[str, str]
+
+
+class Subscription:
+    """One client's bounded queue of events for a post."""
+    __slots__ = ("post_id", "queue", "dropped")
+
+    def __init__(self, post_id: str, maxsize: int = COMMENT_STREAM_QUEUE_SIZE):
+        self.post_id = post_id
+        self.queue: asyncio.Queue[CommentEvent | None] = asyncio.Queue(maxsize)
+        # Set when the broker gave up on this subscriber; it should refetch the list and reconnect
+        self.dropped = False
+
+    def close(self) -> None:
+        """End the subscription; its pending events are discarded."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def next(self, timeout: float) -> CommentEvent | None:
+        """Next event; None when the subscription ended. Raises TimeoutError when idle for `timeout`."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class CommentBroker:
+    """
+    Fans comment events out to the streams of this worker.
+
+    Delivery never waits on a subscriber: an event that doesn't fit in a
+    subscriber's queue drops that subscriber, so one slow connection can't
+    stall publishing or grow memory without bound.
+    """
+
+    def __init__(self, max_subscribers: int = COMMENT_STREAM_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self.count = 0
+
+    def subscribe(self, post_id: UUID) -> Subscription | None:
+        """A new subscription, or None when this worker is at max_subscribers."""
+        if self.count >= self.max_subscribers:
+            return None
+        subscription = Subscription(str(post_id))
+        self._subscribers[subscription.post_id].add(subscription)
+        self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.post_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.post_id]
+        self.count -= 1
+
+    def deliver(self, post_id: str, event: CommentEvent) -> None:
+        for subscription in list(self._subscribers.get(post_id, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription) -> None:
+        logger.warning("Dropping slow comment stream subscriber of post {}", subscription.post_id)
+        self.unsubscribe(subscription)
+        subscription.dropped = True
+        subscription.close()
+
+
+class PubSubBackend:
+    async def start(self, broker: CommentBroker) -> None:
+        """Begin delivering published events to `broker`."""
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, post_id: str, event: CommentEvent) -> None:
+        raise NotImplementedError
+
+
+class MemoryPubSub(PubSubBackend):
+    """Single worker: publishing is delivering."""
+
+    def __init__(self):
+        self._broker: CommentBroker | None = None
+
+    async def start(self, broker: CommentBroker) -> None:
+        self._broker = broker
+
+    async def publish(self, post_id: str, event: CommentEvent) -> None:
+        if self._broker is not None:
+            self._broker.deliver(post_id, event)
+
+
+class RedisPubSub(PubSubBackend):
+    """Every worker listens on comments:*; an event published anywhere reaches all their subscribers."""
+
+    def __init__(self, url: str):
+        # Optional dependency, only needed when COMMENT_STREAM_BACKEND=redis
+        from redis import asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, broker: CommentBroker) -> None:
+        self._listener = asyncio.create_task(self._listen(broker))
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        await self._redis.aclose()
+
+    async def publish(self, post_id: str, event: CommentEvent) -> None:
+        await self._redis.publish(f"{REDIS_CHANNEL_PREFIX}{post_id}", json.dumps(event))
+
+    async def _listen(self, broker: CommentBroker) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        post_id = message["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+                        name, data = json.loads(message["data"])
+                        broker.deliver(post_id, (name, data))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Events published while disconnected are lost; clients refetch on reconnect
+                logger.error("Comment stream listener failed, reconnecting: {}", e)
+                await asyncio.sleep(1)
+
+
+def make_pubsub() -> PubSubBackend:
+    if COMMENT_STREAM_BACKEND == "redis":
+        return RedisPubSub(COMMENT_STREAM_REDIS_URL)
+    return MemoryPubSub()
+
+
+comment_broker = CommentBroker()
+comment_pubsub = make_pubsub()
+
+
+async def start_comment_streams() -> None:
+    await comment_pubsub.start(comment_broker)
+
+
+async def stop_comment_streams() -> None:
+    await comment_pubsub.stop()
+
+
+async def publish_comment_event(post_id: UUID, event: str, payload: BaseModel) -> None:
+    """Push an event to every stream of `post_id`; call after the change is committed."""
+    try:
+        await comment_pubsub.publish(str(post_id), (event, payload.model_dump_json()))
+    except Exception as e:
+        # Streams are best effort, the committed change stands
+        logger.error("Failed to publish {} for post {}: {}", event, post_id, e)
+
+
+def sse_message(event: CommentEvent) -> str:
+    name, data = event
+    return f"event: {name}\ndata: {data}\n\n"
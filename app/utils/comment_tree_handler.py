@@ -0,0 +1,74 @@
+from os import getenv
+from uuid import UUID
+
+from sqlalchemy import and_, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from ..models.app_models import Comment
+from ..schemas.comment_schema import CommentThreadSchema
+
+# Deepest reply level accepted; top-level comments are depth 0
+COMMENT_MAX_DEPTH = int(getenv("COMMENT_MAX_DEPTH", "8"))
+# Reply levels nested under each comment when the client doesn't ask for a depth
+COMMENT_DEFAULT_DEPTH = int(getenv("COMMENT_DEFAULT_DEPTH", "2"))
+# Newest replies nested under each comment; reply_count tells clients there are more to page through
+COMMENT_REPLIES_PER_PARENT = int(getenv("COMMENT_REPLIES_PER_PARENT", "5"))
+# Upper bound on the replies of one response, whatever the depth
+COMMENT_MAX_REPLIES = int(getenv("COMMENT_MAX_REPLIES", "500"))
+
+PATH_SEPARATOR = "/"
+
+
+def comment_path(comment_id: UUID, parent_path: str | None = None) -> str:
+    return f"{parent_path}{PATH_SEPARATOR}{comment_id.hex}" if parent_path else comment_id.hex
+
+
+def subtree_filter(path: str):
+    """
+    Comments below `path`. A range rather than LIKE, so any database serves it
+    from the plain path index: every descendant starts with path + "/", and
+    the next character up bounds them all.
+    """
+    return and_(Comment.path > path + PATH_SEPARATOR,  # type:ignore
+                Comment.path < path + chr(ord(PATH_SEPARATOR) + 1))
+
+
+async def fetch_replies(db: AsyncSession, parents: list[Comment], levels: int,
+                        per_parent: int = COMMENT_REPLIES_PER_PARENT, limit: int = COMMENT_MAX_REPLIES) -> list:
+    """
+    Replies down to `levels` below each of `parents`, in one query: a path
+    range per parent, keeping the newest `per_parent` replies of every comment.
+    """
+    if not parents or levels < 1:
+        return []
+    # One arm per parent: with a single OR'ed filter planners tend to walk a whole index for the window instead
+    subtrees = union_all(*(
+        select(Comment).where(subtree_filter(parent.path), Comment.depth <= parent.depth + levels)  # type:ignore
+        for parent in parents
+    )).subquery()
+    candidate = aliased(Comment, subtrees)
+    ranked = select(candidate, func.row_number().over(
+        partition_by=candidate.parent_id, order_by=(candidate.created_at.desc(), candidate.id.desc())
+    ).label("rank")).subquery()
+    reply = aliased(Comment, ranked)
+    stmt = (select(reply).where(ranked.c.rank <= per_parent)
+            .order_by(reply.depth, reply.created_at.desc(), reply.id.desc()).limit(limit))
+    return list(await db.scalars(stmt))
+
+
+def nest(parents: list[Comment], replies: list[Comment]) -> list[CommentThreadSchema]:
+    """Hang the replies under their parents; ones whose parent was left out are dropped."""
+    nodes = {comment.id: CommentThreadSchema.model_validate(comment, from_attributes=True)
+             for comment in (*parents, *replies)}
+    for comment in replies:
+        parent = nodes.get(comment.parent_id)
+        if parent is not None:
+            parent.replies.append(nodes[comment.id])
+    return [nodes[comment.id] for comment in parents]
+
+
+async def load_threads(db: AsyncSession, page: dict, levels: int) -> dict:
+    """Nest `levels` of replies under each comment of a paginate() page."""
+    return {"items": nest(page["items"], await fetch_replies(db, page["items"], levels)),
+            "next_cursor": page["next_cursor"]}
@@ -0,0 +1,102 @@
+import asyncio
+from os import getenv
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from ..db.config import SessionLocal
+from ..models.app_models import Category, Comment, Post, User
+from ..utils.http_cache_handler import invalidate_responses
+from ..utils.logger_handler import logger
+
+# Seconds between drift repairs in each worker; 0 leaves it to cron / the CLI below
+COUNTER_RECONCILE_INTERVAL = float(getenv("COUNTER_RECONCILE_INTERVAL", "0"))
+
+Reply = aliased(Comment, name="replies")
+
+# (owner, counter column, foreign key of the counted rows pointing at the owner)
+COUNTERS = (
+    (Post, Post.comment_count, Comment.post_id),
+    (Comment, Comment.reply_count, Reply.parent_id),
+    (Category, Category.post_count, Post.category_id),
+    (User, User.post_count, Post.user_id),
+)
+
+
+async def change_post_count(db: AsyncSession, category_id: UUID | None, user_id: UUID | None, delta: int) -> None:
+    """Adjust the category and author post counters inside the caller's transaction."""
+    if category_id is not None:
+        await db.execute(update(Category).where(Category.id == category_id)  # type:ignore
+                         .values(post_count=Category.post_count + delta)
+                         .execution_options(synchronize_session=False))
+    if user_id is not None:
+        await db.execute(update(User).where(User.id == user_id)  # type:ignore
+                         .values(post_count=User.post_count + delta)
+                         .execution_options(synchronize_session=False))
+
+
+async def change_comment_count(db: AsyncSession, post_id: UUID | None, delta: int) -> None:
+    """Adjust a post's comment counter inside the caller's transaction."""
+    if post_id is not None:
+        await db.execute(update(Post).where(Post.id == post_id)  # type:ignore
+                         .values(comment_count=Post.comment_count + delta)
+                         .execution_options(synchronize_session=False))
+
+
+async def change_reply_count(db: AsyncSession, comment_id: UUID | None, delta: int) -> None:
+    """Adjust a comment's direct reply counter inside the caller's transaction."""
+    if comment_id is not None:
+        await db.execute(update(Comment).where(Comment.id == comment_id)  # type:ignore
+                         .values(reply_count=Comment.reply_count + delta)
+                         .execution_options(synchronize_session=False))
+
+
+async def recount(db: AsyncSession, model, ids=None) -> int:
+    """
+    Set `model`'s counters to the real counts where they drifted, for `ids` or
+    every row. One set-based UPDATE per counter; returns the rows repaired.
+    """
+    repaired = 0
+    for owner, counter, foreign_key in COUNTERS:
+        if owner is not model:
+            continue
+        actual = (select(func.count())
+                  .where(foreign_key == owner.id)  # type:ignore
+                  .correlate(owner)
+                  .scalar_subquery())
+        stmt = update(owner).where(counter != actual).values({counter: actual})
+        if ids is not None:
+            if not ids:
+                continue
+            stmt = stmt.where(owner.id.in_(list(ids)))
+        result = await db.execute(stmt.execution_options(synchronize_session=False))
+        repaired += result.rowcount
+    return repaired
+
+
+async def reconcile_counters() -> dict[str, int]:
+    """Repair drift in every counter, e.g. after manual SQL or a failed deploy."""
+    async with SessionLocal() as db:
+        repaired = {model.__tablename__: await recount(db, model) for model in (Post, Comment, Category, User)}
+        await db.commit()
+
+    if any(repaired.values()):
+        logger.warning("Repaired drifted counters: {}", repaired)
+        await invalidate_responses("posts", "post_details", "categories", "comments")
+    return repaired
+
+
+async def reconcile_periodically(interval: float = COUNTER_RECONCILE_INTERVAL) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reconcile_counters()
+        except Exception as e:
+            logger.error("Counter reconciliation failed: {}", e)
+
+
+if __name__ == "__main__":
+    # python -m app.utils.counter_handler
+    print(f"Repaired counters: {asyncio.run(reconcile_counters())}")
@@ -0,0 +1,112 @@
+import hashlib
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from os import getenv
+from time import time
+from typing import Awaitable, Callable, Iterable
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from ..utils.cache_handler import Cache
+from ..utils.logger_handler import logger
+
+RESPONSE_CACHE_TTL = float(getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SIZE = int(getenv("RESPONSE_CACHE_SIZE", "2048"))
+# Hot public pages rendered once at start-up, before the first client asks for them
+RESPONSE_CACHE_PRIME_PATHS = [
+    path.strip() for path in getenv("RESPONSE_CACHE_PRIME_PATHS", "/api/v1/posts/all,/api/v1/category/all").split(",")
+    if path.strip()
+]
+
+# Rendered bodies of public read routes, tagged by the entities they contain
+response_cache = Cache("response", ttl=RESPONSE_CACHE_TTL, maxsize=RESPONSE_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: float
+
+
+def _cache_key(request: Request) -> str:
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    try:
+        return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+async def cached_response(request: Request, build: Callable[[], Awaitable[BaseModel]],
+                          tags: Iterable[str], max_age: int) -> Response:
+    """
+    Serve a public read route from the rendered-response cache.
+
+    `build` only runs (and only touches the DB) on a miss. Entries are dropped
+    through invalidate_responses() by the write handlers, so `Last-Modified` is
+    the render time of the entry: nothing it contains changed after it. A body
+    built while one of its tags was invalidated is served but not stored.
+    With CACHE_BACKEND=memory that only holds for writes made by this worker.
+    """
+    key = _cache_key(request)
+    tags = tuple(tags)
+    entry = await response_cache.get(key)
+    if entry is None:
+        # Before build() reads anything, so a write landing meanwhile is noticed by set()
+        generations = await response_cache.generations(tags)
+        body = (await build()).model_dump_json().encode()
+        entry = CachedResponse(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"', last_modified=time())
+        await response_cache.set(key, entry, tags=tags, generations=generations)
+
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    elif not_modified_since(request.headers.get("if-modified-since"), entry.last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def invalidate_responses(*tags: str) -> None:
+    for tag in tags:
+        await response_cache.invalidate_tag(tag)
+
+
+async def prime_response_cache(app, paths: Iterable[str] = RESPONSE_CACHE_PRIME_PATHS) -> None:
+    """Fill the cache by sending plain GETs for `paths` through the ASGI app itself."""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for path in paths:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "server": ("localhost", 80), "client": None,
+        }
+        try:
+            await app(scope, receive, send)
+        except Exception as e:
+            # Priming is best effort, a cold cache is only slower
+            logger.warning("Could not prime response cache for {}: {}", path, e)
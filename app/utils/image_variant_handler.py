@@ -0,0 +1,150 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from mimetypes import guess_type
+from os import getenv
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.config import SessionLocal
+from ..models.app_models import Post
+from ..utils.http_cache_handler import invalidate_responses
+from ..utils.logger_handler import logger
+from ..utils.storage_handler import iter_bytes, storage
+
+IMAGE_WORKERS = int(getenv("IMAGE_WORKERS", "2"))
+
+# variant name -> (max edge in px, output format or None to keep the original's)
+IMAGE_VARIANTS = {
+    "thumbnail": (320, None),
+    "medium": (1024, None),
+    "webp": (1024, "WEBP"),
+}
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, not fork: the API process runs event loop and DB driver threads
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_image_workers() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def variant_keys(image_key: str) -> dict[str, str]:
+    """Storage key of each variant of `image_key`, e.g. images/<sha256>_thumbnail.png."""
+    base, extension = os.path.splitext(image_key)
+    return {name: f"{base}_{name}.{image_format.lower()}" if image_format else f"{base}_{name}{extension}"
+            for name, (_, image_format) in IMAGE_VARIANTS.items()}
+
+
+def generate_variants(data: bytes, names: list[str]) -> dict[str, bytes]:
+    """
+    Encode the requested resized copies of an image and return {variant: bytes}.
+
+    Runs in a worker process; reading and writing storage stays in the API
+    process, so this only sees bytes.
+    """
+    from PIL import Image, ImageOps
+
+    variants = {}
+    with Image.open(io.BytesIO(data)) as original:
+        original_format = original.format
+        original = ImageOps.exif_transpose(original)
+        for name in names:
+            max_edge, image_format = IMAGE_VARIANTS[name]
+            variant = original.copy()
+            variant.thumbnail((max_edge, max_edge))
+            if variant.mode not in ("RGB", "RGBA") and (image_format or original_format) != "PNG":
+                variant = variant.convert("RGB")
+            output = io.BytesIO()
+            variant.save(output, format=image_format or original_format, optimize=True)
+            variants[name] = output.getvalue()
+
+    return variants
+
+
+async def _record_variants(db: AsyncSession, post_id: UUID, image_key: str, keys: dict) -> bool:
+    post = await db.get(Post, post_id)
+    if post is None or post.image != image_key:
+        return False
+    post.image_variants = keys
+    await db.flush()
+    logger.info("Image variants generated for post {}", post_id)
+    return True
+
+
+async def process_post_image(post_id: UUID, image_key: str, raise_errors: bool = False,
+                             db: AsyncSession | None = None) -> bool:
+    """
+    Build the variants off the request path and record them on the post; the
+    outbox retries it on errors. Returns whether the post was updated.
+
+    Given `db`, the post is updated in that session and committing it, then
+    invalidating the post's responses, is left to the caller.
+    """
+    keys = variant_keys(image_key)
+    try:
+        # Originals are content addressed, so an existing variant is already correct and is reused as is
+        missing = [name for name, key in keys.items() if not await storage.exists(key)]
+        if missing:
+            data = await storage.read(image_key)
+            loop = asyncio.get_running_loop()
+            variants = await loop.run_in_executor(_get_executor(), generate_variants, data, missing)
+            for name, body in variants.items():
+                await storage.put(keys[name], iter_bytes(body), guess_type(keys[name])[0])
+    except Exception as e:
+        logger.error("Failed to generate image variants for post {}: {}", post_id, e)
+        if raise_errors:
+            raise
+        return False
+
+    if db is not None:
+        return await _record_variants(db, post_id, image_key, keys)
+    async with SessionLocal() as own_db:
+        recorded = await _record_variants(own_db, post_id, image_key, keys)
+        await own_db.commit()
+    if recorded:
+        await invalidate_responses("posts", f"post:{post_id}")
+    return recorded
+
+
+async def backfill_image_variants(batch_size: int = 100) -> int:
+    """Generate variants for every post that has an image but no variants yet."""
+    processed = 0
+    last_id = None
+    while True:
+        # Read a batch and release the connection before writing, SQLite allows one writer
+        async with SessionLocal() as db:
+            stmt = (select(Post.id, Post.image)
+                    .where(Post.image.is_not(None)).where(Post.image_variants.is_(None))  # type:ignore
+                    .order_by(Post.id).limit(batch_size))
+            if last_id is not None:
+                stmt = stmt.where(Post.id > last_id)
+            batch = (await db.execute(stmt)).all()
+
+        if not batch:
+            return processed
+        for post_id, image_key in batch:
+            await process_post_image(post_id, image_key)
+            processed += 1
+        last_id = batch[-1].id
+
+
+if __name__ == "__main__":
+    # python -m app.utils.image_variant_handler
+    count = asyncio.run(backfill_image_variants())
+    shutdown_image_workers()
+    print(f"Generated image variants for {count} posts")
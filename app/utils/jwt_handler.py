@@ -1,15 +1,19 @@
 from os import getenv
-from jose import jwt
 
 SECRET_KEY = getenv("SECRET_KEY_JWT", "my-secret-key")
 ALGORITH = getenv("ALGORITH", "HS256")
 
 
+# jose is imported on first use, it pulls in its crypto backends at import time
 def create_access_token(data: dict) -> str:
+    from jose import jwt
+
     encode_data = jwt.encode(data, key=SECRET_KEY, algorithm=ALGORITH)
     return encode_data
 
 
 def verify_token(token: str) -> dict:
+    from jose import jwt
+
     decode_data = jwt.decode(token, key=SECRET_KEY, algorithms=ALGORITH)
     return decode_data
@@ -1,4 +1,114 @@
+import json
+import random
+import sys
+from contextvars import ContextVar
+from os import getenv
+from time import perf_counter
+from uuid import uuid4
+
 from loguru import logger
 
+APP_ENV = getenv("APP_ENV", "development")
+IS_DEVELOPMENT = APP_ENV == "development"
+
+LOG_LEVEL = getenv("LOG_LEVEL", "INFO")
+LOG_FILE = getenv("LOG_FILE", "logs/app.log")
+LOG_JSON = getenv("LOG_JSON", "false" if IS_DEVELOPMENT else "true").lower() == "true"
+
+# Fraction of requests whose INFO/DEBUG lines are kept, per path prefix, e.g.
+# LOG_SAMPLE_RATES="/api/v1/posts=0.05,/api/v1/comment=0.2". Warnings and errors
+# are always kept.
+LOG_DEFAULT_SAMPLE_RATE = float(getenv("LOG_DEFAULT_SAMPLE_RATE", "1.0"))
+LOG_SAMPLE_RATES = {
+    prefix.strip(): float(rate)
+    for prefix, rate in (item.split("=", 1) for item in getenv("LOG_SAMPLE_RATES", "").split(",") if "=" in item)
+}
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+log_sampled_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+
+def _sampling_filter(record) -> bool:
+    return record["level"].no >= 30 or log_sampled_var.get()
+
+
+def _add_request_id(record) -> None:
+    record["extra"]["request_id"] = request_id_var.get()
+
+
+def _json_format(record) -> str:
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "request_id": record["extra"].get("request_id"),
+        "logger": f"{record['name']}:{record['function']}:{record['line']}",
+    }
+    if record["exception"] is not None:
+        entry["exception"] = repr(record["exception"].value)
+    # Stash the rendered line so loguru does not try to format JSON braces
+    record["extra"]["_json"] = json.dumps(entry, default=str)
+    return "{extra[_json]}\n"
+
+
+TEXT_FORMAT = ("<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+               "{extra[request_id]} | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+               "<level>{message}</level>")
+
+
+def configure_logging() -> None:
+    """Install the app sinks; called from the lifespan so importing this module opens no files."""
+    logger.remove()
+    logger.configure(patcher=_add_request_id)
+
+    log_format = _json_format if LOG_JSON else TEXT_FORMAT
+    logger.add(sys.stderr, level=LOG_LEVEL, format=log_format, filter=_sampling_filter,
+               backtrace=IS_DEVELOPMENT, diagnose=IS_DEVELOPMENT)
+    logger.add(LOG_FILE, level=LOG_LEVEL, format=log_format, filter=_sampling_filter,
+               rotation="100 MB", retention="10 days", enqueue=True,
+               backtrace=IS_DEVELOPMENT, diagnose=IS_DEVELOPMENT)
+
+
+def sample_rate_for(path: str) -> float:
+    rate = LOG_DEFAULT_SAMPLE_RATE
+    matched = ""
+    for prefix, prefix_rate in LOG_SAMPLE_RATES.items():
+        if path.startswith(prefix) and len(prefix) > len(matched):
+            rate, matched = prefix_rate, prefix
+    return rate
+
+
+class RequestLoggingMiddleware:
+    """Assigns a request id, decides log sampling and writes one access line per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid4().hex
+        id_token = request_id_var.set(request_id)
+        sampled_token = log_sampled_var.set(random.random() < sample_rate_for(scope["path"]))
+
+        status_code = 500
+        started = perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            logger.info("{} {} {} {:.1f}ms", scope["method"], scope["path"], status_code,
+                        (perf_counter() - started) * 1000)
+            log_sampled_var.reset(sampled_token)
+            request_id_var.reset(id_token)
 
-logger.add("logs/app.log", rotation="100 MB", retention="10 days", enqueue=True, backtrace=True, diagnose=True)
@@ -0,0 +1,146 @@
+import os
+import re
+import stat
+from collections import OrderedDict
+from email.utils import formatdate
+from hashlib import md5
+from mimetypes import guess_type
+from os import getenv
+from time import monotonic
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+from ..utils.http_cache_handler import etag_matches, not_modified_since
+from ..utils.response_handler import COMPRESSIBLE_TYPES, choose_encoding
+
+MEDIA_STAT_CACHE_SIZE = int(getenv("MEDIA_STAT_CACHE_SIZE", "4096"))
+# Files can still be deleted or replaced out of band; re-stat after this long
+MEDIA_STAT_CACHE_TTL = float(getenv("MEDIA_STAT_CACHE_TTL", "300"))
+# Freshness for files whose name does not pin their content
+MEDIA_MAX_AGE = int(getenv("MEDIA_MAX_AGE", "3600"))
+MEDIA_CHUNK_SIZE = int(getenv("MEDIA_CHUNK_SIZE", str(256 * 1024)))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# <sha256>.<ext> from upload_image_handler, <sha256>_<variant>.<ext> from image_variant_handler
+CONTENT_ADDRESSED_NAME = re.compile(r"^(?P<digest>[0-9a-f]{64})(?:_(?P<variant>\w+))?\.\w+$")
+# Precompressed siblings, e.g. logo.svg.br next to logo.svg, for text-like media only
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class MediaFile:
+    """Everything needed to answer a request for one file, without touching the disk."""
+    __slots__ = ("path", "stat_result", "media_type", "etag", "last_modified", "cache_control", "encodings")
+
+    def __init__(self, path: str, stat_result: os.stat_result, encodings: dict[str, tuple[str, os.stat_result]]):
+        self.path = path
+        self.stat_result = stat_result
+        self.media_type = guess_type(path)[0] or "application/octet-stream"
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        self.encodings = encodings
+
+        match = CONTENT_ADDRESSED_NAME.match(os.path.basename(path))
+        if match:
+            self.etag = f'"{match.group(0)}"'
+            self.cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            self.etag = f'"{md5(f"{stat_result.st_mtime}-{stat_result.st_size}".encode()).hexdigest()}"'
+            self.cache_control = f"public, max-age={MEDIA_MAX_AGE}"
+
+
+class MediaFileResponse(FileResponse):
+    chunk_size = MEDIA_CHUNK_SIZE
+
+
+class MediaFiles:
+    """
+    Serves the upload directory in place of StaticFiles.
+
+    Content-addressed names get immutable caching and a strong ETag derived
+    from the name. Stats are cached in memory (LRU, MEDIA_STAT_CACHE_TTL),
+    so a hit costs no syscall before the file is opened. Range and
+    conditional requests are answered, and servers offering the ASGI
+    pathsend extension send the file without copying it through Python.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.realpath(directory)
+        self._files: OrderedDict[str, tuple[float, MediaFile]] = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+            await response(scope, receive, send)
+            return
+
+        media_file = await self._lookup(scope["path"][len(scope.get("root_path", "")):])
+        if media_file is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        headers = {"ETag": media_file.etag, "Last-Modified": media_file.last_modified,
+                   "Cache-Control": media_file.cache_control}
+        if media_file.encodings:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request_headers.get("if-none-match")
+        if (etag_matches(if_none_match, media_file.etag) if if_none_match is not None
+                else not_modified_since(request_headers.get("if-modified-since"), media_file.stat_result.st_mtime)):
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        path, stat_result = media_file.path, media_file.stat_result
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""), media_file.encodings)
+        if encoding is not None and "range" not in request_headers:
+            path, stat_result = media_file.encodings[encoding]
+            headers.update({"Content-Encoding": encoding, "ETag": f"W/{media_file.etag}"})
+
+        pathsend = "http.response.pathsend" in scope.get("extensions", {})
+        if pathsend and scope["method"] == "GET" and "range" not in request_headers:
+            response = Response(headers={**headers, "Content-Length": str(stat_result.st_size)},
+                                media_type=media_file.media_type)
+            await send({"type": "http.response.start", "status": 200, "headers": response.raw_headers})
+            await send({"type": "http.response.pathsend", "path": path})
+            return
+
+        response = MediaFileResponse(path, headers=headers, media_type=media_file.media_type, stat_result=stat_result)
+        await response(scope, receive, send)
+
+    async def _lookup(self, request_path: str) -> MediaFile | None:
+        cached = self._files.get(request_path)
+        if cached is not None and cached[0] > monotonic():
+            self._files.move_to_end(request_path)
+            return cached[1]
+
+        media_file = await anyio.to_thread.run_sync(self._resolve, request_path)
+        if media_file is None:
+            self._files.pop(request_path, None)
+            return None
+        self._files[request_path] = (monotonic() + MEDIA_STAT_CACHE_TTL, media_file)
+        self._files.move_to_end(request_path)
+        while len(self._files) > MEDIA_STAT_CACHE_SIZE:
+            self._files.popitem(last=False)
+        return media_file
+
+    def _resolve(self, request_path: str) -> MediaFile | None:
+        path = os.path.realpath(os.path.join(self.directory, request_path.lstrip("/")))
+        # Stay inside the directory, whatever "..", symlinks or encoded slashes the path holds
+        if os.path.commonpath([path, self.directory]) != self.directory:
+            return None
+        try:
+            stat_result = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        encodings = {}
+        if (guess_type(path)[0] or "").startswith(COMPRESSIBLE_TYPES):
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+                try:
+                    encodings[encoding] = (path + suffix, os.stat(path + suffix))
+                except FileNotFoundError:
+                    continue
+        return MediaFile(path, stat_result, encodings)
@@ -0,0 +1,251 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from os import getenv
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.config import SessionLocal
+from ..models.app_models import Comment, OutboxEvent, Post
+from ..utils import search_handler
+from ..utils.http_cache_handler import invalidate_responses
+from ..utils.image_variant_handler import process_post_image
+from ..utils.logger_handler import logger
+
+# Drain the outbox inside each API worker as well; turn off when `python -m app.worker` runs separately
+OUTBOX_IN_PROCESS = getenv("OUTBOX_IN_PROCESS", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_CONCURRENCY = int(getenv("OUTBOX_CONCURRENCY", "4"))
+# Idle poll interval; events enqueued by this process wake its drainer right away
+OUTBOX_POLL_SECONDS = float(getenv("OUTBOX_POLL_SECONDS", "1"))
+# A claimed event becomes visible to other workers again if not finished within this
+OUTBOX_LEASE_SECONDS = float(getenv("OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_MAX_ATTEMPTS = int(getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# Retry n waits about OUTBOX_BACKOFF_SECONDS * 2^(n-1), capped, with jitter
+OUTBOX_BACKOFF_SECONDS = float(getenv("OUTBOX_BACKOFF_SECONDS", "2"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(getenv("OUTBOX_BACKOFF_MAX_SECONDS", "900"))
+# Finished events are kept this long for inspection; dead ones until requeued or removed by hand
+OUTBOX_RETENTION_HOURS = float(getenv("OUTBOX_RETENTION_HOURS", "24"))
+
+Job = Callable[[AsyncSession, dict], Awaitable[None]]
+JOBS: dict[str, Job] = {}
+
+DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+_wakeup = asyncio.Event()
+
+
+def job(kind: str):
+    """
+    Register the handler of an event kind. Its writes go to the session it is
+    given and commit together with the event's done mark; effects outside the
+    database must be safe to repeat, as a crash between them and that commit
+    runs the event again.
+    """
+
+    def register(handler: Job) -> Job:
+        JOBS[kind] = handler
+        return handler
+
+    return register
+
+
+async def enqueue(db: AsyncSession, kind: str, payload: dict, idempotency_key: str) -> None:
+    """
+    Add an event to the caller's transaction; it is only seen by the
+    workers if that transaction commits. Enqueuing a key again is a no-op.
+    """
+    if kind not in JOBS:
+        raise ValueError(f"Unknown outbox job: {kind}")
+    connection = await db.connection()
+    # One statement, so two transactions enqueuing the same key can't both get past a lookup
+    stmt = (DIALECT_INSERTS[connection.dialect.name](OutboxEvent)
+            .values(kind=kind, payload=payload, idempotency_key=idempotency_key)
+            .on_conflict_do_nothing(index_elements=[OutboxEvent.idempotency_key]))
+    await connection.execute(stmt)
+
+
+def after_commit(db: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Have run_event call `callback` once the job's writes and the done mark are committed."""
+    db.info.setdefault("after_commit", []).append(callback)
+
+
+def notify_outbox() -> None:
+    """Wake this process' drainer; call after committing enqueued events."""
+    _wakeup.set()
+
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+    # Full jitter, so events failing together don't retry together
+    return random.uniform(delay / 2, delay)
+
+
+async def claim_events(limit: int = OUTBOX_BATCH_SIZE) -> list[OutboxEvent]:
+    """
+    Lease up to `limit` due events to this worker.
+
+    Each claim is a compare-and-set on the attempt counter, so concurrent
+    workers never run the same event at once; a worker that dies only delays its
+    events until the lease runs out.
+    """
+    now = datetime.now()
+    lease_until = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    claimed = []
+    async with SessionLocal() as db:
+        candidates = (await db.execute(
+            select(OutboxEvent.id, OutboxEvent.attempts)
+            .where(OutboxEvent.status == "pending", OutboxEvent.available_at <= now)  # type:ignore
+            .order_by(OutboxEvent.available_at).limit(limit)
+        )).all()
+        for event_id, attempts in candidates:
+            result = await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id == event_id, OutboxEvent.attempts == attempts,  # type:ignore
+                       OutboxEvent.status == "pending")
+                .values(available_at=lease_until, attempts=OutboxEvent.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append(event_id)
+        await db.commit()
+
+        if not claimed:
+            return []
+        return list(await db.scalars(select(OutboxEvent).where(OutboxEvent.id.in_(claimed))))  # type:ignore
+
+
+async def run_event(event: OutboxEvent) -> bool:
+    """Run one claimed event and record the outcome; True when it succeeded."""
+    async with SessionLocal() as db:
+        try:
+            await JOBS[event.kind](db, event.payload)
+            # The job's own writes and the done mark commit together
+            await db.execute(update(OutboxEvent).where(OutboxEvent.id == event.id)  # type:ignore
+                             .values(status="done", processed_at=datetime.now(), last_error=None)
+                             .execution_options(synchronize_session=False))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            error = f"{type(e).__name__}: {e}"
+        else:
+            for callback in db.info.pop("after_commit", []):
+                try:
+                    await callback()
+                except Exception as e:
+                    # The event is done either way; what is left over is e.g. a response cached until its TTL
+                    logger.error("After-commit step of outbox event {} ({}) failed: {}", event.id, event.kind, e)
+            return True
+
+        db.info.pop("after_commit", None)
+
+        if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+            logger.error("Outbox event {} ({}) failed {} times, dead-lettered: {}",
+                         event.id, event.kind, event.attempts, error)
+            values = {"status": "dead", "last_error": error, "processed_at": datetime.now()}
+        else:
+            delay = backoff_delay(event.attempts)
+            logger.warning("Outbox event {} ({}) failed, retry {} in {:.0f}s: {}",
+                           event.id, event.kind, event.attempts, delay, error)
+            values = {"available_at": datetime.now() + timedelta(seconds=delay), "last_error": error}
+        await db.execute(update(OutboxEvent).where(OutboxEvent.id == event.id)  # type:ignore
+                         .values(**values).execution_options(synchronize_session=False))
+        await db.commit()
+        return False
+
+
+async def drain_once(concurrency: int = OUTBOX_CONCURRENCY) -> int:
+    """Run every event that is due now; returns how many were run."""
+    total = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_limited(event: OutboxEvent) -> None:
+        async with semaphore:
+            await run_event(event)
+
+    while events := await claim_events():
+        await asyncio.gather(*(run_limited(event) for event in events))
+        total += len(events)
+    return total
+
+
+async def purge_finished(retention_hours: float = OUTBOX_RETENTION_HOURS) -> int:
+    async with SessionLocal() as db:
+        result = await db.execute(
+            delete(OutboxEvent)
+            .where(OutboxEvent.status == "done",  # type:ignore
+                   OutboxEvent.processed_at < datetime.now() - timedelta(hours=retention_hours))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount
+
+
+async def requeue_dead() -> int:
+    """Give dead-lettered events a fresh set of attempts, e.g. after fixing what failed them."""
+    async with SessionLocal() as db:
+        result = await db.execute(
+            update(OutboxEvent).where(OutboxEvent.status == "dead")  # type:ignore
+            .values(status="pending", attempts=0, available_at=datetime.now(), processed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount
+
+
+async def drain_periodically(poll_seconds: float = OUTBOX_POLL_SECONDS) -> None:
+    """Drain until cancelled; wakes early when this process enqueued something."""
+    purged_at = datetime.now()
+    while True:
+        try:
+            await drain_once()
+            if datetime.now() - purged_at > timedelta(hours=1):
+                await purge_finished()
+                purged_at = datetime.now()
+        except Exception as e:
+            # Most likely the DB is unavailable; events wait in the table meanwhile
+            logger.error("Outbox drain failed: {}", e)
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), poll_seconds)
+        except TimeoutError:
+            pass
+
+
+# Jobs ->
+
+@job("index_post")
+async def index_post_job(db: AsyncSession, payload: dict) -> None:
+    post = await db.get(Post, UUID(payload["post_id"]))
+    # Deleted in the meantime; its unindex event takes care of the entry
+    if post is not None:
+        await search_handler.index_post(db, post)
+
+
+@job("index_comment")
+async def index_comment_job(db: AsyncSession, payload: dict) -> None:
+    comment = await db.get(Comment, UUID(payload["comment_id"]))
+    if comment is not None:
+        await search_handler.index_comment(db, comment)
+
+
+@job("unindex_posts")
+async def unindex_posts_job(db: AsyncSession, payload: dict) -> None:
+    await search_handler.unindex_posts(db, [UUID(post_id) for post_id in payload["post_ids"]])
+
+
+@job("unindex_comments")
+async def unindex_comments_job(db: AsyncSession, payload: dict) -> None:
+    await search_handler.unindex_comments(db, [UUID(comment_id) for comment_id in payload["comment_ids"]])
+
+
+@job("process_post_image")
+async def process_post_image_job(db: AsyncSession, payload: dict) -> None:
+    # Resizing runs in image_variant_handler's process pool; an unchanged image is skipped there
+    post_id = UUID(payload["post_id"])
+    if await process_post_image(post_id, payload["image_key"], raise_errors=True, db=db):
+        after_commit(db, lambda: invalidate_responses("posts", f"post:{post_id}"))
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from os import getenv
+from uuid import UUID
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = int(getenv("DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(getenv("MAX_PAGE_SIZE", "100"))
+
+
+class PageParams(BaseModel):
+    cursor: str | None = None
+    limit: int = DEFAULT_PAGE_SIZE
+
+
+def page_params(cursor: str | None = Query(default=None, description="Opaque cursor from a previous page"),
+                limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit)
+
+
+def encode_cursor(values: dict) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, dict):
+            raise ValueError("cursor is not an object")
+        return values
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def paginate(db: AsyncSession, stmt: Select, model, params: PageParams, sort_by: str = "created_at") -> dict:
+    """
+    Keyset pagination over (sort_by, id), highest first; sort_by defaults to
+    created_at, i.e. newest first.
+
+    The filter on the last seen key keeps every page an index range scan, so
+    deep pages cost the same as the first one.
+    """
+    sort_column = getattr(model, sort_by)
+    stmt = stmt.order_by(sort_column.desc(), model.id.desc())
+
+    if params.cursor:
+        values = decode_cursor(params.cursor)
+        try:
+            raw_value = values[sort_by]
+            last_value = (datetime.fromisoformat(raw_value) if sort_column.type.python_type is datetime
+                          else int(raw_value))
+            last_id = UUID(values["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        stmt = stmt.where(or_(
+            sort_column < last_value,
+            and_(sort_column == last_value, model.id < last_id),
+        ))
+
+    # Fetch one extra row to know whether another page exists; a select of the
+    # entity yields ORM objects, a projection of its columns yields plain rows
+    result = await db.execute(stmt.limit(params.limit + 1))
+    rows = (result.scalars() if stmt.column_descriptions[0]["expr"] is model else result).all()
+    items = rows[:params.limit]
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        last = items[-1]
+        last_value = getattr(last, sort_by)
+        if isinstance(last_value, datetime):
+            last_value = last_value.isoformat()
+        next_cursor = encode_cursor({sort_by: last_value, "id": str(last.id)})
+
+    return {"items": items, "next_cursor": next_cursor}
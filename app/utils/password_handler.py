@@ -1,11 +1,63 @@
-from passlib.context import CryptContext
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from os import getenv
+from time import perf_counter
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from fastapi import HTTPException, status
 
+from ..utils.metrics_handler import password_hash_duration_seconds, password_hash_rejected_total
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+BCRYPT_ROUNDS = int(getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_SIZE = int(getenv("PASSWORD_HASH_QUEUE_SIZE", "16"))
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # passlib (and its bcrypt backend) is imported on first use to keep worker start-up fast
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+# Admits the running hashes plus a bounded queue; anything beyond that is rejected
+_admission = asyncio.Semaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE)
+
+
+def _timed(func, *args):
+    # Timed inside the worker so queue wait is not counted as bcrypt time
+    started = perf_counter()
+    return func(*args), perf_counter() - started
+
+
+async def _run_in_pool(operation: str, func, *args):
+    if _admission.locked():
+        password_hash_rejected_total.inc()
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many password requests, please retry shortly",
+                            headers={"Retry-After": "1"})
+    async with _admission:
+        loop = asyncio.get_running_loop()
+        result, duration = await loop.run_in_executor(_executor, _timed, func, *args)
+    password_hash_duration_seconds.observe(duration, operation)
+    return result
+
+
+async def hash_password(password: str) -> str:
+    return await _run_in_pool("hash", get_pwd_context().hash, password)
+
+
+async def verify_password(plain_password, hashed_password) -> bool:
+    return await _run_in_pool("verify", get_pwd_context().verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password, hashed_password) -> tuple[bool, str | None]:
+    """
+    Verify a password and return a fresh hash when the stored one uses outdated
+    settings (e.g. a lower BCRYPT_ROUNDS), so callers can rehash on login.
+    """
+    return await _run_in_pool("verify", get_pwd_context().verify_and_update, plain_password, hashed_password)
@@ -0,0 +1,61 @@
+from os import getenv
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Select, select
+from sqlalchemy.orm import joinedload, load_only
+
+from ..models.app_models import Category, Post, User
+from ..schemas.post_schema import PostFieldsSchema
+
+EXCERPT_LENGTH = int(getenv("EXCERPT_LENGTH", "200"))
+
+POST_FIELDS = tuple(PostFieldsSchema.model_fields)
+# ?fields=summary, the feed card: no content, no relations
+SUMMARY_FIELDS = ("id", "title", "excerpt", "image", "created_at", "updated_at")
+RELATION_FIELDS = ("author", "category")
+
+
+def make_excerpt(content: str) -> str:
+    # Mirrored in SQL by the migration that added Post.excerpt
+    if len(content) <= EXCERPT_LENGTH:
+        return content
+    return content[:EXCERPT_LENGTH].rstrip() + "…"
+
+
+def post_fields(fields: str | None = Query(
+        default=None, description="Comma separated post fields, or 'summary'; all fields when omitted")
+) -> tuple[str, ...] | None:
+    if fields is None:
+        return None
+    if fields == "summary":
+        return SUMMARY_FIELDS
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(POST_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id always comes along, clients need it to address the post
+    return tuple(name for name in POST_FIELDS if name in requested or name == "id")
+
+
+def select_post_fields(fields: tuple[str, ...], sort_by: str = "created_at") -> Select:
+    """
+    Select only what `fields` needs, plus the pagination key.
+
+    Without relations this is a plain column select returning rows, no ORM
+    entities at all; with author/category it loads partial entities with
+    load_only and joins only the columns the embedded schemas show.
+    """
+    columns = [getattr(Post, name) for name in (*fields, sort_by)
+               if name not in RELATION_FIELDS]
+    columns = list(dict.fromkeys(columns))
+    if not any(name in fields for name in RELATION_FIELDS):
+        return select(*columns)
+
+    stmt = select(Post).options(load_only(*columns))
+    if "author" in fields:
+        stmt = stmt.options(joinedload(Post.author).load_only(User.id, User.username))
+    if "category" in fields:
+        stmt = stmt.options(joinedload(Post.category).load_only(Category.id, Category.name))
+    return stmt
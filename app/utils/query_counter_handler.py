@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import getenv
+
+from sqlalchemy import event
+
+from ..db.config import engines
+from ..utils.logger_handler import logger
+
+# Install QueryCountMiddleware; meant for dev/test, production requests skip the counting
+QUERY_COUNT_ENABLED = getenv("QUERY_COUNT_ENABLED", "false").lower() == "true"
+# Max statements a single request may issue; a list endpoint over this budget
+# almost always means an N+1 on a relationship.
+QUERY_BUDGET = int(getenv("QUERY_BUDGET", "10"))
+# In strict mode (tests/dev) an over-budget request fails instead of only warning
+QUERY_BUDGET_STRICT = getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+QUERY_COUNT_HEADER = getenv("QUERY_COUNT_HEADER", "false").lower() == "true"
+# Paths whose statement count grows with the payload by design (chunked bulk endpoints)
+QUERY_BUDGET_EXEMPT_PREFIXES = tuple(
+    prefix.strip() for prefix in getenv("QUERY_BUDGET_EXEMPT_PREFIXES", "/api/v1/admin/bulk/").split(",")
+    if prefix.strip()
+)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+_current_counter: ContextVar[QueryCounter | None] = ContextVar("query_counter", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+for _engine in engines:
+    event.listen(_engine.sync_engine, "before_cursor_execute", _count_query)
+
+
+@contextmanager
+def count_queries():
+    """Count the statements executed inside the block, e.g. `with count_queries() as counter:`."""
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+class QueryCountMiddleware:
+    """
+    Counts DB statements per request and flags requests over QUERY_BUDGET.
+
+    A coarse dev-time guard: a fixed budget can't tell a small N+1 page from a
+    heavy endpoint. tests/test_query_counts.py checks that counts don't grow
+    with the page size.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    if counter.count > QUERY_BUDGET and not scope["path"].startswith(QUERY_BUDGET_EXEMPT_PREFIXES):
+                        logger.warning("{} {} ran {} queries (budget {})",
+                                       scope["method"], scope["path"], counter.count, QUERY_BUDGET)
+                        if QUERY_BUDGET_STRICT:
+                            raise RuntimeError(f"Query budget exceeded: {counter.count} > {QUERY_BUDGET}")
+                    if QUERY_COUNT_HEADER:
+                        message["headers"] = [*message.get("headers", []),
+                                              (b"x-query-count", str(counter.count).encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
@@ -0,0 +1,211 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from math import ceil
+from os import getenv
+from time import monotonic
+
+from fastapi import Depends, HTTPException, Request, status
+
+from ..utils.cache_handler import CACHE_REDIS_URL
+from ..utils.logger_handler import logger
+
+RATE_LIMIT_ENABLED = getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "memory" limits per worker; "redis" shares the buckets across workers and hosts
+RATE_LIMIT_BACKEND = getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = getenv("RATE_LIMIT_REDIS_URL", CACHE_REDIS_URL)
+RATE_LIMIT_MAX_KEYS = int(getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SWEEP_SECONDS = float(getenv("RATE_LIMIT_SWEEP_SECONDS", "60"))
+# Only behind a proxy that overwrites X-Forwarded-For, otherwise clients pick their own key
+RATE_LIMIT_TRUST_FORWARDED = getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Token bucket holding `limit` tokens, refilled evenly over `period` seconds."""
+    name: str
+    limit: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.limit / self.period
+
+    @classmethod
+    def parse(cls, name: str, rate: str) -> "RateLimitPolicy":
+        # e.g. "5/minute"
+        limit, _, period = rate.partition("/")
+        return cls(name=name, limit=int(limit), period=PERIODS[period.strip()])
+
+
+def policy_from_env(name: str, default: str) -> RateLimitPolicy:
+    return RateLimitPolicy.parse(name, getenv(f"RATE_LIMIT_{name.upper()}", default))
+
+
+# Per-route policies, each overridable with RATE_LIMIT_<NAME>="<limit>/<second|minute|hour|day>" ->
+LOGIN_LIMIT = policy_from_env("login", "10/minute")
+SIGNUP_LIMIT = policy_from_env("signup", "10/hour")
+POST_CREATE_LIMIT = policy_from_env("post_create", "30/hour")
+COMMENT_CREATE_LIMIT = policy_from_env("comment_create", "30/minute")
+PUBLIC_READ_LIMIT = policy_from_env("public_read", "300/minute")
+
+
+class RateLimitStore:
+    async def take(self, key: str, policy: RateLimitPolicy) -> tuple[bool, float]:
+        """Take one token from `key`'s bucket; returns (allowed, tokens left)."""
+        raise NotImplementedError
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-worker buckets, O(1) per request; idle buckets are swept periodically."""
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS, sweep_interval: float = RATE_LIMIT_SWEEP_SECONDS):
+        self.maxsize = maxsize
+        self.sweep_interval = sweep_interval
+        # key -> (tokens, updated at, seconds to refill completely)
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+        self._swept_at = monotonic()
+
+    async def take(self, key: str, policy: RateLimitPolicy) -> tuple[bool, float]:
+        now = monotonic()
+        if now - self._swept_at >= self.sweep_interval:
+            self._sweep(now)
+
+        tokens, updated_at, _ = self._buckets.pop(key, (policy.limit, now, 0.0))
+        tokens = min(policy.limit, tokens + (now - updated_at) * policy.refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now, (policy.limit - tokens) / policy.refill_rate)
+
+        # Least recently used first; dropping a bucket only forgives its client
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def _sweep(self, now: float) -> None:
+        # A bucket that has refilled is the same as no bucket
+        self._buckets = OrderedDict(
+            (key, bucket) for key, bucket in self._buckets.items() if now - bucket[1] < bucket[2]
+        )
+        self._swept_at = now
+
+
+# Atomic refill-and-take; Redis' own clock keeps workers consistent
+TOKEN_BUCKET_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or limit
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(limit, tokens + (now - updated_at) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((limit - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Buckets shared by every worker; expire once they would be full again."""
+
+    def __init__(self, url: str):
+        # Optional dependency, only needed when RATE_LIMIT_BACKEND=redis
+        from redis import asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, policy: RateLimitPolicy) -> tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[f"ratelimit:{key}"], args=[policy.limit, policy.refill_rate])
+        return bool(allowed), float(tokens)
+
+
+def make_store() -> RateLimitStore:
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitStore(RATE_LIMIT_REDIS_URL)
+    return MemoryRateLimitStore()
+
+
+rate_limit_store = make_store()
+
+
+def client_key(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return f"ip:{forwarded_for.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit_headers(policy: RateLimitPolicy, tokens: float) -> dict[str, str]:
+    # draft-ietf-httpapi-ratelimit-headers: reset is the seconds until the bucket is full again
+    return {
+        "RateLimit-Limit": str(policy.limit),
+        "RateLimit-Remaining": str(int(tokens)),
+        "RateLimit-Reset": str(ceil((policy.limit - tokens) / policy.refill_rate)),
+        "RateLimit-Policy": f"{policy.limit};w={int(policy.period)}",
+    }
+
+
+async def check_rate_limit(request: Request, policy: RateLimitPolicy, key: str) -> None:
+    if not RATE_LIMIT_ENABLED:
+        return
+    allowed, tokens = await rate_limit_store.take(f"{policy.name}:{key}", policy)
+    headers = rate_limit_headers(policy, tokens)
+    if not allowed:
+        logger.warning("Rate limit {} exceeded by {}", policy.name, key)
+        retry_after = ceil((1 - tokens) / policy.refill_rate)
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests",
+                            headers={**headers, "Retry-After": str(retry_after)})
+    # Added to the response by RateLimitHeadersMiddleware, also when the route returns its own Response
+    request.state.rate_limit_headers = headers
+
+
+def rate_limit(policy: RateLimitPolicy, principal=None):
+    """
+    Route dependency enforcing `policy`, keyed by the client IP.
+
+    With `principal` (e.g. get_current_user) the bucket belongs to the
+    authenticated user instead, so users behind one NAT don't share it.
+    """
+    if principal is None:
+        async def limit_client(request: Request) -> None:
+            await check_rate_limit(request, policy, client_key(request))
+
+        return limit_client
+
+    async def limit_user(request: Request, user=Depends(principal)) -> None:
+        await check_rate_limit(request, policy, f"user:{user.id}")
+
+    return limit_user
+
+
+class RateLimitHeadersMiddleware:
+    """Copies the RateLimit-* headers of the route's policy onto its response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get("rate_limit_headers")
+                present = {name.lower() for name, _ in message.get("headers", [])}
+                if headers and b"ratelimit-limit" not in present:
+                    message["headers"] = [*message.get("headers", []),
+                                          *((name.lower().encode(), value.encode()) for name, value in headers.items())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,226 @@
+import gzip
+import zlib
+from collections import OrderedDict
+from os import getenv
+
+from fastapi import Response, status
+from pydantic import BaseModel
+
+# Smaller bodies fit in a packet or two anyway; compressing them only costs CPU
+COMPRESSION_MIN_SIZE = int(getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+# Compressed bodies of ETagged responses, so a cached page is compressed once per encoding
+COMPRESSION_CACHE_SIZE = int(getenv("COMPRESSION_CACHE_SIZE", "256"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Every chunk must reach the client as soon as it is sent, which a compressor's buffer would hold back
+UNBUFFERED_TYPES = ("text/event-stream",)
+
+
+def model_response(model: BaseModel, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Serialize an already validated schema straight to JSON bytes with pydantic-core.
+
+    Returning the Response skips FastAPI's second validation against
+    response_model and the intermediate dict for the JSON encoder.
+    """
+    return Response(content=model.model_dump_json(), status_code=status_code, media_type="application/json")
+
+
+class Encoder:
+    """One-shot and streaming compression for a content coding."""
+    name: str
+
+    def compress(self, body: bytes) -> bytes:
+        raise NotImplementedError
+
+    def stream(self):
+        """Object with compress(chunk) -> bytes and flush() -> bytes."""
+        raise NotImplementedError
+
+
+class GzipEncoder(Encoder):
+    name = "gzip"
+
+    def compress(self, body: bytes) -> bytes:
+        return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+    def stream(self):
+        return zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+class BrotliEncoder(Encoder):
+    name = "br"
+
+    def __init__(self):
+        import brotli
+
+        self._brotli = brotli
+
+    def compress(self, body: bytes) -> bytes:
+        return self._brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+
+    def stream(self):
+        return BrotliStream(self._brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY))
+
+
+class BrotliStream:
+    # brotli.Compressor names its methods process/finish
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder(Encoder):
+    name = "zstd"
+
+    def __init__(self):
+        import zstandard
+
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL)
+
+    def compress(self, body: bytes) -> bytes:
+        return self._compressor.compress(body)
+
+    def stream(self):
+        return self._compressor.compressobj()
+
+
+def available_encoders() -> dict[str, Encoder]:
+    """Encoders by preference; brotli and zstandard are optional dependencies."""
+    encoders = {}
+    for encoder_class in (ZstdEncoder, BrotliEncoder, GzipEncoder):
+        try:
+            encoder = encoder_class()
+        except ImportError:
+            continue
+        encoders[encoder.name] = encoder
+    return encoders
+
+
+def choose_encoding(accept_encoding: str, encoders: dict[str, Encoder]) -> str | None:
+    """The client's highest q-value coding we support; ties go to our preference order."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = quality
+
+    candidates = [(accepted.get(name, accepted.get("*", 0.0)), -rank, name)
+                  for rank, name in enumerate(encoders)]
+    quality, _, name = max(candidates, default=(0.0, 0, None))
+    return name if quality > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON/text responses with the best coding the client accepts
+    (zstd, br, gzip), once the body reaches COMPRESSION_MIN_SIZE.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders()
+        self._compressed: OrderedDict[tuple[bytes, str], bytes] = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = next((value.decode("latin-1") for name, value in scope["headers"]
+                                if name == b"accept-encoding"), "")
+        encoding = choose_encoding(accept_encoding, self.encoders) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        encoder = self.encoders[encoding]
+        start_message = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                # e.g. http.response.pathsend: the body is not ours to compress, the start goes out unchanged
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if stream is None:
+                headers = dict(start_message.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                # A partial body must stay byte-for-byte the identity range the client asked for
+                if (b"content-encoding" in headers or b"content-range" in headers
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)
+                        or content_type.startswith(UNBUFFERED_TYPES)
+                        or (not more_body and len(body) < self.minimum_size)):
+                    # Sent as is, from now on
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+
+                if not more_body:
+                    compressed = self._compress_whole(encoder, body, headers.get(b"etag"))
+                    await send(self._start(start_message, encoding, len(compressed)))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                # Streaming body of unknown length: compress chunk by chunk
+                stream = encoder.stream()
+                await send(self._start(start_message, encoding))
+
+            chunk = stream.compress(body)
+            if not more_body:
+                chunk += stream.flush()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _start(message: dict, encoding: str, content_length: int | None = None) -> dict:
+        headers = []
+        for name, value in message.get("headers", []):
+            if name == b"content-length":
+                continue
+            if name == b"etag" and not value.startswith(b"W/"):
+                # Same resource, different bytes: only weakly equal to the identity body
+                value = b"W/" + value
+            headers.append((name, value))
+        headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return {**message, "headers": headers}
+
+    def _compress_whole(self, encoder: Encoder, body: bytes, etag: bytes | None) -> bytes:
+        if etag is None or COMPRESSION_CACHE_SIZE <= 0:
+            return encoder.compress(body)
+        key = (etag, encoder.name)
+        compressed = self._compressed.get(key)
+        if compressed is None:
+            compressed = self._compressed[key] = encoder.compress(body)
+            while len(self._compressed) > COMPRESSION_CACHE_SIZE:
+                self._compressed.popitem(last=False)
+        else:
+            self._compressed.move_to_end(key)
+        return compressed
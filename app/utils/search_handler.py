@@ -0,0 +1,239 @@
+from html import escape
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, text, Float, String
+from sqlalchemy import UUID as SA_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.config import engine
+from ..utils.pagination_handler import PageParams, decode_cursor, encode_cursor
+
+# SQLite keeps posts and comments in one FTS5 table; comments point at their post
+# so a match in the discussion still surfaces the post.
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        kind UNINDEXED, entity_id UNINDEXED, post_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+# Postgres derives the vectors itself, so there is nothing to keep in sync by hand
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)",
+    """
+    ALTER TABLE comments ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(content, ''))
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_comments_search_vector ON comments USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_SQL = """
+WITH hits AS MATERIALIZED (
+    SELECT post_id,
+           bm25(search_index, 0.0, 0.0, 0.0, 10.0, 1.0) AS score,
+           snippet(search_index, -1, :mark_start, :mark_end, '...', 16) AS snippet
+    FROM search_index
+    WHERE search_index MATCH :query
+), best AS (
+    -- SQLite takes the bare snippet column from the row holding MIN(score)
+    SELECT post_id, MIN(score) AS score, snippet FROM hits GROUP BY post_id
+)
+SELECT posts.id AS id, best.score AS score, best.snippet AS snippet
+FROM best JOIN posts ON posts.id = best.post_id
+WHERE {filters}
+ORDER BY best.score, posts.id
+LIMIT :limit
+"""
+
+POSTGRES_SEARCH_SQL = """
+WITH query AS (
+    SELECT websearch_to_tsquery('english', :query) AS q
+), hits AS (
+    SELECT posts.id AS post_id,
+           -ts_rank(posts.search_vector, query.q) AS score,
+           ts_headline('english', posts.content, query.q, :headline_options) AS snippet
+    FROM posts, query
+    WHERE posts.search_vector @@ query.q
+    UNION ALL
+    SELECT comments.post_id,
+           -0.5 * ts_rank(comments.search_vector, query.q),
+           ts_headline('english', comments.content, query.q, :headline_options)
+    FROM comments, query
+    WHERE comments.search_vector @@ query.q AND comments.post_id IS NOT NULL
+), best AS (
+    SELECT DISTINCT ON (post_id) post_id, score, snippet FROM hits ORDER BY post_id, score
+)
+SELECT posts.id AS id, best.score AS score, best.snippet AS snippet
+FROM best JOIN posts ON posts.id = best.post_id
+WHERE {filters}
+ORDER BY best.score, posts.id
+LIMIT :limit
+"""
+
+
+# The database marks matches with these private-use characters; the snippet is HTML-escaped before
+# they become <mark> tags, so user-written markup in posts and comments never reaches clients as HTML
+MARK_START, MARK_END = "\ue000", "\ue001"
+
+
+def _highlight(snippet: str | None) -> str:
+    return escape(snippet or "").replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def _is_sqlite() -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+def create_search_index(connection) -> None:
+    """
+    Create the search structures on a schema built by metadata.create_all (tests, benchmark seeding);
+    safe to call repeatedly. Deployed databases get them from their Alembic revision, which keeps its own DDL.
+    """
+    statements = SQLITE_SEARCH_DDL if connection.dialect.name == "sqlite" else POSTGRES_SEARCH_DDL
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index(connection) -> None:
+    """Re-index every post and comment from scratch (SQLite only), e.g. after bulk loads."""
+    if connection.dialect.name != "sqlite":
+        return
+    connection.exec_driver_sql("DELETE FROM search_index")
+    connection.exec_driver_sql(
+        "INSERT INTO search_index (kind, entity_id, post_id, title, body) "
+        "SELECT 'post', id, id, title, content FROM posts"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO search_index (kind, entity_id, post_id, title, body) "
+        "SELECT 'comment', id, post_id, '', content FROM comments WHERE post_id IS NOT NULL"
+    )
+
+
+def _fts_query(raw: str) -> str:
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    terms = [term.replace('"', '""') for term in raw.split()]
+    return " ".join(f'"{term}"' for term in terms)
+
+
+async def index_post(db: AsyncSession, post) -> None:
+    if not _is_sqlite():
+        return
+    await db.execute(text("DELETE FROM search_index WHERE kind = 'post' AND entity_id = :id"), {"id": post.id.hex})
+    await index_posts(db, [{"id": post.id, "title": post.title, "content": post.content}])
+
+
+async def index_posts(db: AsyncSession, posts: list[dict]) -> None:
+    """Index new posts given as {"id", "title", "content"} rows, in one executemany."""
+    if not _is_sqlite() or not posts:
+        return
+    await db.execute(
+        text("INSERT INTO search_index (kind, entity_id, post_id, title, body) "
+             "VALUES ('post', :id, :id, :title, :body)"),
+        [{"id": post["id"].hex, "title": post["title"], "body": post["content"]} for post in posts],
+    )
+
+
+async def unindex_posts(db: AsyncSession, post_ids: list[UUID]) -> None:
+    if not _is_sqlite() or not post_ids:
+        return
+    # Drops the posts and every comment indexed under them
+    await db.execute(text("DELETE FROM search_index WHERE post_id = :id"),
+                     [{"id": post_id.hex} for post_id in post_ids])
+
+
+async def index_comment(db: AsyncSession, comment) -> None:
+    # Replaces any previous entry, so indexing a comment twice is harmless
+    await unindex_comment(db, comment.id)
+    await index_comments(db, [{"id": comment.id, "post_id": comment.post_id, "content": comment.content}])
+
+
+async def index_comments(db: AsyncSession, comments: list[dict]) -> None:
+    """Index new comments given as {"id", "post_id", "content"} rows, in one executemany."""
+    if not _is_sqlite() or not comments:
+        return
+    await db.execute(
+        text("INSERT INTO search_index (kind, entity_id, post_id, title, body) "
+             "VALUES ('comment', :id, :post_id, '', :body)"),
+        [{"id": comment["id"].hex, "post_id": comment["post_id"].hex, "body": comment["content"]}
+         for comment in comments],
+    )
+
+
+async def unindex_comment(db: AsyncSession, comment_id: UUID) -> None:
+    await unindex_comments(db, [comment_id])
+
+
+async def unindex_comments(db: AsyncSession, comment_ids: list[UUID]) -> None:
+    if not _is_sqlite() or not comment_ids:
+        return
+    await db.execute(text("DELETE FROM search_index WHERE kind = 'comment' AND entity_id = :id"),
+                     [{"id": comment_id.hex} for comment_id in comment_ids])
+
+
+async def search_posts(db: AsyncSession, query: str, params: PageParams,
+                       category_id: UUID | None = None, author_id: UUID | None = None) -> dict:
+    """
+    Rank posts whose title, content or comments match `query`.
+
+    Pages are keyed on (score, id), so results neither repeat nor go missing
+    between pages; every page still ranks all matches before the cursor filter
+    applies. Snippets are HTML-escaped text with the matches in <mark> tags.
+    Returns {"hits": [(post_id, score, snippet)], "next_cursor": ...}.
+    """
+    if _is_sqlite():
+        sql, query = SQLITE_SEARCH_SQL, _fts_query(query)
+    else:
+        sql = POSTGRES_SEARCH_SQL
+    if not query.strip():
+        return {"hits": [], "next_cursor": None}
+
+    filters = ["1 = 1"]
+    values = {"query": query, "limit": params.limit + 1}
+    binds = [bindparam("query", type_=String)]
+    if _is_sqlite():
+        values.update(mark_start=MARK_START, mark_end=MARK_END)
+        binds += [bindparam("mark_start", type_=String), bindparam("mark_end", type_=String)]
+    else:
+        values["headline_options"] = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxFragments=1"
+        binds.append(bindparam("headline_options", type_=String))
+
+    if category_id is not None:
+        filters.append("posts.category_id = :category_id")
+        values["category_id"] = category_id
+        binds.append(bindparam("category_id", type_=SA_UUID(as_uuid=True)))
+    if author_id is not None:
+        filters.append("posts.user_id = :author_id")
+        values["author_id"] = author_id
+        binds.append(bindparam("author_id", type_=SA_UUID(as_uuid=True)))
+    if params.cursor:
+        cursor = decode_cursor(params.cursor)
+        try:
+            values["last_score"] = float(cursor["score"])
+            values["last_id"] = UUID(cursor["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        filters.append("(best.score > :last_score OR (best.score = :last_score AND posts.id > :last_id))")
+        binds += [bindparam("last_score", type_=Float), bindparam("last_id", type_=SA_UUID(as_uuid=True))]
+
+    stmt = (text(sql.format(filters=" AND ".join(filters)))
+            .bindparams(*binds)
+            .columns(id=SA_UUID(as_uuid=True), score=Float, snippet=String))
+    rows = (await db.execute(stmt, values)).all()
+    hits = rows[:params.limit]
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        last = hits[-1]
+        next_cursor = encode_cursor({"score": last.score, "id": str(last.id)})
+
+    return {"hits": [(row.id, row.score, _highlight(row.snippet)) for row in hits], "next_cursor": next_cursor}
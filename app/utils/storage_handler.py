@@ -0,0 +1,261 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+from os import getenv
+from time import time
+from typing import AsyncIterable, AsyncIterator
+from uuid import uuid4
+
+import anyio
+
+from ..utils.jwt_handler import SECRET_KEY
+
+# "local" writes under STORAGE_LOCAL_ROOT on this node; "s3" any S3-compatible store (AWS, MinIO, ...)
+STORAGE_BACKEND = getenv("STORAGE_BACKEND", "local")
+STORAGE_LOCAL_ROOT = getenv("STORAGE_LOCAL_ROOT", "static")
+# Where main.py mounts STORAGE_LOCAL_ROOT
+STORAGE_LOCAL_MOUNT = "/static"
+# Prefix of the URLs handed to clients; by default the /static mount for local files, the bucket URL for S3
+STORAGE_PUBLIC_URL = getenv("STORAGE_PUBLIC_URL", "")
+STORAGE_PRESIGN_EXPIRES = int(getenv("STORAGE_PRESIGN_EXPIRES", "900"))
+STORAGE_READ_CHUNK_SIZE = 256 * 1024
+
+STORAGE_S3_BUCKET = getenv("STORAGE_S3_BUCKET", "blog-media")
+STORAGE_S3_REGION = getenv("STORAGE_S3_REGION", "us-east-1")
+# Set for MinIO, moto or any other local stand-in, e.g. http://localhost:9000
+STORAGE_S3_ENDPOINT_URL = getenv("STORAGE_S3_ENDPOINT_URL") or None
+STORAGE_S3_ACCESS_KEY = getenv("STORAGE_S3_ACCESS_KEY") or None
+STORAGE_S3_SECRET_KEY = getenv("STORAGE_S3_SECRET_KEY") or None
+# Streams up to this size go up in one PUT, bigger ones as multipart; S3 parts are at least 5 MiB
+STORAGE_MULTIPART_PART_SIZE = max(int(getenv("STORAGE_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+
+
+class StorageBackend:
+    """Object store for media, addressed by keys such as "images/<sha256>.png"."""
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], content_type: str) -> None:
+        """Store the streamed body under `key`; nothing is visible under it unless the stream completes."""
+        raise NotImplementedError
+
+    def get(self, key: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def move(self, source: str, destination: str, content_type: str) -> None:
+        """Make the object under `source` available under `destination` instead."""
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    async def presign_upload(self, key: str, content_type: str, sha256: str, size: int) -> dict:
+        """Where and how a client uploads `key` itself: {"url", "method", "headers"}."""
+        raise NotImplementedError
+
+    async def read(self, key: str) -> bytes:
+        return b"".join([chunk async for chunk in self.get(key)])
+
+
+class LocalStorageBackend(StorageBackend):
+    """Files under one directory; matches the original static/images layout."""
+
+    def __init__(self, root: str = STORAGE_LOCAL_ROOT, public_url: str = STORAGE_PUBLIC_URL or STORAGE_LOCAL_MOUNT):
+        self.root = os.path.realpath(root)
+        self.public_base = public_url.rstrip("/")
+
+    def path(self, key: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Storage key escapes the storage root: {key}")
+        return path
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], content_type: str) -> None:
+        path = self.path(key)
+        await anyio.to_thread.run_sync(lambda: os.makedirs(os.path.dirname(path), exist_ok=True))
+        # Next to the destination so the final rename is atomic
+        temp_path = os.path.join(os.path.dirname(path), f".{uuid4()}.part")
+        try:
+            async with await anyio.open_file(temp_path, "wb") as file:
+                async for chunk in chunks:
+                    await file.write(chunk)
+            await anyio.to_thread.run_sync(os.replace, temp_path, path)
+        except BaseException:
+            await anyio.to_thread.run_sync(lambda: os.path.exists(temp_path) and os.remove(temp_path))
+            raise
+
+    async def get(self, key: str) -> AsyncIterator[bytes]:
+        async with await anyio.open_file(self.path(key), "rb") as file:
+            while chunk := await file.read(STORAGE_READ_CHUNK_SIZE):
+                yield chunk
+
+    async def delete(self, key: str) -> None:
+        try:
+            await anyio.to_thread.run_sync(os.remove, self.path(key))
+        except FileNotFoundError:
+            pass
+
+    async def move(self, source: str, destination: str, content_type: str) -> None:
+        path = self.path(destination)
+        await anyio.to_thread.run_sync(lambda: os.makedirs(os.path.dirname(path), exist_ok=True))
+        await anyio.to_thread.run_sync(os.replace, self.path(source), path)
+
+    async def exists(self, key: str) -> bool:
+        return await anyio.to_thread.run_sync(os.path.isfile, self.path(key))
+
+    def public_url(self, key: str) -> str:
+        return f"{self.public_base}/{key}"
+
+    async def presign_upload(self, key: str, content_type: str, sha256: str, size: int) -> dict:
+        # No separate store to upload to: the API accepts the bytes on a signed, single-use-key URL
+        token = sign_upload({"key": key, "content_type": content_type, "sha256": sha256, "size": size,
+                             "expires": int(time()) + STORAGE_PRESIGN_EXPIRES})
+        return {"url": f"/api/v1/media/upload/{token}", "method": "PUT", "headers": {"Content-Type": content_type}}
+
+
+class S3StorageBackend(StorageBackend):
+    """S3-compatible bucket through aiobotocore; point STORAGE_S3_ENDPOINT_URL at MinIO/moto locally."""
+
+    def __init__(self, bucket: str = STORAGE_S3_BUCKET, public_url: str = STORAGE_PUBLIC_URL):
+        # Optional dependency, only needed when STORAGE_BACKEND=s3
+        from aiobotocore.session import get_session
+
+        self.bucket = bucket
+        self._session = get_session()
+        endpoint = STORAGE_S3_ENDPOINT_URL or f"https://s3.{STORAGE_S3_REGION}.amazonaws.com"
+        self.public_base = (public_url or f"{endpoint.rstrip('/')}/{bucket}").rstrip("/")
+
+    def _client(self):
+        return self._session.create_client("s3", region_name=STORAGE_S3_REGION, endpoint_url=STORAGE_S3_ENDPOINT_URL,
+                                           aws_access_key_id=STORAGE_S3_ACCESS_KEY,
+                                           aws_secret_access_key=STORAGE_S3_SECRET_KEY)
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], content_type: str) -> None:
+        async with self._client() as client:
+            buffer = bytearray()
+            upload_id, parts = None, []
+            try:
+                async for chunk in chunks:
+                    buffer += chunk
+                    while len(buffer) >= STORAGE_MULTIPART_PART_SIZE:
+                        if upload_id is None:
+                            upload = await client.create_multipart_upload(Bucket=self.bucket, Key=key,
+                                                                          ContentType=content_type)
+                            upload_id = upload["UploadId"]
+                        part, buffer = bytes(buffer[:STORAGE_MULTIPART_PART_SIZE]), buffer[STORAGE_MULTIPART_PART_SIZE:]
+                        parts.append(await self._upload_part(client, key, upload_id, len(parts) + 1, part))
+
+                if upload_id is None:
+                    # Small enough for a single request
+                    await client.put_object(Bucket=self.bucket, Key=key, Body=bytes(buffer), ContentType=content_type)
+                    return
+                if buffer:
+                    parts.append(await self._upload_part(client, key, upload_id, len(parts) + 1, bytes(buffer)))
+                await client.complete_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                                       MultipartUpload={"Parts": parts})
+            except BaseException:
+                # Otherwise the uploaded parts linger, billed, until a lifecycle rule removes them
+                if upload_id is not None:
+                    await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+                raise
+
+    async def _upload_part(self, client, key: str, upload_id: str, number: int, body: bytes) -> dict:
+        response = await client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number,
+                                            Body=body)
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    async def get(self, key: str) -> AsyncIterator[bytes]:
+        async with self._client() as client:
+            response = await client.get_object(Bucket=self.bucket, Key=key)
+            async with response["Body"] as body:
+                while chunk := await body.read(STORAGE_READ_CHUNK_SIZE):
+                    yield chunk
+
+    async def delete(self, key: str) -> None:
+        async with self._client() as client:
+            await client.delete_object(Bucket=self.bucket, Key=key)
+
+    async def move(self, source: str, destination: str, content_type: str) -> None:
+        # A server-side copy, the bytes don't come back through the API
+        async with self._client() as client:
+            await client.copy_object(Bucket=self.bucket, Key=destination, ContentType=content_type,
+                                     CopySource={"Bucket": self.bucket, "Key": source}, MetadataDirective="REPLACE")
+            await client.delete_object(Bucket=self.bucket, Key=source)
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        async with self._client() as client:
+            try:
+                await client.head_object(Bucket=self.bucket, Key=key)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                    return False
+                raise
+        return True
+
+    def public_url(self, key: str) -> str:
+        return f"{self.public_base}/{key}"
+
+    async def presign_upload(self, key: str, content_type: str, sha256: str, size: int) -> dict:
+        # The signed checksum makes S3 reject any body other than the one announced
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        async with self._client() as client:
+            url = await client.generate_presigned_url(
+                "put_object",
+                Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type, "ContentLength": size,
+                        "ChecksumSHA256": checksum},
+                ExpiresIn=STORAGE_PRESIGN_EXPIRES,
+            )
+        return {"url": url, "method": "PUT",
+                "headers": {"Content-Type": content_type, "x-amz-checksum-sha256": checksum}}
+
+
+async def iter_bytes(body: bytes) -> AsyncIterator[bytes]:
+    """An in-memory body as the chunk stream put() takes."""
+    yield body
+
+
+def sign_upload(claims: dict) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode()).decode().rstrip("=")
+    signature = hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()
+    return f"{payload}.{signature}"
+
+
+def verify_upload(token: str) -> dict | None:
+    """Claims of a token made by sign_upload, or None if forged or expired."""
+    payload, _, signature = token.partition(".")
+    expected = hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        return None
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    return claims if claims["expires"] >= time() else None
+
+
+def make_storage() -> StorageBackend:
+    if STORAGE_BACKEND == "s3":
+        return S3StorageBackend()
+    return LocalStorageBackend()
+
+
+storage = make_storage()
+
+
+def media_url(key: str) -> str:
+    """Public URL of a stored key; what clients see in place of the key."""
+    return storage.public_url(key)
+
+
+def storage_key(value: str) -> str:
+    """Key of a media URL handed out by media_url, or `value` itself when it already is a key."""
+    # Relative URLs too: "static/images/..." is what the local backend handed out before it defaulted to the mount
+    for prefix in dict.fromkeys((storage.public_url(""), storage.public_url("").lstrip("/"))):
+        if value.startswith(prefix):
+            return value[len(prefix):]
+    return value
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import math
+import os
+from bisect import insort
+from datetime import datetime
+from os import getenv
+from uuid import UUID
+
+from sqlalchemy import Float, bindparam, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.config import SessionLocal
+from ..models.app_models import Category, Comment, Post
+from ..utils.http_cache_handler import invalidate_responses
+from ..utils.logger_handler import logger
+
+TRENDING_HALF_LIFE_HOURS = float(getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_TOP_K = int(getenv("TRENDING_TOP_K", "100"))
+TRENDING_REFRESH_SECONDS = float(getenv("TRENDING_REFRESH_SECONDS", "60"))
+TRENDING_SNAPSHOT_FILE = getenv("TRENDING_SNAPSHOT_FILE", "data/trending.json")
+# Distinct posts with buffered views; further posts' views are dropped until the next flush
+TRENDING_MAX_PENDING_VIEWS = int(getenv("TRENDING_MAX_PENDING_VIEWS", "10000"))
+# Posts per statement/transaction when the buffered views are flushed
+TRENDING_FLUSH_CHUNK_SIZE = int(getenv("TRENDING_FLUSH_CHUNK_SIZE", "500"))
+
+# Weight of each event in the decayed sum
+POST_WEIGHT = 1.0
+COMMENT_WEIGHT = 3.0
+VIEW_WEIGHT = 0.1
+
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+SCORE_EPOCH = datetime(2024, 1, 1)
+
+
+# Post.hot_score is log(sum(weight * e^(DECAY_RATE * (t - SCORE_EPOCH)))) over the post's events.
+# Every score decays by the same factor, so ordering by the stored value is ordering by the
+# current decayed popularity; an event is one logaddexp, nothing is ever recomputed.
+
+# Executed with one parameter set per post; keeps updated_at, a new score is not an edit
+SET_SCORE = (update(Post).where(Post.id == bindparam("post_id"))  # type:ignore
+             .values(hot_score=bindparam("score"), updated_at=Post.updated_at)
+             .execution_options(synchronize_session=False))
+
+# add_event() evaluated by the database against the stored score, so concurrent events never overwrite
+# each other; "score" is the event_score() of the new event
+_event = bindparam("score", type_=Float)
+ADD_SCORE = (update(Post).where(Post.id == bindparam("post_id"))  # type:ignore
+             .values(hot_score=case(
+                 (or_(Post.hot_score.is_(None), Post.hot_score == 0), _event),
+                 (Post.hot_score >= _event, Post.hot_score + func.ln(1 + func.exp(_event - Post.hot_score))),
+                 else_=_event + func.ln(1 + func.exp(Post.hot_score - _event)),
+             ), updated_at=Post.updated_at)
+             .execution_options(synchronize_session=False))
+
+
+def event_score(weight: float = POST_WEIGHT, at: datetime | None = None) -> float:
+    return math.log(weight) + DECAY_RATE * ((at or datetime.now()) - SCORE_EPOCH).total_seconds()
+
+
+def add_event(hot_score: float | None, weight: float, at: datetime | None = None) -> float:
+    score = event_score(weight, at)
+    if not hot_score:
+        return score
+    high, low = max(hot_score, score), min(hot_score, score)
+    return high + math.log1p(math.exp(low - high))
+
+
+def current_popularity(hot_score: float) -> float:
+    """Decayed weighted event count as of now, for display."""
+    return math.exp(hot_score - DECAY_RATE * (datetime.now() - SCORE_EPOCH).total_seconds())
+
+
+class TopK:
+    """The K best (score, post) pairs, kept sorted; every operation is O(K)."""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._ranked: list[tuple[float, str]] = []  # (-score, post id), best first
+        self._scores: dict[str, float] = {}
+
+    def offer(self, post_id: str, score: float) -> None:
+        if post_id in self._scores:
+            self._ranked.remove((-self._scores.pop(post_id), post_id))
+        elif len(self._ranked) >= self.k and -score >= self._ranked[-1][0]:
+            return
+        insort(self._ranked, (-score, post_id))
+        self._scores[post_id] = score
+        if len(self._ranked) > self.k:
+            _, dropped = self._ranked.pop()
+            del self._scores[dropped]
+
+    def discard(self, post_id: str) -> None:
+        if post_id in self._scores:
+            self._ranked.remove((-self._scores.pop(post_id), post_id))
+
+    def top(self, limit: int) -> list[tuple[str, float]]:
+        return [(post_id, -negative) for negative, post_id in self._ranked[:limit]]
+
+
+class TrendingIndex:
+    """Per-category top K held in memory; the "" key ranks all posts."""
+
+    def __init__(self, k: int = TRENDING_TOP_K):
+        self.k = k
+        self._boards: dict[str, TopK] = {}
+        self._categories: dict[str, str] = {}
+
+    def _board(self, key: str) -> TopK:
+        if key not in self._boards:
+            self._boards[key] = TopK(self.k)
+        return self._boards[key]
+
+    def offer(self, post_id: UUID, category_id: UUID | None, score: float) -> None:
+        post_key, category_key = str(post_id), str(category_id) if category_id else ""
+        self._board("").offer(post_key, score)
+        if category_key:
+            self._board(category_key).offer(post_key, score)
+            self._categories[post_key] = category_key
+
+    def discard(self, post_id: UUID) -> None:
+        post_key = str(post_id)
+        self._board("").discard(post_key)
+        category_key = self._categories.pop(post_key, None)
+        if category_key:
+            self._board(category_key).discard(post_key)
+
+    def top(self, category_id: UUID | None, limit: int) -> list[tuple[UUID, float]]:
+        board = self._boards.get(str(category_id) if category_id else "")
+        return [(UUID(post_id), score) for post_id, score in board.top(limit)] if board else []
+
+    def replace(self, entries: list[tuple[str, str | None, float]]) -> None:
+        fresh = TrendingIndex(self.k)
+        for post_id, category_id, score in entries:
+            fresh.offer(UUID(post_id), UUID(category_id) if category_id else None, score)
+        self._boards, self._categories = fresh._boards, fresh._categories
+
+    def entries(self) -> list[tuple[str, str | None, float]]:
+        entries = {post_id: (post_id, None, score) for post_id, score in self._board("").top(self.k)}
+        for category_key, board in self._boards.items():
+            if category_key:
+                entries.update({post_id: (post_id, category_key, score) for post_id, score in board.top(self.k)})
+        return list(entries.values())
+
+
+trending_index = TrendingIndex()
+
+# post id -> views since the last flush; folded into hot_score in batches so reads never write
+_pending_views: dict[UUID, int] = {}
+
+
+def record_view(post_id: UUID) -> None:
+    """Count a view of an existing post; bounded, so the buffer can't be grown without limit."""
+    if post_id in _pending_views:
+        _pending_views[post_id] += 1
+    elif len(_pending_views) < TRENDING_MAX_PENDING_VIEWS:
+        _pending_views[post_id] = 1
+
+
+async def add_post_event(db: AsyncSession, post_id: UUID, weight: float) -> float | None:
+    """Add one event to a post inside the caller's transaction; returns the new score."""
+    connection = await db.connection()
+    return await connection.scalar(ADD_SCORE.returning(Post.hot_score),
+                                   {"post_id": post_id, "score": event_score(weight)})
+
+
+async def bump_scores(db: AsyncSession, weights: dict[UUID, float]) -> None:
+    """Add one event of the given weight per post, inside the caller's transaction."""
+    if not weights:
+        return
+    now = datetime.now()
+    # Through the connection: the ORM session would treat a parameter list as a bulk update by primary key
+    await (await db.connection()).execute(
+        ADD_SCORE, [{"post_id": post_id, "score": event_score(weight, now)} for post_id, weight in weights.items()]
+    )
+
+
+async def _flush_views(db: AsyncSession) -> None:
+    views = list(_pending_views.items())
+    _pending_views.clear()
+    for start in range(0, len(views), TRENDING_FLUSH_CHUNK_SIZE):
+        chunk = views[start:start + TRENDING_FLUSH_CHUNK_SIZE]
+        await bump_scores(db, {post_id: VIEW_WEIGHT * count for post_id, count in chunk})
+        await db.commit()
+
+
+async def refresh_trending() -> None:
+    """Fold buffered views into the scores and reload the top K per category."""
+    async with SessionLocal() as db:
+        await _flush_views(db)
+
+        # One index range scan of K rows per category, independent of the table size
+        entries = [(str(row.id), str(row.category_id) if row.category_id else None, row.hot_score)
+                   for row in await db.execute(select(Post.id, Post.category_id, Post.hot_score)
+                                               .order_by(Post.hot_score.desc()).limit(trending_index.k))]
+        for category_id in await db.scalars(select(Category.id)):
+            rows = await db.execute(select(Post.id, Post.hot_score)
+                                    .where(Post.category_id == category_id)  # type:ignore
+                                    .order_by(Post.hot_score.desc()).limit(trending_index.k))
+            entries += [(str(row.id), str(category_id), row.hot_score) for row in rows]
+
+    trending_index.replace(entries)
+    save_snapshot()
+    await invalidate_responses("trending")
+
+
+def save_snapshot(path: str = TRENDING_SNAPSHOT_FILE) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(trending_index.entries(), file)
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path: str = TRENDING_SNAPSHOT_FILE) -> None:
+    """Serve the last known ranking right after a restart, until the first refresh lands."""
+    try:
+        with open(path) as file:
+            trending_index.replace([tuple(entry) for entry in json.load(file)])
+    except FileNotFoundError:
+        return
+    except (ValueError, TypeError) as e:
+        logger.warning("Ignoring unreadable trending snapshot {}: {}", path, e)
+
+
+async def refresh_periodically(interval: float = TRENDING_REFRESH_SECONDS) -> None:
+    while True:
+        try:
+            await refresh_trending()
+        except Exception as e:
+            logger.error("Trending refresh failed: {}", e)
+        await asyncio.sleep(interval)
+
+
+def rebuild_hot_scores(connection) -> None:
+    """Recompute every post's hot_score from its creation and comment times (sync connection)."""
+    scores = {row.id: event_score(POST_WEIGHT, row.created_at)
+              for row in connection.execute(select(Post.id, Post.created_at))}
+    for row in connection.execute(select(Comment.post_id, Comment.created_at).where(Comment.post_id.is_not(None))):
+        if row.post_id in scores:
+            scores[row.post_id] = add_event(scores[row.post_id], COMMENT_WEIGHT, row.created_at)
+    if scores:
+        connection.execute(SET_SCORE, [{"post_id": post_id, "score": score} for post_id, score in scores.items()])
+
+
+async def _rebuild() -> None:
+    async with SessionLocal() as db:
+        connection = await db.connection()
+        await connection.run_sync(rebuild_hot_scores)
+        await db.commit()
+    await refresh_trending()
+
+
+if __name__ == "__main__":
+    # python -m app.utils.trending_handler
+    asyncio.run(_rebuild())
+    print(f"Rebuilt hot scores, snapshot written to {TRENDING_SNAPSHOT_FILE}")
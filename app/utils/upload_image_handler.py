@@ -1,43 +1,172 @@
 from fastapi import UploadFile, HTTPException, status
-import os
-import aiofiles
+from fastapi.responses import ORJSONResponse
+import hashlib
+import re
+from os import getenv
+from typing import AsyncIterable, AsyncIterator
 from uuid import uuid4
 
+from starlette.datastructures import Headers
+
 from ..utils.logger_handler import logger
+from ..utils.storage_handler import storage
 
+MAX_IMAGE_BYTES = int(getenv("MAX_IMAGE_BYTES", str(5 * 1024 * 1024)))
+# Room for the text fields sent along with the image in one multipart form
+MAX_FORM_FIELDS_BYTES = int(getenv("MAX_FORM_FIELDS_BYTES", str(1024 * 1024)))
+MAX_MULTIPART_BYTES = MAX_IMAGE_BYTES + MAX_FORM_FIELDS_BYTES
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
-async def upload_image_handler(image: UploadFile, upload_dir: str = "static/images/") -> str:
-    # Check if upload directory exists, if not, create it
-    if not os.path.exists(upload_dir):
-        os.makedirs(upload_dir)
+# Leading bytes of each accepted format -> stored extension
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpg",
+    b"\x89PNG\r\n\x1a\n": "png",
+}
+IMAGE_CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png"}
 
-    # Validate image file type based on the file extension
-    allowed_extensions = ["jpeg", "png", "jpg"]
-    file_extension = os.path.splitext(image.filename)[1].lower().strip('.') #type:ignore
+# Storage key of an original upload: content addressed, so identical images are stored once
+IMAGE_KEY = re.compile(r"^images/[0-9a-f]{64}\.(jpg|png)$")
 
-    if file_extension not in allowed_extensions:
-        logger.warning(f"Invalid file extension: {file_extension}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image type. Only JPEG, PNG, JPG are allowed."
-        )
 
-    # Generate a unique filename to avoid conflicts
-    unique_filename = f"{uuid4()}.{file_extension}"
-    file_location = os.path.join(upload_dir, unique_filename)
+def sniff_image_type(head: bytes) -> str | None:
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def image_key(sha256: str, extension: str) -> str:
+    return f"images/{sha256}.{extension}"
+
+
+class CheckedImageStream:
+    """
+    Passes an image body through while validating it.
+
+    The content is sniffed, not the client supplied name or type, the size is
+    capped at MAX_IMAGE_BYTES and the sha256 is computed on the way. Errors are
+    raised from inside the iteration, so a storage put consuming this stream
+    is aborted before anything becomes visible under the key.
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes], expected_sha256: str | None = None,
+                 expected_extension: str | None = None):
+        self.chunks = chunks
+        self.expected_sha256 = expected_sha256
+        self.expected_extension = expected_extension
+        self.extension: str | None = None
+        self.size = 0
+        self._digest = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.chunks:
+            if not chunk:
+                continue
+            if self.extension is None:
+                self.extension = sniff_image_type(chunk)
+                if self.extension is None:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                        detail="Invalid image type. Only JPEG, PNG, JPG are allowed.")
+                if self.expected_extension is not None and self.extension != self.expected_extension:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                        detail="Image content does not match the announced type")
+
+            self.size += len(chunk)
+            if self.size > MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    detail=f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+            self._digest.update(chunk)
+            yield chunk
+
+        if self.extension is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty image upload")
+        if self.expected_sha256 is not None and self.sha256 != self.expected_sha256:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Image content does not match the announced sha256")
+
+
+class MultipartLimitMiddleware:
+    """
+    Caps multipart request bodies at MAX_MULTIPART_BYTES before the form
+    parser spools them to disk: an oversized Content-Length is refused
+    without reading the body, and a body sent without one is cut off as soon
+    as it crosses the limit.
+    """
+
+    def __init__(self, app, limit: int = MAX_MULTIPART_BYTES):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.limit:
+            response = ORJSONResponse({"detail": f"Request body exceeds {self.limit} bytes"},
+                                      status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    # Raised into the form parsing, which passes HTTPExceptions through
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        detail=f"Request body exceeds {self.limit} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _upload_chunks(image: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await image.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
 
+async def upload_image_handler(image: UploadFile) -> str:
+    """Validate an uploaded image, store it and return its storage key."""
+    # The key is the content hash, only known once the upload went through: validated, hashed and stored in
+    # one pass under a temporary key, then moved into place
+    staging_key = f"incoming/{uuid4().hex}"
+    staged = False
     try:
-        # Save the image asynchronously
-        async with aiofiles.open(file_location, "wb") as file:
-            content = await image.read()
-            await file.write(content)
+        checked = CheckedImageStream(_upload_chunks(image))
+        await storage.put(staging_key, checked, "application/octet-stream")
+        staged = True
+        key = image_key(checked.sha256, checked.extension)
 
-        logger.info(f"Image successfully uploaded: {file_location}")
+        if await storage.exists(key):
+            logger.info("Image already stored, reusing: {}", key)
+        else:
+            await storage.move(staging_key, key, IMAGE_CONTENT_TYPES[checked.extension])
+            staged = False
+            logger.info("Image successfully uploaded: {}", key)
+    except HTTPException:
+        logger.warning("Rejected upload: {}", image.filename)
+        raise
     except Exception as e:
-        logger.error(f"Error saving image {image.filename}: {e}")
+        logger.error("Error saving image {}: {}", image.filename, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save image: {e}"
         )
+    finally:
+        if staged:
+            await storage.delete(staging_key)
 
-    return file_location
+    return key
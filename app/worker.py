@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import signal
+from contextlib import suppress
+
+from dotenv import load_dotenv
+
+# Before any app module is imported: they read their settings from env at import time
+load_dotenv()
+
+from .db.config import engines, warm_up_engines
+from .utils.image_variant_handler import shutdown_image_workers
+from .utils.logger_handler import configure_logging, logger
+from .utils.outbox_handler import drain_once, drain_periodically, purge_finished, requeue_dead
+
+
+async def run(args) -> None:
+    configure_logging()
+    await warm_up_engines()
+    try:
+        if args.requeue_dead:
+            logger.info("Requeued {} dead outbox events", await requeue_dead())
+        elif args.once:
+            logger.info("Ran {} outbox events, purged {}", await drain_once(), await purge_finished())
+        else:
+            drainer = asyncio.create_task(drain_periodically())
+            loop = asyncio.get_running_loop()
+            # Stopping mid-event is safe: an unfinished event is run again once its lease runs out
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, drainer.cancel)
+            logger.info("Outbox worker started")
+            with suppress(asyncio.CancelledError):
+                await drainer
+            logger.info("Outbox worker stopped")
+    finally:
+        shutdown_image_workers()
+        for db_engine in engines:
+            await db_engine.dispose()
+
+
+if __name__ == "__main__":
+    # python -m app.worker; set OUTBOX_IN_PROCESS=false on the API workers when running this
+    parser = argparse.ArgumentParser(description="Run the side effects queued in the outbox table.")
+    parser.add_argument("--once", action="store_true", help="drain what is due and exit")
+    parser.add_argument("--requeue-dead", action="store_true", help="retry dead-lettered events and exit")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,180 @@
+"""
+Watching a post for new comments: polling /comment/all against the SSE stream.
+
+Starts a server on a freshly seeded DB, has --watchers clients follow one
+post for --duration seconds while a writer adds a comment every
+--write-interval seconds, and reports for each strategy the requests and
+bytes the watchers caused and how long a new comment took to reach them.
+
+    python -m benchmarks.bench_comment_stream --watchers 50 --duration 20
+    python -m benchmarks.bench_comment_stream --poll-interval 1 --output stream.json
+
+Polling runs twice: plain, and revalidating with If-None-Match the way a
+well behaved client would.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.run import _free_port, _wait_until_ready
+from benchmarks.seed import seed, use_database
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class Traffic:
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.delays: list[float] = []
+
+
+def _seen(traffic: Traffic, created: dict[str, float], seen: set[str], contents) -> None:
+    # Comments are told apart by their content, known before the create request returns
+    now = time.perf_counter()
+    for content in contents:
+        if content in created and content not in seen:
+            seen.add(content)
+            traffic.delays.append(now - created[content])
+
+
+async def _poll(client: httpx.AsyncClient, url: str, args, traffic: Traffic, created: dict, stop: asyncio.Event,
+                revalidate: bool) -> None:
+    seen, etag = set(), None
+    while not stop.is_set():
+        headers = {"If-None-Match": etag} if revalidate and etag else {}
+        response = await client.get(url, params={"limit": 20}, headers=headers)
+        traffic.requests += 1
+        traffic.bytes += len(response.content) + sum(len(k) + len(v) for k, v in response.headers.items())
+        if response.status_code == 200:
+            etag = response.headers.get("etag")
+            _seen(traffic, created, seen, [item["content"] for item in response.json()["items"]])
+        await asyncio.sleep(args.poll_interval)
+
+
+async def _stream(client: httpx.AsyncClient, url: str, traffic: Traffic, created: dict) -> None:
+    # Runs until cancelled
+    seen = set()
+    traffic.requests += 1
+    async with client.stream("GET", url) as response:
+        traffic.bytes += sum(len(k) + len(v) for k, v in response.headers.items())
+        async for line in response.aiter_lines():
+            traffic.bytes += len(line) + 1
+            if line.startswith("data: {"):
+                _seen(traffic, created, seen, [json.loads(line[6:]).get("content")])
+
+
+async def _measure(base_url: str, strategy: str, args, ctx: dict) -> dict:
+    traffic, created, stop = Traffic(), {}, asyncio.Event()
+    post_id = ctx["post_id"]
+    limits = httpx.Limits(max_connections=args.watchers + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        if strategy == "sse":
+            watchers = [_stream(client, f"/api/v1/comment/stream/{post_id}", traffic, created)
+                        for _ in range(args.watchers)]
+        else:
+            watchers = [_poll(client, f"/api/v1/comment/all/{post_id}", args, traffic, created, stop,
+                              strategy == "poll_etag") for _ in range(args.watchers)]
+        tasks = [asyncio.create_task(watcher) for watcher in watchers]
+        await asyncio.sleep(1)
+
+        written = 0
+        ends_at = time.perf_counter() + args.duration
+        while time.perf_counter() < ends_at:
+            content = f"bench {strategy} {written}"
+            created[content] = time.perf_counter()
+            response = await client.post(f"/api/v1/comment/create/{post_id}", json={"content": content},
+                                         headers=ctx["auth"])
+            if response.status_code == 201:
+                written += 1
+            await asyncio.sleep(args.write_interval)
+
+        # Let the last comment reach the slowest pollers
+        await asyncio.sleep(args.poll_interval + 0.5)
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    delays = sorted(traffic.delays)
+    return {
+        "comments": written,
+        "requests": traffic.requests,
+        "kib_received": round(traffic.bytes / 1024, 1),
+        "delivered": f"{len(delays)}/{written * args.watchers}",
+        "delay_p50_ms": round(statistics.median(delays) * 1000, 1) if delays else None,
+        "delay_max_ms": round(delays[-1] * 1000, 1) if delays else None,
+    }
+
+
+async def _bench(args, info: dict) -> dict:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await _wait_until_ready(base_url)
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            response = await client.post("/api/v1/auth/login",
+                                         data={"username": info["admin_email"], "password": info["password"]})
+        ctx = {"post_id": info["post_ids"][0], "auth": {"Authorization": f"Bearer {response.json()['access_token']}"}}
+
+        results = {}
+        for strategy in ("poll", "poll_etag", "sse"):
+            print(f"  {strategy}...", file=sys.stderr)
+            results[strategy] = await _measure(base_url, strategy, args, ctx)
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--watchers", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per strategy")
+    parser.add_argument("--write-interval", type=float, default=2)
+    parser.add_argument("--poll-interval", type=float, default=2)
+    parser.add_argument("--comments", type=int, default=200, help="comments already on the post's page")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+    if args.output:
+        args.output = args.output.resolve()
+
+    with tempfile.TemporaryDirectory(prefix="blog-stream-") as directory:
+        workdir = Path(directory)
+        (workdir / "static" / "images").mkdir(parents=True)
+        (workdir / "logs").mkdir()
+        os.chdir(workdir)
+        use_database(workdir / "bench.db")
+        # Every watcher shares one address; the limits would turn polling into 429s
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+        info = asyncio.run(seed(users=20, categories=2, posts=1, comments=args.comments))
+        results = asyncio.run(_bench(args, info))
+
+    print(f"\n{'strategy':<12}{'requests':>10}{'KiB in':>10}{'delivered':>12}{'p50 delay ms':>14}{'max delay ms':>14}")
+    for strategy, result in results.items():
+        print(f"{strategy:<12}{result['requests']:>10}{result['kib_received']:>10}{result['delivered']:>12}"
+              f"{str(result['delay_p50_ms']):>14}{str(result['delay_max_ms']):>14}")
+
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "comment_stream", "watchers": args.watchers,
+                                           "duration": args.duration, "write_interval": args.write_interval,
+                                           "poll_interval": args.poll_interval, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+First screen of a heavily commented post: loading every comment and nesting
+them in Python against the threaded queries behind /comment/all and
+/comment/thread.
+
+Seeds one post with --comments comments (default 50000) shaped as threads:
+a --reply-ratio share of them answer an earlier comment, mostly a recent one,
+down to COMMENT_MAX_DEPTH. Reports latency and rows loaded per strategy.
+
+    python -m benchmarks.bench_comment_threads --comments 50000 --runs 20
+    python -m benchmarks.bench_comment_threads --depth 3 --output threads.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from benchmarks.seed import _insert_chunks, _sentence, seed, use_database
+
+
+async def _add_threads(post_id: UUID, comments: int, reply_ratio: float, seed_value: int = 0) -> None:
+    from sqlalchemy import select
+
+    from app.db.config import engine
+    from app.models.app_models import Comment, Post, User
+    from app.utils.comment_tree_handler import COMMENT_MAX_DEPTH, comment_path
+    from app.utils.counter_handler import recount
+
+    async with engine.connect() as conn:
+        user_ids = list(await conn.scalars(select(User.id)))
+    rng = random.Random(seed_value)
+    started = datetime.now() - timedelta(days=30)
+    rows = []
+    for i in range(comments):
+        parent = None
+        if rows and rng.random() < reply_ratio:
+            # Conversations happen around recent comments
+            parent = rows[max(0, len(rows) - 1 - int(rng.expovariate(1 / 200)))]
+            if parent["depth"] >= COMMENT_MAX_DEPTH:
+                parent = None
+        comment_id = uuid4()
+        created = started + timedelta(seconds=i * 30)
+        rows.append({"id": comment_id, "content": _sentence(rng, rng.randint(5, 40)), "user_id": rng.choice(user_ids),
+                     "post_id": post_id, "parent_id": parent and parent["id"],
+                     "path": comment_path(comment_id, parent and parent["path"]),
+                     "depth": parent["depth"] + 1 if parent else 0, "created_at": created, "updated_at": created})
+
+    async with engine.begin() as conn:
+        await _insert_chunks(conn, Comment.__table__, rows)
+        await recount(conn, Comment)
+        await recount(conn, Post)
+    await engine.dispose()
+
+
+async def _load_all(db, post_id: UUID) -> tuple[list, int]:
+    # What a client had to do before: fetch the post's every comment and build the tree itself
+    from sqlalchemy import select
+
+    from app.models.app_models import Comment
+    from app.utils.comment_tree_handler import nest
+
+    comments = list(await db.scalars(select(Comment).where(Comment.post_id == post_id)))
+    comments.sort(key=lambda comment: (comment.created_at, comment.id), reverse=True)
+    roots = [comment for comment in comments if comment.parent_id is None]
+    replies = sorted((comment for comment in comments if comment.parent_id is not None),
+                     key=lambda comment: comment.depth)
+    return nest(roots, replies), len(comments)
+
+
+async def _first_screen(db, post_id: UUID, depth: int) -> tuple[list, int]:
+    from sqlalchemy import select
+
+    from app.models.app_models import Comment
+    from app.utils.comment_tree_handler import load_threads
+    from app.utils.pagination_handler import PageParams, paginate
+
+    stmt = select(Comment).where(Comment.post_id == post_id, Comment.depth == 0)
+    threads = await load_threads(db, await paginate(db, stmt, Comment, PageParams()), depth)
+    return threads["items"], _count(threads["items"])
+
+
+async def _whole_thread(db, comment_id: UUID) -> tuple[list, int]:
+    from app.models.app_models import Comment
+    from app.utils.comment_tree_handler import COMMENT_MAX_DEPTH, COMMENT_MAX_REPLIES, fetch_replies, nest
+
+    comment = await db.get(Comment, comment_id)
+    replies = await fetch_replies(db, [comment], COMMENT_MAX_DEPTH, per_parent=COMMENT_MAX_REPLIES)
+    return nest([comment], replies), 1 + len(replies)
+
+
+def _count(nodes) -> int:
+    return sum(1 + _count(node.replies) for node in nodes)
+
+
+async def _bench(args, post_id: UUID) -> dict:
+    from sqlalchemy import func, select
+
+    from app.db.config import SessionLocal, engine
+    from app.models.app_models import Comment
+
+    async with SessionLocal() as db:
+        busiest = await db.scalar(select(Comment.id).where(Comment.post_id == post_id, Comment.depth == 0)
+                                  .order_by(Comment.reply_count.desc()).limit(1))
+        largest_depth = await db.scalar(select(func.max(Comment.depth)))
+
+    strategies = {
+        "load_all_and_nest": lambda db: _load_all(db, post_id),
+        "first_screen": lambda db: _first_screen(db, post_id, args.depth),
+        "busiest_thread": lambda db: _whole_thread(db, busiest),
+    }
+    results = {}
+    for name, strategy in strategies.items():
+        timings, rows = [], 0
+        for _ in range(args.runs):
+            # A fresh session per run, so nothing is served from the identity map
+            async with SessionLocal() as db:
+                started = time.perf_counter()
+                _, rows = await strategy(db)
+                timings.append(time.perf_counter() - started)
+        results[name] = {"p50_ms": round(statistics.median(timings) * 1000, 2),
+                         "max_ms": round(max(timings) * 1000, 2), "rows": rows}
+    await engine.dispose()
+    results["deepest_reply"] = largest_depth
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--reply-ratio", type=float, default=0.7)
+    parser.add_argument("--depth", type=int, default=2, help="reply levels nested on the first screen")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+    if args.output:
+        args.output = args.output.resolve()
+
+    with tempfile.TemporaryDirectory(prefix="blog-threads-") as directory:
+        workdir = Path(directory)
+        (workdir / "logs").mkdir()
+        os.chdir(workdir)
+        use_database(workdir / "bench.db")
+
+        info = asyncio.run(seed(users=50, categories=1, posts=1, comments=0))
+        post_id = UUID(info["post_ids"][0])
+        asyncio.run(_add_threads(post_id, args.comments, args.reply_ratio))
+        results = asyncio.run(_bench(args, post_id))
+
+    deepest = results.pop("deepest_reply")
+    print(f"\n{args.comments} comments, replies up to depth {deepest}")
+    print(f"{'strategy':<20}{'p50 ms':>10}{'max ms':>10}{'rows':>10}")
+    for name, result in results.items():
+        print(f"{name:<20}{result['p50_ms']:>10}{result['max_ms']:>10}{result['rows']:>10}")
+
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "comment_threads", "comments": args.comments,
+                                           "reply_ratio": args.reply_ratio, "depth": args.depth,
+                                           "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Cold start cost of a worker: importing app.main and answering the first request.
+
+Every sample runs in a fresh interpreter, like a newly scaled-out worker. The
+DB is a throwaway SQLite file migrated with `alembic upgrade head`.
+
+    python -m benchmarks.bench_import --runs 10 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Runs inside the child interpreter; prints one JSON line of timings
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/api/v1/posts/all")
+        return ready, response.status_code
+
+ready, status_code = asyncio.run(first_request())
+answered = time.perf_counter()
+print(json.dumps({"import_s": imported - started, "startup_s": ready - imported,
+                  "first_request_s": answered - ready, "total_s": answered - started, "status": status_code}))
+"""
+
+
+def _run_child(workdir: Path, env: dict, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", CHILD], cwd=workdir, env=env, capture_output=True,
+                          text=True, check=True)
+
+
+def _slowest_imports(stderr: str, top: int) -> list[tuple[str, float]]:
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Direct children of a top-level import (e.g. what app.main pulls in); deeper ones
+        # are already part of their parent's cumulative time
+        if name.startswith("  ") and not name.startswith("    "):
+            entries.append((name.strip(), int(cumulative) / 1000))
+    return sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="blog-import-") as directory:
+        workdir = Path(directory)
+        (workdir / "static" / "images").mkdir(parents=True)
+        (workdir / "logs").mkdir()
+        env = {**os.environ, "PYTHONPATH": str(REPO_ROOT),
+               "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'bench.db'}"}
+        subprocess.run([sys.executable, "-m", "alembic", "-c", str(REPO_ROOT / "alembic.ini"), "upgrade", "head"],
+                       cwd=REPO_ROOT, env=env, capture_output=True, check=True)
+
+        samples = [json.loads(_run_child(workdir, env).stdout.splitlines()[-1]) for _ in range(args.runs)]
+        slowest = _slowest_imports(_run_child(workdir, env, "-X", "importtime").stderr, args.top)
+
+    summary = {
+        metric: {"median_ms": round(statistics.median(s[metric] for s in samples) * 1000, 1),
+                 "max_ms": round(max(s[metric] for s in samples) * 1000, 1)}
+        for metric in ("import_s", "startup_s", "first_request_s", "total_s")
+    }
+    print(json.dumps(summary, indent=2))
+    print("\nslowest imports (cumulative ms):")
+    for name, cumulative_ms in slowest:
+        print(f"  {cumulative_ms:8.1f}  {name}")
+
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "import", "runs": args.runs, "results": summary,
+                                           "slowest_imports": slowest}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
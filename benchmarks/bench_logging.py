@@ -0,0 +1,82 @@
+"""
+Per-request logging overhead, before and after the structured/sampled setup.
+
+Each simulated request emits the same three INFO lines a typical handler does
+(access line, handler message, one with user supplied values). Both setups
+write to files in a temp directory so terminal speed does not skew results.
+
+    python -m benchmarks.bench_logging --requests 20000 --sample-rate 0.1
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from app.utils import logger_handler
+
+
+def _simulate_requests(count: int, legacy: bool, sample_rate: float = 1.0) -> float:
+    title = "A fairly typical post title"
+    started = time.perf_counter()
+    for i in range(count):
+        if legacy:
+            logger.info(f"GET /api/v1/posts/{i} 200")
+            logger.info(f"Post {title} fetched successfully!")
+            logger.info(f"Comment '{title * 4}' created successfully!")
+        else:
+            logger_handler.log_sampled_var.set(random.random() < sample_rate)
+            logger.info("{} {} {}", "GET", f"/api/v1/posts/{i}", 200)
+            logger.info("Post {} fetched successfully!", title)
+            logger.info("Comment {} created successfully!", i)
+    logger.complete()
+    return time.perf_counter() - started
+
+
+def _legacy_setup(directory: Path) -> None:
+    logger.remove()
+    logger.configure(patcher=None)
+    logger.add(directory / "stderr.log", backtrace=True, diagnose=True)
+    logger.add(directory / "app.log", rotation="100 MB", retention="10 days", enqueue=True, backtrace=True,
+               diagnose=True)
+
+
+def _structured_setup(directory: Path) -> None:
+    logger.remove()
+    logger.configure(patcher=logger_handler._add_request_id)
+    for name, enqueue in (("stderr.log", False), ("app.log", True)):
+        logger.add(directory / name, format=logger_handler._json_format, filter=logger_handler._sampling_filter,
+                   enqueue=enqueue, backtrace=False, diagnose=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        _legacy_setup(Path(directory))
+        results["before"] = _simulate_requests(args.requests, legacy=True)
+
+    for label, rate in (("after_unsampled", 1.0), ("after_sampled", args.sample_rate)):
+        with tempfile.TemporaryDirectory() as directory:
+            _structured_setup(Path(directory))
+            results[label] = _simulate_requests(args.requests, legacy=False, sample_rate=rate)
+
+    logger.remove()
+    summary = {label: {"total_s": round(total, 4), "per_request_us": round(total / args.requests * 1e6, 2)}
+               for label, total in results.items()}
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "logging", "requests": args.requests,
+                                           "sample_rate": args.sample_rate, "results": summary}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Requests/sec for post images: the old StaticFiles mount against MediaFiles.
+
+Both serve the same directory of content-addressed images (small, medium
+and large) to concurrent clients, for plain GETs, revalidations
+(If-None-Match -> 304) and Range requests.
+
+    python -m benchmarks.bench_media --requests 2000 --concurrency 32
+    python -m benchmarks.bench_media --mode uvicorn
+
+`asgi` measures the app's own overhead in-process; `uvicorn` goes over
+real sockets, where file I/O and the server's send path show up too.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+IMAGE_SIZES = {"small": 8 * 1024, "medium": 200 * 1024, "large": 2 * 1024 * 1024}
+FILES_PER_SIZE = 20
+
+
+def static_app():
+    from fastapi import FastAPI
+    from fastapi.staticfiles import StaticFiles
+
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=os.environ["MEDIA_BENCH_DIR"]), name="static")
+    return app
+
+
+def media_app():
+    from fastapi import FastAPI
+
+    from app.utils.media_handler import MediaFiles
+
+    app = FastAPI()
+    app.mount("/static", MediaFiles(directory=os.environ["MEDIA_BENCH_DIR"]), name="static")
+    return app
+
+
+def write_images(directory: Path) -> dict[str, list[str]]:
+    names = {}
+    for label, size in IMAGE_SIZES.items():
+        names[label] = []
+        for i in range(FILES_PER_SIZE):
+            body = b"\x89PNG\r\n\x1a\n" + os.urandom(size - 8)
+            name = f"{hashlib.sha256(body).hexdigest()}.png"
+            (directory / name).write_bytes(body)
+            names[label].append(name)
+    return names
+
+
+async def _run(client: httpx.AsyncClient, requests: int, concurrency: int, build) -> dict:
+    latencies, errors, transferred = [], 0, 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors, transferred
+        for i in counter:
+            url, headers, expected = build(i)
+            started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            transferred += len(response.content)
+            if response.status_code != expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+        "mib_per_s": round(transferred / elapsed / 2 ** 20, 1),
+        "errors": errors,
+    }
+
+
+def _scenarios(names: dict[str, list[str]], etags: dict[str, str]) -> dict:
+    scenarios = {}
+    for label, files in names.items():
+        scenarios[f"get_{label}"] = lambda i, files=files: (f"/static/{files[i % len(files)]}", {}, 200)
+    medium = names["medium"]
+    scenarios["revalidate_medium"] = lambda i: (f"/static/{medium[i % len(medium)]}",
+                                                {"If-None-Match": etags[medium[i % len(medium)]]}, 304)
+    large = names["large"]
+    scenarios["range_large"] = lambda i: (f"/static/{large[i % len(large)]}", {"Range": "bytes=0-65535"}, 206)
+    return scenarios
+
+
+async def _bench_client(client: httpx.AsyncClient, names: dict, args) -> dict:
+    # Each implementation revalidates with the ETag it handed out itself
+    etags = {}
+    for files in names.values():
+        for name in files:
+            etags[name] = (await client.get(f"/static/{name}")).headers["etag"]
+
+    results = {}
+    for scenario, build in _scenarios(names, etags).items():
+        print(f"  {scenario}...", file=sys.stderr)
+        results[scenario] = await _run(client, args.requests, args.concurrency, build)
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _bench(factory: str, names: dict, args) -> dict:
+    if args.mode == "asgi":
+        app = globals()[factory]()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            return await _bench_client(client, names, args)
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"benchmarks.bench_media:{factory}", "--factory", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=REPO_ROOT, env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            for _ in range(150):
+                try:
+                    await client.get("/static/missing")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.2)
+            return await _bench_client(client, names, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="blog-media-") as directory:
+        os.environ["MEDIA_BENCH_DIR"] = directory
+        names = write_images(Path(directory))
+        results = {}
+        for factory in ("static_app", "media_app"):
+            print(f"{factory}:", file=sys.stderr)
+            results[factory] = asyncio.run(_bench(factory, names, args))
+
+    print(f"\n{'scenario':<20}{'StaticFiles rps':>16}{'MediaFiles rps':>16}{'change':>10}")
+    for scenario, before in results["static_app"].items():
+        after = results["media_app"][scenario]
+        change = (after["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100
+        print(f"{scenario:<20}{before['throughput_rps']:>16}{after['throughput_rps']:>16}{change:>+9.1f}%")
+
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "media", "mode": args.mode, "requests": args.requests,
+                                           "concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
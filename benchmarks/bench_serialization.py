@@ -0,0 +1,119 @@
+"""
+CPU cost and bytes on the wire of one large posts page (default 1000 posts).
+
+Compares the ways a route can turn ORM rows into a response body:
+
+- default:    response_model validation, jsonable_encoder and json.dumps
+              (FastAPI's path for a route returning ORM objects or dicts)
+- orjson:     response_model validation, dump to python and orjson.dumps
+              (the same route under ORJSONResponse)
+- pydantic:   one model_validate and model_dump_json straight to bytes
+              (cached_response / model_response)
+
+and then each available content coding on the resulting body. No DB is
+involved; the rows are unsaved Post objects.
+
+    python -m benchmarks.bench_serialization --posts 1000 --runs 20
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+from benchmarks.seed import WORDS
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def build_page(posts: int, seed_value: int = 0) -> dict:
+    from app.models.app_models import Category, Post, User
+
+    rng = random.Random(seed_value)
+    now = datetime(2026, 1, 1)
+    authors = [User(id=uuid4(), username=f"user{i}") for i in range(50)]
+    categories = [Category(id=uuid4(), name=f"category{i}") for i in range(20)]
+    items = []
+    for i in range(posts):
+        created_at = now - timedelta(minutes=i)
+        items.append(Post(id=uuid4(), title=_sentence(rng, 6), content=_sentence(rng, rng.randint(80, 400)),
+                          image=f"images/{uuid4().hex}.png", image_variants=None,
+                          author=rng.choice(authors), category=rng.choice(categories),
+                          comment_count=rng.randint(0, 50), created_at=created_at, updated_at=created_at))
+    return {"items": items, "next_cursor": "bench"}
+
+
+def serializers() -> dict:
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.schemas.post_schema import PostPageSchema
+
+    # What FastAPI does with response_model: validate the return value, then serialize it to python
+    response_field = TypeAdapter(PostPageSchema)
+
+    def validated(page: dict) -> PostPageSchema:
+        return response_field.validate_python(page, from_attributes=True)
+
+    return {
+        "default": lambda page: JSONResponse(
+            jsonable_encoder(response_field.dump_python(validated(page), mode="json"))).body,
+        "orjson": lambda page: orjson.dumps(response_field.dump_python(validated(page), mode="json")),
+        "pydantic": lambda page: PostPageSchema.model_validate(page, from_attributes=True).model_dump_json().encode(),
+    }
+
+
+def _cpu_ms(function, runs: int) -> tuple[float, float, object]:
+    samples, result = [], None
+    for _ in range(runs):
+        started = time.process_time()
+        result = function()
+        samples.append((time.process_time() - started) * 1000)
+    return round(statistics.median(samples), 2), round(max(samples), 2), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    from app.utils.response_handler import available_encoders
+
+    page = build_page(args.posts)
+    results = {"serialization": {}, "compression": {}}
+
+    bodies = {}
+    for name, serialize in serializers().items():
+        median_ms, max_ms, body = _cpu_ms(lambda: serialize(page), args.runs)
+        bodies[name] = body
+        results["serialization"][name] = {"cpu_median_ms": median_ms, "cpu_max_ms": max_ms, "bytes": len(body)}
+    if len({json.dumps(json.loads(body), sort_keys=True) for body in bodies.values()}) != 1:
+        raise SystemExit("serializers disagree on the page content")
+
+    body = bodies["pydantic"]
+    results["compression"]["identity"] = {"cpu_median_ms": 0.0, "bytes": len(body), "ratio": 1.0}
+    for name, encoder in available_encoders().items():
+        median_ms, max_ms, compressed = _cpu_ms(lambda: encoder.compress(body), args.runs)
+        results["compression"][name] = {"cpu_median_ms": median_ms, "cpu_max_ms": max_ms, "bytes": len(compressed),
+                                        "ratio": round(len(body) / len(compressed), 2)}
+    if "gzip" in results["compression"]:
+        assert gzip.decompress(available_encoders()["gzip"].compress(body)) == body
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps({"benchmark": "serialization", "posts": args.posts, "runs": args.runs,
+                                           "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark the blog API's hot endpoints against a freshly seeded throwaway DB.
+
+    python -m benchmarks.run --mode asgi --requests 500 --concurrency 16
+    python -m benchmarks.run --mode uvicorn --posts 50000 --compare benchmarks/results/asgi-20261018-101500.json
+    python -m benchmarks.run --trace traffic.jsonl
+
+`asgi` drives the app in-process through httpx's ASGI transport and also
+reports per-request peak allocations (tracemalloc); `uvicorn` starts a local
+server and goes over real sockets. Results are written as JSON under
+benchmarks/results/ so runs can be compared with --compare.
+
+A trace is JSON lines with at least "method" and "path" (optional "json",
+"data", "auth": true); lines without them are skipped.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+from benchmarks.seed import WORDS, seed, use_database
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+ALLOCATION_SAMPLES = 50
+
+
+def _sample_png() -> bytes:
+    try:
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), (200, 80, 40)).save(buffer, format="PNG")
+        return buffer.getvalue()
+    except ImportError:
+        return b"\x89PNG\r\n\x1a\n" + bytes(256)
+
+
+def _scenarios(ctx: dict) -> dict:
+    auth = {"Authorization": f"Bearer {ctx['token']}"}
+    image = _sample_png()
+
+    return {
+        "get_posts": lambda i: {"method": "GET", "url": "/api/v1/posts/all", "params": {"limit": 20}},
+        "get_posts_summary": lambda i: {"method": "GET", "url": "/api/v1/posts/all",
+                                        "params": {"limit": 20, "fields": "summary"}},
+        "get_posts_deep_page": lambda i: {"method": "GET", "url": "/api/v1/posts/all",
+                                          "params": {"limit": 20, "cursor": ctx["deep_cursor"]}},
+        "get_post_by_id": lambda i: {"method": "GET",
+                                     "url": f"/api/v1/posts/{ctx['post_ids'][i % len(ctx['post_ids'])]}"},
+        "get_all_categories": lambda i: {"method": "GET", "url": "/api/v1/category/all"},
+        "get_trending_posts": lambda i: {"method": "GET", "url": "/api/v1/posts/trending",
+                                         "params": {"category_id": ctx["category_ids"][i % len(ctx["category_ids"])]}},
+        "search_posts": lambda i: {"method": "GET", "url": "/api/v1/posts/search",
+                                   "params": {"q": WORDS[i % len(WORDS)]}},
+        "login_user": lambda i: {"method": "POST", "url": "/api/v1/auth/login",
+                                 "data": {"username": ctx["admin_email"], "password": ctx["password"]}},
+        "create_post": lambda i: {"method": "POST", "url": "/api/v1/posts/create", "headers": auth,
+                                  "data": {"new_title": f"Benchmark post {i}",
+                                           "new_content": "Benchmark content " * 20,
+                                           "new_category_id": ctx["category_ids"][i % len(ctx["category_ids"])]},
+                                  "files": {"image": (f"bench{i}.png", image, "image/png")}},
+    }
+
+
+def _trace_scenario(path: Path, ctx: dict):
+    auth = {"Authorization": f"Bearer {ctx['token']}"}
+    entries, skipped = [], 0
+    for line in path.read_text().splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            skipped += 1
+            continue
+        if not isinstance(entry, dict) or "method" not in entry or "path" not in entry:
+            skipped += 1
+            continue
+        request = {"method": entry["method"].upper(), "url": entry["path"]}
+        for key in ("json", "data", "params"):
+            if key in entry:
+                request[key] = entry[key]
+        if entry.get("auth"):
+            request["headers"] = auth
+        entries.append(request)
+
+    print(f"trace: {len(entries)} requests loaded, {skipped} lines skipped", file=sys.stderr)
+    if not entries:
+        return None
+    return lambda i: entries[i % len(entries)]
+
+
+def _percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+async def _run_scenario(client: httpx.AsyncClient, build, requests: int, concurrency: int,
+                        measure_allocations: bool) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            response = await client.request(**build(index))
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+    }
+
+    if measure_allocations:
+        # Sequential pass: peak traced memory above the baseline while one request runs
+        peaks = []
+        tracemalloc.start()
+        for index in range(ALLOCATION_SAMPLES):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await client.request(**build(requests + index))
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+        result["peak_alloc_kib"] = round(statistics.mean(peaks) / 1024, 2)
+
+    return result
+
+
+async def _prepare_context(client: httpx.AsyncClient, info: dict) -> dict:
+    response = await client.post("/api/v1/auth/login",
+                                 data={"username": info["admin_email"], "password": info["password"]})
+    response.raise_for_status()
+
+    # Walk far enough to get a cursor that is deep into the table
+    cursor = None
+    for _ in range(min(50, info["posts"] // 100)):
+        page = (await client.get("/api/v1/posts/all", params={"limit": 100, **({"cursor": cursor} if cursor else {})}))
+        cursor = page.json().get("next_cursor") or cursor
+
+    return {**info, "token": response.json()["access_token"], "deep_cursor": cursor or ""}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/metrics")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"uvicorn did not start within {timeout}s")
+
+
+async def _run_all(args, info: dict, workdir: Path) -> dict:
+    selected = args.endpoints.split(",") if args.endpoints else None
+
+    async def run_with(client: httpx.AsyncClient, measure_allocations: bool) -> dict:
+        ctx = await _prepare_context(client, info)
+        scenarios = _scenarios(ctx)
+        if args.trace:
+            trace = _trace_scenario(args.trace, ctx)
+            scenarios = {"trace": trace} if trace else {}
+        results = {}
+        for name, build in scenarios.items():
+            if selected and name not in selected:
+                continue
+            print(f"running {name}...", file=sys.stderr)
+            results[name] = await _run_scenario(client, build, args.requests, args.concurrency, measure_allocations)
+        return results
+
+    if args.mode == "asgi":
+        from app.main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                return await run_with(client, measure_allocations=True)
+
+    port = _free_port()
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await _wait_until_ready(base_url)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            return await run_with(client, measure_allocations=False)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def _print_comparison(current: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())["endpoints"]
+    print(f"\n{'endpoint':<22}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "peak_alloc_kib"):
+            old, new = baseline[name].get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{name:<22}{metric:<16}{old:>12}{new:>12}{change:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoints", help="comma separated subset of scenarios to run")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--trace", type=Path, help="JSON lines traffic trace to replay instead of the scenarios")
+    parser.add_argument("--output", type=Path, help="result file (default: benchmarks/results/<mode>-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="previous result file to diff against")
+    args = parser.parse_args()
+
+    if args.trace:
+        args.trace = args.trace.resolve()
+    if args.compare:
+        args.compare = args.compare.resolve()
+
+    with tempfile.TemporaryDirectory(prefix="blog-bench-") as directory:
+        workdir = Path(directory)
+        (workdir / "static" / "images").mkdir(parents=True)
+        (workdir / "logs").mkdir()
+        # The app resolves static/ and logs/ relative to the working directory
+        os.chdir(workdir)
+        use_database(workdir / "bench.db")
+        # Every request comes from one client; the limits would turn the numbers into 429s
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+        info = asyncio.run(seed(args.users, args.categories, args.posts, args.comments))
+        endpoints = asyncio.run(_run_all(args, info, workdir))
+
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git_commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                         capture_output=True, text=True).stdout.strip(),
+            "dataset": {key: info[key] for key in ("users", "categories", "posts", "comments")},
+        },
+        "endpoints": endpoints,
+    }
+
+    output = args.output or RESULTS_DIR / f"{args.mode}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(endpoints, indent=2))
+    print(f"\nresults written to {output}", file=sys.stderr)
+
+    if args.compare:
+        _print_comparison(endpoints, args.compare)
+
+
+if __name__ == "__main__":
+    main()
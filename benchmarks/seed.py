@@ -0,0 +1,117 @@
+"""
+Seed a throwaway database with synthetic users, categories, posts and comments.
+
+    python -m benchmarks.seed --db /tmp/blog-bench.db --users 200 --posts 10000 --comments 50000
+
+Every user gets the password in BENCH_PASSWORD, user0@bench.example.com is an admin.
+DATABASE_URL is pointed at --db before the app is imported, so the real
+blog.db is never touched.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+BENCH_PASSWORD = "benchmark-password"
+CHUNK_SIZE = 1000
+
+WORDS = ("python fastapi sqlite async index cache latency query stream image search cursor worker "
+         "pool bucket thread event loop comment post category trending feed schema token "
+         "migration replica compression payload benchmark").split()
+
+
+def use_database(db_path: Path) -> str:
+    url = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["DATABASE_URL"] = url
+    return url
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+async def _insert_chunks(conn, table, rows: list[dict]) -> None:
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), CHUNK_SIZE):
+        await conn.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+async def seed(users: int, categories: int, posts: int, comments: int, seed_value: int = 0) -> dict:
+    """Create the schema and fill it; returns ids useful to benchmark scenarios."""
+    from app.db.config import base, engine
+    from app.models.app_models import User, Category, Post, Comment
+    from app.utils.comment_tree_handler import comment_path
+    from app.utils.counter_handler import recount
+    from app.utils.password_handler import get_pwd_context
+    from app.utils.projection_handler import make_excerpt
+    from app.utils.search_handler import create_search_index, rebuild_search_index
+    from app.utils.trending_handler import rebuild_hot_scores
+
+    rng = random.Random(seed_value)
+    now = datetime.now()
+    # One hash shared by everyone: seeding should not be bcrypt bound
+    password = get_pwd_context().hash(BENCH_PASSWORD)
+
+    def timestamp():
+        created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        return {"created_at": created, "updated_at": created}
+
+    user_rows = [{"id": uuid4(), "username": f"user{i}", "email": f"user{i}@bench.example.com", "password": password,
+                  "is_active": True, "is_admin": i == 0, **timestamp()} for i in range(users)]
+    category_rows = [{"id": uuid4(), "name": f"category{i}", "description": _sentence(rng, 8), **timestamp()}
+                     for i in range(categories)]
+    post_rows = [{"id": uuid4(), "title": _sentence(rng, 6), "content": _sentence(rng, rng.randint(80, 400)),
+                  "image": None, "user_id": rng.choice(user_rows)["id"],
+                  "category_id": rng.choice(category_rows)["id"], **timestamp()} for _ in range(posts)]
+    for row in post_rows:
+        row["excerpt"] = make_excerpt(row["content"])
+    comment_rows = [{"id": uuid4(), "content": _sentence(rng, rng.randint(5, 40)),
+                     "user_id": rng.choice(user_rows)["id"], "post_id": rng.choice(post_rows)["id"], **timestamp()}
+                    for _ in range(comments)]
+    for row in comment_rows:
+        row["path"] = comment_path(row["id"])
+
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.drop_all)
+        await conn.run_sync(base.metadata.create_all)
+        await conn.run_sync(create_search_index)
+        await _insert_chunks(conn, User.__table__, user_rows)
+        await _insert_chunks(conn, Category.__table__, category_rows)
+        await _insert_chunks(conn, Post.__table__, post_rows)
+        await _insert_chunks(conn, Comment.__table__, comment_rows)
+        for model in (Post, Category, User):
+            await recount(conn, model)
+        await conn.run_sync(rebuild_search_index)
+        await conn.run_sync(rebuild_hot_scores)
+    await engine.dispose()
+
+    return {
+        "users": users, "categories": categories, "posts": posts, "comments": comments,
+        "admin_email": "user0@bench.example.com", "password": BENCH_PASSWORD,
+        "category_ids": [str(row["id"]) for row in category_rows],
+        "post_ids": [str(row["id"]) for row in post_rows[:1000]],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, required=True, help="SQLite file to (re)create")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    use_database(args.db.resolve())
+    info = asyncio.run(seed(args.users, args.categories, args.posts, args.comments, args.seed))
+    print(json.dumps({key: info[key] for key in ("users", "categories", "posts", "comments")}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+import pytest
+
+# Before any app module is imported: they read their settings from env at import time
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp(prefix='blog-tests-')) / 'test.db'}"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_LOCAL_ROOT"] = tempfile.mkdtemp(prefix="blog-media-")
+
+from app.db.config import SessionLocal, base, engine, engines  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.app_models import Category, Comment, Post, User  # noqa: E402
+from app.routes.auth_router import invalidate_principal  # noqa: E402
+from app.utils.comment_tree_handler import comment_path  # noqa: E402
+from app.utils.counter_handler import recount  # noqa: E402
+from app.utils.http_cache_handler import invalidate_responses  # noqa: E402
+from app.utils.query_counter_handler import count_queries  # noqa: E402
+from app.utils.search_handler import create_search_index  # noqa: E402
+
+# Every tag a public read route caches under, so counted requests always reach the DB
+RESPONSE_TAGS = ("posts", "post_details", "categories", "comments", "trending")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def seeded():
+    """
+    A fresh schema with two authors, two categories and 30 posts. `busy_post`
+    has 30 threads with replies two levels deep, `quiet_post` a single comment.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.drop_all)
+        await conn.run_sync(base.metadata.create_all)
+        await conn.run_sync(create_search_index)
+
+    now = datetime.now()
+    async with SessionLocal() as db:
+        users = [User(id=uuid4(), username=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(2)]
+        categories = [Category(id=uuid4(), name=f"category{i}", description="about things") for i in range(2)]
+        posts = [Post(id=uuid4(), title=f"post {i}", content=f"content {i}", excerpt=f"content {i}",
+                      user_id=users[i % 2].id, category_id=categories[i % 2].id, created_at=now - timedelta(minutes=i))
+                 for i in range(30)]
+        db.add_all([*users, *categories, *posts])
+
+        busy_post, quiet_post = posts[0], posts[1]
+        comments = [_comment(quiet_post, users[0], now)]
+        for i in range(30):
+            thread = _comment(busy_post, users[i % 2], now - timedelta(minutes=i))
+            replies = [_comment(busy_post, users[1], now, thread) for _ in range(3)]
+            comments += [thread, *replies, *(_comment(busy_post, users[0], now, reply) for reply in replies)]
+        db.add_all(comments)
+        await db.flush()
+        for model in (Post, Comment, Category, User):
+            await recount(db, model)
+        await db.commit()
+
+    yield {"busy_post": busy_post.id, "quiet_post": quiet_post.id, "category": categories[0].id,
+           "big_thread": comments[1].id, "authors": [user.id for user in users]}
+    # The next test's users get the same emails, hence the same tokens
+    for user in users:
+        await invalidate_principal(user.id)
+    for db_engine in engines:
+        await db_engine.dispose()
+
+
+def _comment(post: Post, author: User, created_at: datetime, parent: Comment | None = None) -> Comment:
+    comment_id = uuid4()
+    return Comment(id=comment_id, content="a comment", user_id=author.id, post_id=post.id,
+                   parent_id=parent.id if parent else None,
+                   path=comment_path(comment_id, parent.path if parent else None),
+                   depth=parent.depth + 1 if parent else 0, created_at=created_at)
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def query_count(client):
+    """`await query_count(url, **params)`: statements one uncached GET of `url` runs."""
+    async def count(url: str, **params) -> int:
+        await invalidate_responses(*RESPONSE_TAGS)
+        with count_queries() as counter:
+            response = await client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        return counter.count
+
+    return count
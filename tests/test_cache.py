@@ -0,0 +1,28 @@
+import pytest
+
+from app.utils.cache_handler import MemoryCacheBackend
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_value_computed_across_an_invalidation_is_not_stored():
+    cache = MemoryCacheBackend()
+    generations = await cache.generations(["post:1"])
+    await cache.invalidate_tag("post:1")
+    await cache.set("page", "stale", ttl=60, tags=["post:1"], generations=generations)
+    assert await cache.get("page") is None
+
+    generations = await cache.generations(["post:1"])
+    await cache.invalidate_tag("post:2")
+    await cache.set("page", "fresh", ttl=60, tags=["post:1"], generations=generations)
+    assert await cache.get("page") == "fresh"
+
+
+async def test_evicted_generations_still_refuse_the_store():
+    cache = MemoryCacheBackend(maxsize=2)
+    generations = await cache.generations(["post:1"])
+    # post:1's generation is pushed out by the later invalidations
+    for tag in ("post:1", "post:2", "post:3"):
+        await cache.invalidate_tag(tag)
+    await cache.set("page", "stale", ttl=60, tags=["post:1"], generations=generations)
+    assert await cache.get("page") is None
@@ -0,0 +1,136 @@
+import json
+from uuid import uuid4
+
+import anyio
+import pytest
+
+from app.main import app
+from app.utils.comment_stream_handler import (COMMENT_STREAM_QUEUE_SIZE, CommentBroker, comment_broker,
+                                              start_comment_streams)
+from app.utils.jwt_handler import create_access_token
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_broker_fans_out_per_post():
+    broker = CommentBroker()
+    post_id, other_post_id = uuid4(), uuid4()
+    first, second, other = broker.subscribe(post_id), broker.subscribe(post_id), broker.subscribe(other_post_id)
+
+    broker.deliver(str(post_id), ("comment_created", "{}"))
+
+    assert first.queue.get_nowait() == second.queue.get_nowait() == ("comment_created", "{}")
+    assert other.queue.empty()
+
+
+async def test_full_queue_drops_only_the_slow_subscriber():
+    broker = CommentBroker()
+    post_id = uuid4()
+    slow, fast = broker.subscribe(post_id), broker.subscribe(post_id)
+
+    for i in range(COMMENT_STREAM_QUEUE_SIZE + 1):
+        broker.deliver(str(post_id), ("comment_created", str(i)))
+        # Only `fast` keeps up
+        fast.queue.get_nowait()
+
+    assert slow.dropped and not fast.dropped
+    # Its backlog is discarded, the end marker is all that is left
+    assert slow.queue.get_nowait() is None and slow.queue.empty()
+    assert broker.count == 1
+    broker.deliver(str(post_id), ("comment_created", "after"))
+    assert slow.queue.empty()
+    assert fast.queue.get_nowait() == ("comment_created", "after")
+
+
+async def test_subscribers_are_capped():
+    broker = CommentBroker(max_subscribers=1)
+    subscription = broker.subscribe(uuid4())
+
+    assert broker.subscribe(uuid4()) is None
+    broker.unsubscribe(subscription)
+    assert broker.subscribe(uuid4()) is not None
+
+
+class AsgiConnection:
+    """Drives `app` with one raw ASGI connection, keeping every message it sends."""
+
+    def __init__(self, scope: dict, first_message: dict):
+        self.scope = {"asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http", "root_path": "",
+                      "query_string": b"", "headers": [], "client": ("127.0.0.1", 123),
+                      "server": ("test", 80), **scope}
+        self.sent: list[dict] = []
+        self._first_message = first_message
+
+    async def receive(self) -> dict:
+        if self._first_message is not None:
+            message, self._first_message = self._first_message, None
+            return message
+        # The client never leaves on its own
+        await anyio.sleep_forever()
+
+    async def send(self, message: dict) -> None:
+        self.sent.append(message)
+
+    async def run(self) -> None:
+        await app(self.scope, self.receive, self.send)
+
+    def text(self) -> str:
+        return "".join(message.get("body", b"").decode() for message in self.sent
+                       if message["type"] == "http.response.body")
+
+    def frames(self) -> list[dict]:
+        return [json.loads(message["text"]) for message in self.sent if message["type"] == "websocket.send"]
+
+
+async def _wait_for(condition) -> None:
+    while not condition():
+        await anyio.sleep(0.01)
+
+
+async def test_sse_and_websocket_fan_out_then_resync(seeded, client):
+    await start_comment_streams()
+    post_id = seeded["quiet_post"]
+    sse = AsgiConnection({"type": "http", "method": "GET", "path": f"/api/v1/comment/stream/{post_id}"},
+                         {"type": "http.request", "body": b"", "more_body": False})
+    ws = AsgiConnection({"type": "websocket", "path": f"/api/v1/comment/ws/{post_id}", "subprotocols": []},
+                        {"type": "websocket.connect"})
+
+    with anyio.fail_after(10):
+        async with anyio.create_task_group() as streams:
+            streams.start_soon(sse.run)
+            streams.start_soon(ws.run)
+            await _wait_for(lambda: comment_broker.count == 2)
+
+            headers = {"Authorization": f"Bearer {create_access_token({'email': 'user0@example.com'})}"}
+            response = await client.post(f"/api/v1/comment/create/{post_id}", json={"content": "live"},
+                                         headers=headers)
+            assert response.status_code == 201
+            await _wait_for(lambda: "comment_created" in sse.text() and ws.frames())
+
+            # Neither stream reads while the events pile up: both fall behind and get dropped
+            for _ in range(COMMENT_STREAM_QUEUE_SIZE + 1):
+                comment_broker.deliver(str(post_id), ("comment_created", "{}"))
+
+    assert comment_broker.count == 0
+
+    assert sse.sent[0]["status"] == 200
+    assert dict(sse.sent[0]["headers"])[b"content-type"].startswith(b"text/event-stream")
+    events = [block for block in sse.text().split("\n\n") if block]
+    assert events[0] == "retry: 3000"
+    assert events[1].startswith("event: comment_created\ndata: ")
+    assert json.loads(events[1].split("data: ", 1)[1])["content"] == "live"
+    assert events[2:] == ["event: resync\ndata: {}"]
+
+    assert ws.sent[0]["type"] == "websocket.accept"
+    created, resync = ws.frames()
+    assert created["event"] == "comment_created" and created["data"]["content"] == "live"
+    assert resync == {"event": "resync"}
+    assert ws.sent[-1] == {"type": "websocket.close", "code": 1013, "reason": ""}
+
+
+async def test_streams_refuse_subscribers_past_the_cap(seeded, client, monkeypatch):
+    monkeypatch.setattr(comment_broker, "max_subscribers", 0)
+
+    response = await client.get(f"/api/v1/comment/stream/{seeded['quiet_post']}")
+
+    assert response.status_code == 503
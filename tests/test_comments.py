@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import select
+
+from app.db.config import SessionLocal
+from app.models.app_models import Comment
+from app.utils.jwt_handler import create_access_token
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_comment_is_only_removed_under_its_own_post(seeded, client):
+    async with SessionLocal() as db:
+        comment_id = await db.scalar(select(Comment.id).where(Comment.post_id == seeded["quiet_post"]))
+    headers = {"Authorization": f"Bearer {create_access_token({'email': 'user0@example.com'})}"}
+
+    response = await client.delete(f"/api/v1/comment/remove/{seeded['busy_post']}/{comment_id}", headers=headers)
+    assert response.status_code == 404
+    response = await client.delete(f"/api/v1/comment/remove/{seeded['quiet_post']}/{comment_id}", headers=headers)
+    assert response.status_code == 204
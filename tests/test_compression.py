@@ -0,0 +1,119 @@
+import gzip
+import zlib
+
+import httpx
+import pytest
+
+from app.utils.response_handler import CompressionMiddleware, choose_encoding
+
+pytestmark = pytest.mark.anyio
+
+# Only the names and their order matter to the negotiation
+ENCODERS = dict.fromkeys(("zstd", "br", "gzip"))
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("*", "zstd"),
+    ("*, zstd;q=0", "br"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("GZIP;q=0.8, deflate", "gzip"),
+    ("br;q=abc, gzip", "gzip"),
+])
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding, ENCODERS) == expected
+
+
+def _app(body: bytes, headers: list[tuple[bytes, bytes]], chunks: int = 1):
+    async def asgi_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        size = len(body) // chunks
+        for i in range(chunks):
+            last = i == chunks - 1
+            await send({"type": "http.response.body", "body": body[i * size:None if last else (i + 1) * size],
+                        "more_body": not last})
+
+    return asgi_app
+
+
+async def _get(asgi_app, accept_encoding: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # Raw bytes, so the test sees exactly what went over the wire
+        async with client.stream("GET", "/", headers={"Accept-Encoding": accept_encoding}) as response:
+            response._content = b"".join([chunk async for chunk in response.aiter_raw()])
+            return response
+
+
+async def test_large_json_is_gzipped_with_a_weak_etag():
+    body = b'{"items": [' + b'"item", ' * 500 + b'"item"]}'
+    middleware = CompressionMiddleware(_app(body, [(b"content-type", b"application/json"), (b"etag", b'"v1"'),
+                                                   (b"content-length", str(len(body)).encode())]))
+
+    response = await _get(middleware, "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) == len(response.content) < len(body)
+    assert gzip.decompress(response.content) == body
+
+
+async def test_compressed_bodies_are_reused_per_etag():
+    body = b"text " * 1000
+    middleware = CompressionMiddleware(_app(body, [(b"content-type", b"text/plain"), (b"etag", b'"v1"')]))
+
+    first = await _get(middleware, "gzip")
+    second = await _get(middleware, "gzip")
+
+    assert first.content == second.content
+    assert list(middleware._compressed) == [(b'"v1"', "gzip")]
+
+
+async def test_streamed_body_is_compressed_chunk_by_chunk():
+    body = b"line of text\n" * 500
+    middleware = CompressionMiddleware(_app(body, [(b"content-type", b"text/plain")], chunks=4))
+
+    response = await _get(middleware, "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert zlib.decompress(response.content, 31) == body
+
+
+@pytest.mark.parametrize("headers, accept_encoding", [
+    ([(b"content-type", b"application/json")], "identity"),
+    ([(b"content-type", b"image/png")], "gzip"),
+    ([(b"content-type", b"text/event-stream")], "gzip"),
+    ([(b"content-type", b"text/plain"), (b"content-range", b"bytes 0-4999/10000")], "gzip"),
+    ([(b"content-type", b"text/plain"), (b"content-encoding", b"br")], "gzip"),
+])
+async def test_left_alone(headers, accept_encoding):
+    body = b"x" * 5000
+    response = await _get(CompressionMiddleware(_app(body, headers)), accept_encoding)
+
+    assert response.content == body
+    assert response.headers.get("content-encoding") in (None, "br")
+    assert "vary" not in response.headers
+
+
+async def test_small_body_is_left_alone():
+    middleware = CompressionMiddleware(_app(b'{"ok": true}', [(b"content-type", b"application/json")]))
+    response = await _get(middleware, "gzip")
+
+    assert response.content == b'{"ok": true}'
+    assert "content-encoding" not in response.headers
+
+
+async def test_weak_etag_revalidates_the_compressed_page(seeded, client):
+    response = await client.get("/api/v1/posts/all", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].startswith('W/"')
+
+    revalidated = await client.get("/api/v1/posts/all", headers={"Accept-Encoding": "gzip",
+                                                                 "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
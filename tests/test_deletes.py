@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import aliased
+
+from app.db.config import SessionLocal
+from app.models.app_models import Category, Comment, Post, User
+from app.utils import bulk_handler
+from app.utils.counter_handler import recount
+from app.utils.jwt_handler import create_access_token
+
+pytestmark = pytest.mark.anyio
+
+Parent = aliased(Comment)
+
+
+async def _assert_consistent(db) -> None:
+    # Nothing points at a deleted row and no counter drifted
+    assert await db.scalar(select(func.count()).select_from(Post).where(
+        Post.user_id.is_(None) | Post.user_id.not_in(select(User.id)))) == 0
+    assert await db.scalar(select(func.count()).select_from(Comment).where(
+        Comment.user_id.is_(None) | Comment.user_id.not_in(select(User.id))
+        | Comment.post_id.is_(None) | Comment.post_id.not_in(select(Post.id)))) == 0
+    assert await db.scalar(select(func.count()).select_from(Comment).where(
+        Comment.parent_id.is_not(None), Comment.parent_id.not_in(select(Parent.id)))) == 0
+    for model in (Post, Comment, Category, User):
+        assert await recount(db, model) == 0
+
+
+async def test_deleting_a_post_takes_its_comments(seeded):
+    async with SessionLocal() as db:
+        [result] = await bulk_handler.delete_posts(db, [seeded["busy_post"]])
+        assert result["status"] == "deleted"
+        assert await db.scalar(select(func.count()).select_from(Comment)
+                               .where(Comment.post_id == seeded["busy_post"])) == 0
+        await _assert_consistent(db)
+
+
+async def test_deleting_a_user_takes_their_posts_and_comments(seeded):
+    author = seeded["authors"][1]
+    async with SessionLocal() as db:
+        await db.execute(update(User).where(User.id == author).values(is_active=False))
+        await db.commit()
+
+        [result] = await bulk_handler.delete_users(db, [author])
+        assert result["status"] == "deleted"
+        assert await db.scalar(select(func.count()).select_from(Post).where(Post.user_id == author)) == 0
+        assert await db.scalar(select(func.count()).select_from(Comment).where(Comment.user_id == author)) == 0
+        # The other author's replies under their comments went with them
+        assert await db.scalar(select(Post.comment_count).where(Post.id == seeded["busy_post"])) == 15
+        await _assert_consistent(db)
+
+
+async def test_single_deletes_use_the_cascade(seeded, client):
+    admin, author = seeded["authors"]
+    async with SessionLocal() as db:
+        await db.execute(update(User).where(User.id == admin).values(is_admin=True))
+        await db.execute(update(User).where(User.id == author).values(is_active=False))
+        await db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'email': 'user0@example.com'})}"}
+
+    response = await client.delete(f"/api/v1/posts/remove/{seeded['busy_post']}", headers=headers)
+    assert response.status_code == 204
+    response = await client.delete(f"/api/v1/admin/remove/user/{author}", headers=headers)
+    assert response.status_code == 204
+
+    async with SessionLocal() as db:
+        assert await db.scalar(select(func.count()).select_from(Comment)
+                               .where(Comment.post_id == seeded["busy_post"])) == 0
+        assert await db.scalar(select(func.count()).select_from(Post).where(Post.user_id == author)) == 0
+        await _assert_consistent(db)
+
+
+async def test_deleting_your_own_account_uses_the_cascade(seeded, client):
+    headers = {"Authorization": f"Bearer {create_access_token({'email': 'user1@example.com'})}"}
+
+    # Still active: the inactive-only rule is for deleting others
+    response = await client.delete("/api/v1/user/remove", headers=headers)
+    assert response.status_code == 204
+
+    async with SessionLocal() as db:
+        assert await db.get(User, seeded["authors"][1]) is None
+        await _assert_consistent(db)
+    response = await client.get(f"/api/v1/comment/all/{seeded['busy_post']}")
+    assert response.status_code == 200
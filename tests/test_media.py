@@ -0,0 +1,127 @@
+import gzip
+
+import httpx
+import pytest
+
+from app.utils.media_handler import IMMUTABLE_CACHE_CONTROL, MEDIA_MAX_AGE, MediaFiles
+from app.utils.response_handler import CompressionMiddleware
+
+pytestmark = pytest.mark.anyio
+
+
+def _scope(path: str, headers: dict, extensions: dict | None = None) -> dict:
+    return {"type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"",
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+            "extensions": extensions or {}}
+
+
+async def _call(app, scope: dict) -> list[dict]:
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+async def test_pathsend_passes_through_compression(tmp_path):
+    (tmp_path / "notes.txt").write_text("plain text " * 200)
+    app = CompressionMiddleware(MediaFiles(str(tmp_path)), minimum_size=10)
+
+    messages = await _call(app, _scope("/notes.txt", {"Accept-Encoding": "gzip"},
+                                       {"http.response.pathsend": {}}))
+
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.pathsend"]
+    assert messages[0]["status"] == 200
+    assert b"content-encoding" not in dict(messages[0]["headers"])
+    assert messages[1]["path"] == str(tmp_path / "notes.txt")
+
+
+DIGEST = "ab" * 32
+
+
+@pytest.fixture
+async def media(tmp_path):
+    (tmp_path / f"{DIGEST}.png").write_bytes(bytes(range(256)) * 40)
+    (tmp_path / f"{DIGEST}_thumb.png").write_bytes(b"thumb")
+    (tmp_path / "logo.svg").write_text("<svg>" + "<g/>" * 500 + "</svg>")
+    (tmp_path / "logo.svg.gz").write_bytes(gzip.compress((tmp_path / "logo.svg").read_bytes()))
+    transport = httpx.ASGITransport(app=MediaFiles(str(tmp_path)))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def test_content_addressed_files_are_immutable(media):
+    for name in (f"{DIGEST}.png", f"{DIGEST}_thumb.png"):
+        response = await media.get(f"/{name}")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["etag"] == f'"{name}"'
+        assert response.headers["content-type"] == "image/png"
+
+    response = await media.get("/logo.svg", headers={"Accept-Encoding": "identity"})
+    assert response.headers["cache-control"] == f"public, max-age={MEDIA_MAX_AGE}"
+
+
+async def test_conditional_requests_answer_304(media):
+    response = await media.get(f"/{DIGEST}.png")
+
+    for headers in ({"If-None-Match": response.headers["etag"]},
+                    {"If-None-Match": f'"other", W/{response.headers["etag"]}'},
+                    {"If-Modified-Since": response.headers["last-modified"]}):
+        revalidated = await media.get(f"/{DIGEST}.png", headers=headers)
+        assert revalidated.status_code == 304, headers
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == response.headers["etag"]
+
+    # If-None-Match wins over If-Modified-Since
+    changed = await media.get(f"/{DIGEST}.png", headers={"If-None-Match": '"other"',
+                                                         "If-Modified-Since": response.headers["last-modified"]})
+    assert changed.status_code == 200
+
+
+async def test_range_requests_get_partial_content(media):
+    response = await media.get(f"/{DIGEST}.png", headers={"Range": "bytes=256-511"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 256-511/{256 * 40}"
+    assert response.content == bytes(range(256))
+
+
+async def test_precompressed_sibling_is_served_with_a_weak_etag(media):
+    identity = await media.get("/logo.svg", headers={"Accept-Encoding": "identity"})
+    compressed = await media.get("/logo.svg", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in identity.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == f"W/{identity.headers['etag']}"
+    assert identity.headers["vary"] == compressed.headers["vary"] == "Accept-Encoding"
+    # httpx decodes it back
+    assert compressed.content == identity.content
+
+
+async def test_head_missing_and_write_requests(media):
+    head = await media.head(f"/{DIGEST}.png")
+    assert head.status_code == 200 and head.content == b""
+    assert head.headers["content-length"] == str(256 * 40)
+
+    assert (await media.get("/missing.png")).status_code == 404
+
+    response = await media.post(f"/{DIGEST}.png")
+    assert response.status_code == 405
+    assert response.headers["allow"] == "GET, HEAD"
+
+
+async def test_paths_cannot_leave_the_directory(tmp_path):
+    (tmp_path / "secret.txt").write_text("secret")
+    (tmp_path / "media").mkdir()
+    (tmp_path / "media" / "link.txt").symlink_to(tmp_path / "secret.txt")
+    app = MediaFiles(str(tmp_path / "media"))
+
+    for path in ("/../secret.txt", "/link.txt", "/"):
+        [start, _] = await _call(app, _scope(path, {}))
+        assert start["status"] == 404, path
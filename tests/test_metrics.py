@@ -0,0 +1,16 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.db.config import engine
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_statements_leave_no_start_time_behind(seeded):
+    async with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM no_such_table"))
+        await conn.execute(text("SELECT 1"))
+        assert (await conn.get_raw_connection()).info["metrics_query_start"] == []
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.db.config import SessionLocal
+from app.models.app_models import OutboxEvent, Post
+from app.utils.image_variant_handler import variant_keys
+from app.utils.outbox_handler import drain_once, enqueue
+from app.utils.storage_handler import iter_bytes, storage
+
+pytestmark = pytest.mark.anyio
+
+
+async def _events(key: str) -> list[OutboxEvent]:
+    async with SessionLocal() as db:
+        return list(await db.scalars(select(OutboxEvent).where(OutboxEvent.idempotency_key == key)))
+
+
+async def test_enqueuing_a_key_again_is_a_no_op(seeded):
+    payload = {"post_id": str(seeded["quiet_post"])}
+    async with SessionLocal() as db:
+        await enqueue(db, "index_post", payload, "index_post:again")
+        await enqueue(db, "index_post", payload, "index_post:again")
+        await db.commit()
+    async with SessionLocal() as db:
+        await enqueue(db, "index_post", payload, "index_post:again")
+        await db.commit()
+
+    assert len(await _events("index_post:again")) == 1
+
+
+async def test_image_variants_commit_with_the_done_mark(seeded):
+    post_id, image_key = seeded["quiet_post"], "images/" + "ab" * 32 + ".png"
+    # Variants already in storage are reused, so no worker process is needed
+    for key in (image_key, *variant_keys(image_key).values()):
+        await storage.put(key, iter_bytes(b"image"), "image/png")
+    async with SessionLocal() as db:
+        await db.execute(update(Post).where(Post.id == post_id).values(image=image_key))
+        await enqueue(db, "process_post_image", {"post_id": str(post_id), "image_key": image_key}, "variants")
+        await db.commit()
+
+    assert await drain_once() == 1
+    [event] = await _events("variants")
+    assert event.status == "done"
+    async with SessionLocal() as db:
+        assert await db.scalar(select(Post.image_variants).where(Post.id == post_id)) == variant_keys(image_key)
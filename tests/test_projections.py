@@ -0,0 +1,81 @@
+import pytest
+
+from app.utils.jwt_handler import create_access_token
+from app.utils.projection_handler import SUMMARY_FIELDS, select_post_fields
+
+pytestmark = pytest.mark.anyio
+
+
+async def _items(client, url: str, **params) -> list[dict]:
+    response = await client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["items"]
+
+
+async def test_summary_is_the_feed_card(seeded, client):
+    items = await _items(client, "/api/v1/posts/all", fields="summary")
+
+    assert len(items) == 20
+    assert all(set(item) == set(SUMMARY_FIELDS) for item in items)
+    assert items[0]["excerpt"] == "content 0"
+
+
+async def test_fields_select_only_what_was_asked_plus_id(seeded, client):
+    items = await _items(client, "/api/v1/posts/all", fields="title, comment_count")
+
+    assert set(items[0]) == {"id", "title", "comment_count"}
+    assert items[0]["id"] == str(seeded["busy_post"])
+    assert items[0]["comment_count"] == 210
+
+
+async def test_relations_embed_only_their_public_columns(seeded, client):
+    [item, *_] = await _items(client, "/api/v1/posts/all", fields="author,category")
+
+    assert set(item) == {"id", "author", "category"}
+    assert item["author"] == {"id": str(seeded["authors"][0]), "username": "user0"}
+    assert item["category"] == {"id": str(seeded["category"]), "name": "category0"}
+
+
+async def _walk(client, **params) -> list[tuple[str, str]]:
+    seen, cursor = [], None
+    while True:
+        response = await client.get("/api/v1/posts/all", params={**params, "limit": 7,
+                                                                   **({"cursor": cursor} if cursor else {})})
+        body = response.json()
+        seen += [(item["id"], item["title"]) for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+async def test_projected_pages_match_full_pages(seeded, client):
+    for sort in ("latest", "popular"):
+        full = await _walk(client, sort=sort)
+        assert len(full) == 30
+        assert await _walk(client, sort=sort, fields="title") == full
+
+
+async def test_fields_on_category_and_user_listings(seeded, client):
+    items = await _items(client, f"/api/v1/posts/all/by_category/{seeded['category']}", fields="title", limit=25)
+    assert len(items) == 15 and all(set(item) == {"id", "title"} for item in items)
+
+    headers = {"Authorization": f"Bearer {create_access_token({'email': 'user1@example.com'})}"}
+    response = await client.get("/api/v1/posts/all/by_user", params={"fields": "summary", "limit": 25}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 15
+    assert all(set(item) == set(SUMMARY_FIELDS) for item in response.json()["items"])
+
+
+async def test_unknown_fields_are_rejected(seeded, client):
+    response = await client.get("/api/v1/posts/all", params={"fields": "title,password"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password"
+
+
+def test_column_projection_never_loads_the_content():
+    sql = str(select_post_fields(("id", "title", "excerpt")))
+
+    assert "posts.content" not in sql
+    assert "posts.created_at" in sql  # the pagination key
+    assert "JOIN" not in sql
@@ -0,0 +1,47 @@
+"""
+Statements per request must not grow with the size of the result: a count
+that differs between a small and a large page means a query per row (N+1).
+"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_post_list(seeded, query_count):
+    assert await query_count("/api/v1/posts/all", limit=2) == await query_count("/api/v1/posts/all", limit=25)
+
+
+async def test_post_list_popular(seeded, query_count):
+    small = await query_count("/api/v1/posts/all", limit=2, sort="popular")
+    assert small == await query_count("/api/v1/posts/all", limit=25, sort="popular")
+
+
+async def test_post_list_fields(seeded, query_count):
+    small = await query_count("/api/v1/posts/all", limit=2, fields="summary")
+    assert small == await query_count("/api/v1/posts/all", limit=25, fields="summary")
+
+
+async def test_posts_by_category(seeded, query_count):
+    url = f"/api/v1/posts/all/by_category/{seeded['category']}"
+    assert await query_count(url, limit=2) == await query_count(url, limit=15)
+
+
+async def test_post_detail(seeded, query_count):
+    quiet = await query_count(f"/api/v1/posts/{seeded['quiet_post']}")
+    assert quiet == await query_count(f"/api/v1/posts/{seeded['busy_post']}")
+
+
+async def test_comment_threads(seeded, query_count):
+    url = f"/api/v1/comment/all/{seeded['busy_post']}"
+    assert await query_count(url, limit=2) == await query_count(url, limit=25)
+    assert await query_count(url, limit=2, depth=0) == await query_count(url, limit=25, depth=0)
+
+
+async def test_comment_replies(seeded, query_count):
+    url = f"/api/v1/comment/replies/{seeded['busy_post']}/{seeded['big_thread']}"
+    assert await query_count(url, limit=1) == await query_count(url, limit=3)
+
+
+async def test_comment_thread(seeded, query_count):
+    url = f"/api/v1/comment/thread/{seeded['busy_post']}/{seeded['big_thread']}"
+    assert await query_count(url, depth=1) == await query_count(url, depth=2)
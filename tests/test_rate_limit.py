@@ -0,0 +1,116 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.routes import auth_router
+from app.utils import rate_limit_handler
+from app.utils.jwt_handler import create_access_token
+from app.utils.rate_limit_handler import (
+    COMMENT_CREATE_LIMIT, LOGIN_LIMIT, MemoryRateLimitStore, RateLimitHeadersMiddleware, RateLimitPolicy, rate_limit,
+)
+
+pytestmark = pytest.mark.anyio
+
+TINY_LIMIT = RateLimitPolicy(name="tiny", limit=2, period=60)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """The limiter enabled on a fresh store, with a clock that only moves when told to."""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit_handler, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limit_handler, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit_handler, "rate_limit_store", MemoryRateLimitStore())
+    return now
+
+
+def _tiny_app() -> FastAPI:
+    tiny_app = FastAPI()
+    tiny_app.add_middleware(RateLimitHeadersMiddleware)
+
+    @tiny_app.get("/limited", dependencies=[Depends(rate_limit(TINY_LIMIT))])
+    async def limited():
+        return {"ok": True}
+
+    return tiny_app
+
+
+def _client(asgi_app, host: str = "127.0.0.1") -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app, client=(host, 123)), base_url="http://test")
+
+
+async def test_token_bucket_refills_evenly(clock):
+    store = MemoryRateLimitStore()
+
+    assert [(await store.take("key", TINY_LIMIT))[0] for _ in range(3)] == [True, True, False]
+    # One token every 30 seconds
+    clock[0] += 29
+    assert (await store.take("key", TINY_LIMIT))[0] is False
+    clock[0] += 1
+    assert (await store.take("key", TINY_LIMIT))[0] is True
+    # Never more than `limit` tokens, however long the bucket idles
+    clock[0] += 3600
+    assert [(await store.take("key", TINY_LIMIT))[0] for _ in range(3)] == [True, True, False]
+
+
+async def test_exhausted_policy_answers_429_with_retry_after(clock):
+    async with _client(_tiny_app()) as client:
+        first, second, third = [await client.get("/limited") for _ in range(3)]
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["ratelimit-limit"] == "2"
+    assert first.headers["ratelimit-remaining"] == "1"
+    assert first.headers["ratelimit-reset"] == "30"
+    assert first.headers["ratelimit-policy"] == "2;w=60"
+    assert second.headers["ratelimit-remaining"] == "0"
+
+    assert third.status_code == 429
+    assert third.headers["retry-after"] == "30"
+    assert third.headers["ratelimit-remaining"] == "0"
+
+
+async def test_anonymous_buckets_are_per_ip(clock):
+    tiny_app = _tiny_app()
+    async with _client(tiny_app, "10.0.0.1") as first, _client(tiny_app, "10.0.0.2") as second:
+        assert [(await first.get("/limited")).status_code for _ in range(3)] == [200, 200, 429]
+        assert (await second.get("/limited")).status_code == 200
+
+
+async def test_forwarded_for_is_ignored_unless_trusted(clock, monkeypatch):
+    tiny_app = _tiny_app()
+    async with _client(tiny_app) as client:
+        spoofed = [(await client.get("/limited", headers={"X-Forwarded-For": f"10.0.0.{i}"})).status_code
+                   for i in range(3)]
+        assert spoofed == [200, 200, 429]
+
+        monkeypatch.setattr(rate_limit_handler, "RATE_LIMIT_TRUST_FORWARDED", True)
+        assert (await client.get("/limited", headers={"X-Forwarded-For": "10.0.0.9, 127.0.0.1"})).status_code == 200
+
+
+async def test_authenticated_buckets_are_per_user(seeded, client, clock):
+    store = rate_limit_handler.rate_limit_store
+    for _ in range(COMMENT_CREATE_LIMIT.limit):
+        await store.take(f"{COMMENT_CREATE_LIMIT.name}:user:{seeded['authors'][0]}", COMMENT_CREATE_LIMIT)
+
+    url = f"/api/v1/comment/create/{seeded['quiet_post']}"
+    # Same IP, different accounts
+    for email, expected in (("user0@example.com", 429), ("user1@example.com", 201)):
+        headers = {"Authorization": f"Bearer {create_access_token({'email': email})}"}
+        response = await client.post(url, json={"content": "rate limited?"}, headers=headers)
+        assert response.status_code == expected, response.text
+
+
+async def test_login_limit_is_checked_before_bcrypt(seeded, client, clock, monkeypatch):
+    verified = []
+
+    async def verify_and_update_password(password, hashed_password):
+        verified.append(password)
+        return False, None
+
+    monkeypatch.setattr(auth_router, "verify_and_update_password", verify_and_update_password)
+    credentials = {"username": "user0@example.com", "password": "guess"}
+
+    responses = [await client.post("/api/v1/auth/login", data=credentials) for _ in range(LOGIN_LIMIT.limit + 1)]
+
+    assert [response.status_code for response in responses] == [401] * LOGIN_LIMIT.limit + [429]
+    assert len(verified) == LOGIN_LIMIT.limit
@@ -0,0 +1,22 @@
+import pytest
+
+from app.db.config import SessionLocal
+from app.models.app_models import Post
+from app.utils import search_handler
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_snippets_escape_user_markup(seeded, client):
+    async with SessionLocal() as db:
+        post = await db.get(Post, seeded["quiet_post"])
+        post.content = 'Before <script>alert("x")</script> the zebra <b>crossing</b>'
+        await search_handler.index_post(db, post)
+        await db.commit()
+
+    response = await client.get("/api/v1/posts/search", params={"q": "zebra"})
+    assert response.status_code == 200
+    [hit] = response.json()["items"]
+    assert "<script>" not in hit["snippet"] and "<b>" not in hit["snippet"]
+    assert "&lt;script&gt;" in hit["snippet"]
+    assert "<mark>zebra</mark>" in hit["snippet"]
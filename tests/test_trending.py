@@ -0,0 +1,55 @@
+import math
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.db.config import SessionLocal
+from app.models.app_models import Post
+from app.utils import trending_handler
+from app.utils.trending_handler import COMMENT_WEIGHT, VIEW_WEIGHT, add_event, add_post_event, bump_scores
+
+pytestmark = pytest.mark.anyio
+
+
+async def _score(post_id) -> float:
+    async with SessionLocal() as db:
+        return await db.scalar(select(Post.hot_score).where(Post.id == post_id))
+
+
+async def test_events_add_up_in_the_database(seeded):
+    post_id = seeded["quiet_post"]
+    before = await _score(post_id)
+    async with SessionLocal() as db:
+        returned = await add_post_event(db, post_id, COMMENT_WEIGHT)
+        await bump_scores(db, {post_id: VIEW_WEIGHT * 5})
+        await db.commit()
+
+    assert math.isclose(returned, add_event(before, COMMENT_WEIGHT), rel_tol=1e-9)
+    expected = add_event(add_event(before, COMMENT_WEIGHT), VIEW_WEIGHT * 5)
+    assert math.isclose(await _score(post_id), expected, rel_tol=1e-9)
+
+
+async def test_interleaved_writers_keep_both_events(seeded):
+    # Both writers read the score before either writes: a read-modify-write would lose one event
+    post_id = seeded["busy_post"]
+    before = await _score(post_id)
+    async with SessionLocal() as first, SessionLocal() as second:
+        await first.get(Post, post_id)
+        await second.get(Post, post_id)
+        await add_post_event(first, post_id, COMMENT_WEIGHT)
+        await first.commit()
+        await add_post_event(second, post_id, COMMENT_WEIGHT)
+        await second.commit()
+
+    expected = add_event(add_event(before, COMMENT_WEIGHT), COMMENT_WEIGHT)
+    assert math.isclose(await _score(post_id), expected, rel_tol=1e-6)
+
+
+async def test_views_only_count_existing_posts(seeded, client):
+    trending_handler._pending_views.clear()
+    assert (await client.get(f"/api/v1/posts/{uuid4()}")).status_code == 404
+    assert (await client.get(f"/api/v1/posts/{seeded['quiet_post']}")).status_code == 200
+    assert (await client.get(f"/api/v1/posts/{seeded['quiet_post']}")).status_code == 200
+    assert trending_handler._pending_views == {seeded["quiet_post"]: 2}
+    trending_handler._pending_views.clear()
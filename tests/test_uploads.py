@@ -0,0 +1,76 @@
+import hashlib
+import io
+import os
+from time import time
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import select
+
+from app.db.config import SessionLocal
+from app.models.app_models import Post
+from app.utils.storage_handler import media_url, sign_upload, storage, storage_key
+from app.utils.upload_image_handler import MAX_MULTIPART_BYTES, upload_image_handler
+
+pytestmark = pytest.mark.anyio
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 1024
+
+
+async def test_oversized_form_is_refused_before_parsing(client):
+    image = PNG + b"\x00" * MAX_MULTIPART_BYTES
+    response = await client.post("/api/v1/posts/create", files={"image": ("big.png", image)})
+    assert response.status_code == 413
+
+
+async def test_form_without_length_is_cut_off(client):
+    async def body():
+        yield b"--x\r\nContent-Disposition: form-data; name=\"image\"; filename=\"big.png\"\r\n\r\n"
+        for _ in range(MAX_MULTIPART_BYTES // (64 * 1024) + 2):
+            yield b"\x00" * 64 * 1024
+
+    response = await client.post("/api/v1/posts/create", content=body(),
+                                 headers={"Content-Type": "multipart/form-data; boundary=x"})
+    assert response.status_code == 413
+
+
+async def test_upload_is_stored_once_under_its_hash():
+    keys = [await upload_image_handler(UploadFile(io.BytesIO(PNG), filename="a.png")) for _ in range(2)]
+
+    assert keys == [f"images/{hashlib.sha256(PNG).hexdigest()}.png"] * 2
+    assert await storage.read(keys[0]) == PNG
+    assert not os.listdir(storage.path("incoming"))
+
+
+async def test_local_media_urls_point_at_the_mount(client):
+    key = await upload_image_handler(UploadFile(io.BytesIO(PNG), filename="a.png"))
+    url = media_url(key)
+
+    assert url == f"/static/{key}"
+    assert storage_key(url) == storage_key(url.lstrip("/")) == key
+    response = await client.get(url)
+    assert response.status_code == 200 and response.content == PNG
+
+
+async def test_malformed_content_length_is_a_bad_request(client):
+    token = sign_upload({"key": "images/" + "cd" * 32 + ".png", "content_type": "image/png", "sha256": "cd" * 32,
+                         "size": len(PNG), "expires": int(time()) + 60})
+    response = await client.put(f"/api/v1/media/upload/{token}", content=PNG,
+                                headers={"Content-Type": "image/png", "Content-Length": "12abc"})
+    assert response.status_code == 400
+
+
+
+async def test_reset_variants_are_left_for_the_backfill(seeded):
+    async with SessionLocal() as db:
+        post = await db.get(Post, seeded["busy_post"])
+        post.image, post.image_variants = "images/old.png", {"thumbnail": "images/old_thumbnail.png"}
+        await db.commit()
+        # As update_post_by_id does when the image changes
+        post.image, post.image_variants = "images/new.png", None
+        await db.commit()
+
+    async with SessionLocal() as db:
+        # SQL NULL, not a JSON null, which IS NULL would never match
+        pending = await db.scalars(select(Post.id).where(Post.image.is_not(None)).where(Post.image_variants.is_(None)))
+        assert list(pending) == [seeded["busy_post"]]